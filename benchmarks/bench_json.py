@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+JSON backend throughput benchmark on trace files.
+
+This script:
+1. Loads the lines of each trace file into memory
+2. Decodes every line with each available backend in json_backend (orjson,
+   stdlib json), best of N runs
+3. Decodes the response bodies (body_raw) the way request_flow.py does
+4. Reports throughput in MB/s and lines/s per backend
+
+Usage:
+    python benchmarks/bench_json.py                    # All traces in .claude-trace/
+    python benchmarks/bench_json.py <trace_file> ...
+    python benchmarks/bench_json.py --repeat 5
+
+Examples:
+    python benchmarks/bench_json.py .claude-trace/log-2025-11-09-20-56-47_2.0.36.jsonl
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import json_backend  # noqa: E402
+from trace_reader import find_traces, open_trace  # noqa: E402
+
+
+def best_time(func: Callable[[], Any], repeat: int) -> float:
+    """Best wall time of repeat runs, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def decode_all(loads: Callable, items: List[Any]):
+    for item in items:
+        try:
+            loads(item)
+        except (json_backend.JSONDecodeError, TypeError):
+            pass
+
+
+def main():
+    # Argument parsing
+    parser = argparse.ArgumentParser(
+        description='Benchmark JSON backends on Claude Code trace files',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s
+  %(prog)s .claude-trace/log-2025-11-09-20-56-47_2.0.36.jsonl --repeat 5
+        """
+    )
+    parser.add_argument(
+        'trace_files',
+        nargs='*',
+        type=Path,
+        help='Trace file(s) to decode (default: .claude-trace/*.jsonl, compressed too)'
+    )
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=3,
+        help='Runs per backend; the best run is reported (default: 3)'
+    )
+
+    args = parser.parse_args()
+
+    trace_files = args.trace_files or find_traces(Path('.claude-trace'))
+    if not trace_files:
+        print("Error: No trace files given and none found in .claude-trace/")
+        return
+
+    lines = []
+    for trace_file in trace_files:
+        with open_trace(trace_file) as f:
+            lines.extend(line for line in f if line.strip())
+    line_bytes = sum(len(line) for line in lines)
+
+    entries = [json_backend.BACKENDS['json'](line) for line in lines]
+    bodies = [entry.get('response', {}).get('body_raw', '') for entry in entries]
+    body_bytes = sum(len(body.encode('utf-8')) for body in bodies if isinstance(body, str))
+
+    print("=" * 80)
+    print("JSON BACKEND BENCHMARK")
+    print("=" * 80)
+    print(f"  Traces: {len(trace_files)}, lines: {len(lines)} ({line_bytes / 1e6:.1f} MB), "
+          f"response bodies: {body_bytes / 1e6:.1f} MB")
+    print(f"  Available backends: {', '.join(json_backend.BACKENDS)} (active: {json_backend.BACKEND})")
+    print(f"  Best of {args.repeat} run(s)")
+    print("")
+
+    print(f"  {'Backend':10s} {'Input':16s} {'Time':>10s} {'MB/s':>10s} {'lines/s':>12s} {'Speedup':>9s}")
+    print("  " + "-" * 70)
+    for label, items, size in (('trace lines', lines, line_bytes), ('response bodies', bodies, body_bytes)):
+        baseline = None
+        for name, loads in reversed(list(json_backend.BACKENDS.items())):
+            elapsed = best_time(lambda: decode_all(loads, items), args.repeat)
+            baseline = baseline or elapsed
+            print(f"  {name:10s} {label:16s} {elapsed * 1000:8.1f}ms {size / 1e6 / elapsed:10.1f} "
+                  f"{len(items) / elapsed:12.0f} {baseline / elapsed:8.2f}x")
+    print("")
+
+
+if __name__ == '__main__':
+    main()
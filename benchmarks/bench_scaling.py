@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark of the extractors on synthetic traces.
+
+This script:
+1. Generates synthetic traces of each requested size with synthetic_trace.py
+   (kept in benchmarks/traces/ and reused by later runs)
+2. Runs extract_tools, extract_system_prompt and analyze_request_flow on each
+   trace in a fresh process, best of N runs
+3. Reports wall time, entries/s, MB/s and peak RSS per target and size
+4. Saves the results as JSON (benchmarks/results/) and optionally compares
+   them with an earlier run
+
+Peak RSS is the process maximum (VmHWM on Linux, else ru_maxrss), including
+the interpreter and imports; "base" is the RSS after imports, before the trace is opened. MB/s
+is the trace size over the wall time, so extractors that stop at the first
+match show how much of the trace they avoid reading.
+
+Usage:
+    python benchmarks/bench_scaling.py                         # 1MB, 10MB, 100MB
+    python benchmarks/bench_scaling.py --sizes 1MB,100MB,2GB
+    python benchmarks/bench_scaling.py --targets analyze_request_flow --repeat 1
+    python benchmarks/bench_scaling.py --compare benchmarks/results/scaling-20251109-120000.json
+
+Examples:
+    python benchmarks/bench_scaling.py --sizes 10MB,1GB --output /tmp/after.json --compare /tmp/before.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows - peak memory is reported as unknown
+    resource = None
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / 'src'))
+
+import extract_system_prompts  # noqa: E402
+import extract_tools  # noqa: E402
+import json_backend  # noqa: E402
+import request_flow  # noqa: E402
+from synthetic_trace import format_size, generate_trace, parse_size  # noqa: E402
+from trace_reader import iter_jsonl, iter_lines, trace_version  # noqa: E402
+
+
+TRACES_DIR = BENCH_DIR / 'traces'
+RESULTS_DIR = BENCH_DIR / 'results'
+
+TRACE_VERSION = '2.0.36'
+
+TARGETS = ['extract_tools', 'extract_system_prompt', 'analyze_request_flow']
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None if unknown)."""
+    # Linux: VmHWM starts fresh at exec, while ru_maxrss is inherited from the
+    # parent process
+    status = Path('/proc/self/status')
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_target(target: str, trace_file: Path) -> Dict[str, Any]:
+    """Run one target on a trace in this process and measure it."""
+    base_rss = peak_rss_mb()
+    start = time.perf_counter()
+    if target == 'extract_tools':
+        extract_tools.extract_tools_from_file(trace_file)
+    elif target == 'extract_system_prompt':
+        extract_system_prompts.extract_system_prompt_from_file(trace_file)
+    else:
+        request_flow.analyze_request_flow(iter_jsonl(trace_file), trace_version(trace_file))
+    elapsed = time.perf_counter() - start
+
+    return {'seconds': elapsed, 'peak_rss_mb': peak_rss_mb(), 'base_rss_mb': base_rss}
+
+
+def measure(target: str, trace_file: Path, repeat: int) -> Dict[str, Any]:
+    """Best of repeat runs, each in a fresh process so peak RSS is per run."""
+    best = None
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, __file__, '--measure', target, str(trace_file)],
+            capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"{target} failed on {trace_file.name}:\n{completed.stderr}")
+        run = json.loads(completed.stdout.strip().splitlines()[-1])
+        if best is None or run['seconds'] < best['seconds']:
+            best = run
+    return best
+
+
+def synthetic_trace(size: int, seed: int) -> Path:
+    """Path of the synthetic trace of a size, generating it on first use."""
+    trace_file = TRACES_DIR / f"synthetic-{format_size(size)}-seed{seed}_{TRACE_VERSION}.jsonl"
+    if not trace_file.exists():
+        print(f"  Generating {trace_file.name}...")
+        partial = trace_file.with_name(trace_file.name + '.partial')
+        generate_trace(partial, size, seed)
+        partial.rename(trace_file)
+    return trace_file
+
+
+def load_results(file_path: Path) -> Dict[tuple, Dict[str, Any]]:
+    """Earlier results keyed by (target, size)."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {(result['target'], result['size']): result for result in data['results']}
+
+
+def format_row(result: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> str:
+    peak = result['peak_rss_mb']
+    base = result['base_rss_mb']
+    memory = f"{peak:8.0f} MB (base {base:.0f})" if peak is not None else f"{'n/a':>11s}"
+    row = (f"  {result['target']:22s} {result['size']:>8s} {result['entries']:>8d} "
+           f"{result['seconds'] * 1000:10.1f}ms {result['entries_per_s']:12.0f} "
+           f"{result['mb_per_s']:10.1f} {memory}")
+    if previous:
+        speedup = previous['seconds'] / result['seconds'] if result['seconds'] else 0
+        row += f"  {speedup:5.2f}x"
+        if peak is not None and previous.get('peak_rss_mb'):
+            row += f" / mem {peak - previous['peak_rss_mb']:+.0f} MB"
+    return row
+
+
+def main():
+    # Argument parsing
+    parser = argparse.ArgumentParser(
+        description='Benchmark extractor scaling on synthetic Claude Code traces',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s
+  %(prog)s --sizes 1MB,100MB,2GB
+  %(prog)s --output /tmp/after.json --compare /tmp/before.json
+        """
+    )
+    parser.add_argument(
+        '--sizes',
+        default='1MB,10MB,100MB',
+        help='Comma-separated trace sizes (default: 1MB,10MB,100MB)'
+    )
+    parser.add_argument(
+        '--targets',
+        default=','.join(TARGETS),
+        help=f"Comma-separated targets (default: {','.join(TARGETS)})"
+    )
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=3,
+        help='Runs per target and size; the fastest is reported (default: 3)'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Seed of the synthetic traces (default: 0)'
+    )
+    parser.add_argument(
+        '--output',
+        type=Path,
+        help='Results file (default: benchmarks/results/scaling-<timestamp>.json)'
+    )
+    parser.add_argument(
+        '--compare',
+        type=Path,
+        metavar='FILE',
+        help='Earlier results file to compare against'
+    )
+    parser.add_argument(
+        '--measure',
+        nargs=2,
+        metavar=('TARGET', 'TRACE'),
+        help=argparse.SUPPRESS
+    )
+
+    args = parser.parse_args()
+
+    # Child process: one measurement, printed as JSON
+    if args.measure:
+        target, trace_file = args.measure
+        print(json.dumps(run_target(target, Path(trace_file))))
+        return
+
+    targets = [target.strip() for target in args.targets.split(',') if target.strip()]
+    unknown = [target for target in targets if target not in TARGETS]
+    if unknown:
+        parser.error(f"Unknown target(s): {', '.join(unknown)} (available: {', '.join(TARGETS)})")
+    try:
+        sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+    except ValueError as e:
+        parser.error(str(e))
+
+    previous = load_results(args.compare) if args.compare else {}
+
+    print("=" * 120)
+    print("SCALING BENCHMARK")
+    print("=" * 120)
+    print(f"  Python {platform.python_version()}, JSON backend: {json_backend.BACKEND}, best of {args.repeat} run(s)")
+    print("")
+
+    traces = {}
+    for size in sizes:
+        trace_file = synthetic_trace(size, args.seed)
+        trace_bytes = trace_file.stat().st_size
+        entries = sum(1 for _ in iter_lines(trace_file))
+        traces[size] = (trace_file, trace_bytes, entries)
+        print(f"  Trace {trace_file.name}: {entries} entries, {trace_bytes / 1e6:.1f} MB")
+    print("")
+
+    print(f"  {'Target':22s} {'Size':>8s} {'Entries':>8s} {'Time':>12s} {'entries/s':>12s} {'MB/s':>10s} {'Peak RSS':>11s}"
+          + ("  vs previous" if previous else ""))
+    print("  " + "-" * 116)
+
+    results = []
+    for target in targets:
+        for size in sizes:
+            trace_file, trace_bytes, entries = traces[size]
+            run = measure(target, trace_file, args.repeat)
+            result = {
+                'target': target,
+                'size': format_size(size),
+                'trace_bytes': trace_bytes,
+                'entries': entries,
+                'seconds': run['seconds'],
+                'entries_per_s': entries / run['seconds'] if run['seconds'] else 0,
+                'mb_per_s': trace_bytes / 1e6 / run['seconds'] if run['seconds'] else 0,
+                'peak_rss_mb': run['peak_rss_mb'],
+                'base_rss_mb': run['base_rss_mb']
+            }
+            results.append(result)
+            print(format_row(result, previous.get((target, result['size']))))
+    print("")
+
+    output_file = args.output or RESULTS_DIR / f"scaling-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'json_backend': json_backend.BACKEND,
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'results': results
+        }, f, indent=2)
+    print(f"✓ Saved results to {output_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Synthetic claude-trace generator for benchmarks.
+
+This script:
+1. Builds a deterministic Claude Code session shape: OAuth, organization
+   check, Haiku quota and warmup calls, Sonnet warmup and health checks
+2. Appends user turns - topic detection, conversation title, count_tokens,
+   Sonnet requests with the full system prompt and tool list, tool calls,
+   tool output summaries - with streamed (SSE) responses
+3. Starts a new conversation every --turns-per-session turns, so request
+   bodies stay realistic however large the trace gets
+4. Stops once the trace reaches the requested size (1 MB to several GB)
+
+The system prompt and tools are synthetic text of realistic size (~45 KB and
+~70 KB of JSON); the same seed always produces the same bytes.
+
+Usage:
+    python benchmarks/synthetic_trace.py <output.jsonl> --size 100MB
+    python benchmarks/synthetic_trace.py <output.jsonl> --size 2GB --seed 7
+
+Examples:
+    python benchmarks/synthetic_trace.py /tmp/log-2025-11-09-20-56-47_2.0.36.jsonl --size 50MB
+"""
+
+import argparse
+import json
+import random
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Any
+
+
+HAIKU = 'claude-haiku-4-5-20251001'
+SONNET = 'claude-sonnet-4-5-20250929'
+
+API = 'https://api.anthropic.com'
+MESSAGES_URL = f'{API}/v1/messages?beta=true'
+
+CORE_TOOLS = [
+    'Task', 'Bash', 'Glob', 'Grep', 'ExitPlanMode', 'Read', 'Edit', 'Write', 'NotebookEdit',
+    'WebFetch', 'TodoWrite', 'WebSearch', 'BashOutput', 'KillShell', 'Skill', 'SlashCommand'
+]
+MCP_TOOLS = ['mcp__ide__getDiagnostics', 'mcp__ide__executeCode']
+
+PROMPTS = [
+    'Hi, what is your name?',
+    'Run the following command: `ls -1 | wc -l`',
+    'Use the Task tool to read fixtures/TEST.md and summarize it',
+    'Find every TODO in src/ and list the files',
+    'Refactor the parser to return a list instead of a generator',
+    'Why does the build fail on Windows?'
+]
+
+WORDS = (
+    'the a to of and in is for you with tool file code when use user not this that should '
+    'command output must read edit search task agent test run make sure always never only '
+    'before after each any directory path result error change request response message '
+    'context prompt model line value parameter function example important note instead'
+).split()
+
+SIZE_UNITS = {'': 1, 'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    """Parse a size like "500KB", "100MB" or "2GB" into bytes."""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*', text.upper())
+    if not match:
+        raise ValueError(f"Invalid size: {text}")
+    number, unit = match.groups()
+    return int(float(number) * SIZE_UNITS[unit if unit.endswith('B') or not unit else unit + 'B'])
+
+
+def format_size(size: int) -> str:
+    for unit in ('GB', 'MB', 'KB'):
+        if size >= SIZE_UNITS[unit]:
+            return f"{size / SIZE_UNITS[unit]:.1f}{unit}"
+    return f"{size}B"
+
+
+def text(rng: random.Random, words: int) -> str:
+    """Prose-like filler of the given word count."""
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(6, 18))
+        sentence = ' '.join(rng.choice(WORDS) for _ in range(length))
+        sentences.append(sentence[0].upper() + sentence[1:] + '.')
+        words -= length
+    return ' '.join(sentences)
+
+
+def system_blocks(rng: random.Random) -> List[Dict[str, Any]]:
+    """System prompt blocks: identity line plus the long instructions block."""
+    sections = [f"# {text(rng, 3)[:-1]}\n\n{text(rng, 900)}" for _ in range(7)]
+    return [
+        {'type': 'text', 'text': "You are Claude Code, Anthropic's official CLI for Claude.",
+         'cache_control': {'type': 'ephemeral'}},
+        {'type': 'text', 'text': '\n\n'.join(sections), 'cache_control': {'type': 'ephemeral'}}
+    ]
+
+
+def tool_definitions(rng: random.Random) -> List[Dict[str, Any]]:
+    """Tool list with descriptions and JSON schemas of realistic size."""
+    tools = []
+    for name in CORE_TOOLS + MCP_TOOLS:
+        properties = {}
+        for _ in range(rng.randint(1, 6)):
+            properties[rng.choice(WORDS) + '_' + rng.choice(WORDS)] = {
+                'type': rng.choice(['string', 'number', 'boolean']),
+                'description': text(rng, rng.randint(8, 40))
+            }
+        tools.append({
+            'name': name,
+            'description': text(rng, rng.randint(60, 1400)),
+            'input_schema': {
+                'type': 'object',
+                'properties': properties,
+                'required': list(properties)[:1],
+                'additionalProperties': False,
+                '$schema': 'http://json-schema.org/draft-07/schema#'
+            }
+        })
+    return tools
+
+
+def sse_body(content: List[Dict[str, Any]], model: str) -> str:
+    """Streamed response body for the given content blocks."""
+    events = [('message_start', {
+        'type': 'message_start',
+        'message': {'id': 'msg_01', 'type': 'message', 'role': 'assistant', 'model': model, 'content': [],
+                    'stop_reason': None, 'usage': {'input_tokens': 12, 'output_tokens': 1}}
+    })]
+    for index, block in enumerate(content):
+        if block['type'] == 'text':
+            events.append(('content_block_start', {'type': 'content_block_start', 'index': index,
+                                                   'content_block': {'type': 'text', 'text': ''}}))
+            chunks = re.findall(r'\S+\s*', block['text']) or ['']
+            for start in range(0, len(chunks), 4):
+                events.append(('content_block_delta', {'type': 'content_block_delta', 'index': index,
+                                                       'delta': {'type': 'text_delta',
+                                                                 'text': ''.join(chunks[start:start + 4])}}))
+        else:
+            events.append(('content_block_start', {'type': 'content_block_start', 'index': index,
+                                                   'content_block': {'type': 'tool_use', 'id': block['id'],
+                                                                     'name': block['name'], 'input': {}}}))
+            raw_input = json.dumps(block['input'])
+            for start in range(0, len(raw_input), 16):
+                events.append(('content_block_delta', {'type': 'content_block_delta', 'index': index,
+                                                       'delta': {'type': 'input_json_delta',
+                                                                 'partial_json': raw_input[start:start + 16]}}))
+        events.append(('content_block_stop', {'type': 'content_block_stop', 'index': index}))
+    events.append(('message_delta', {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'},
+                                     'usage': {'output_tokens': 87}}))
+    events.append(('message_stop', {'type': 'message_stop'}))
+    return ''.join(f"event: {name}\ndata: {json.dumps(data)}\n\n" for name, data in events)
+
+
+class TraceWriter:
+    """Writes trace entries as JSONL, splicing the pre-encoded system prompt and tools."""
+
+    def __init__(self, f, system_json: str, tools_json: str):
+        self.f = f
+        self.system_json = system_json
+        self.tools_json = tools_json
+        self.timestamp = 1762700000.0
+        self.entries = 0
+        self.bytes = 0
+
+    def write(self, url: str, method: str = 'POST', body: Optional[Dict[str, Any]] = None,
+              response: str = '', system: bool = False, tools: bool = False):
+        body_json = json.dumps(body) if body is not None else 'null'
+        # The large shared payloads are encoded once and spliced into the body
+        if tools:
+            body_json = body_json[:-1] + ', "tools": ' + self.tools_json + '}'
+        if system:
+            body_json = body_json[:-1] + ', "system": ' + self.system_json + '}'
+
+        self.timestamp += 0.35
+        request = (f'{{"timestamp": {self.timestamp:.3f}, "method": "{method}", "url": {json.dumps(url)}, '
+                   f'"headers": {{"content-type": "application/json"}}, "body": {body_json}}}')
+        line = (f'{{"request": {request}, "response": {{"timestamp": {self.timestamp + 0.2:.3f}, '
+                f'"status_code": 200, "headers": {{}}, "body_raw": {json.dumps(response)}}}}}\n')
+        data = line.encode('utf-8')
+        self.f.write(data)
+        self.entries += 1
+        self.bytes += len(data)
+
+
+def write_session_start(writer: TraceWriter):
+    """Requests Claude Code sends before the first user prompt."""
+    writer.write('https://console.anthropic.com/v1/oauth/token')
+    writer.write(f'{API}/api/organization/claude_code_sonnet_1m_access', method='GET')
+    writer.write(MESSAGES_URL, body={'model': HAIKU, 'max_tokens': 1,
+                                     'messages': [{'role': 'user', 'content': 'quota'}]},
+                 response=sse_body([{'type': 'text', 'text': 'ok'}], HAIKU))
+    writer.write(MESSAGES_URL, body={'model': HAIKU, 'messages': [{'role': 'user', 'content': 'Warmup'}]},
+                 response=sse_body([{'type': 'text', 'text': 'Ready.'}], HAIKU))
+    writer.write(MESSAGES_URL, body={'model': SONNET,
+                                     'messages': [{'role': 'user', 'content': [{'type': 'text', 'text': 'Warmup'}]}]},
+                 response=sse_body([{'type': 'text', 'text': 'Ready.'}], SONNET), system=True, tools=True)
+    writer.write(f'{API}/api/hello', method='GET')
+
+
+def write_turn(writer: TraceWriter, rng: random.Random, messages: List[Dict[str, Any]], turn: int):
+    """One user turn; appends the turn's messages to the conversation."""
+    prompt = PROMPTS[turn % len(PROMPTS)] + (f" (#{turn})" if turn >= len(PROMPTS) else '')
+
+    writer.write(MESSAGES_URL, body={
+        'model': HAIKU,
+        'system': [{'type': 'text', 'text': 'Analyze if this message indicates a new conversation topic. '
+                                            'Format your response as a JSON object with isNewTopic and title.'}],
+        'messages': [{'role': 'user', 'content': prompt}, {'role': 'assistant', 'content': '{'}]
+    }, response=sse_body([{'type': 'text', 'text': '{"isNewTopic": true, "title": "Task"}'}], HAIKU))
+    if not messages:
+        writer.write(MESSAGES_URL, body={
+            'model': HAIKU,
+            'messages': [{'role': 'user', 'content': f'Please write a 5-10 word title for the following conversation:\n\n{prompt}'}]
+        }, response=sse_body([{'type': 'text', 'text': text(rng, 6)}], HAIKU))
+    writer.write(f'{API}/v1/messages/count_tokens?beta=true', body={
+        'model': SONNET, 'messages': [{'role': 'user', 'content': prompt}]
+    })
+
+    messages.append({'role': 'user', 'content': [
+        {'type': 'text', 'text': f'<system-reminder>\n{text(rng, 40)}\n</system-reminder>'},
+        {'type': 'text', 'text': prompt}
+    ]})
+
+    # Tool loop: every call's output becomes part of the conversation
+    for step in range(rng.randint(1, 3)):
+        tool_id = f'toolu_{turn:05d}_{step}'
+        tool = rng.choice(CORE_TOOLS[:8])
+        content = [{'type': 'text', 'text': text(rng, 20)},
+                   {'type': 'tool_use', 'id': tool_id, 'name': tool, 'input': {'command': text(rng, 6)}}]
+        writer.write(MESSAGES_URL, body={'model': SONNET, 'max_tokens': 32000, 'stream': True, 'messages': messages},
+                     response=sse_body(content, SONNET), system=True, tools=True)
+        output = text(rng, rng.randint(50, 2500))
+        messages.append({'role': 'assistant', 'content': content})
+        messages.append({'role': 'user', 'content': [{'type': 'tool_result', 'tool_use_id': tool_id, 'content': output}]})
+        if tool == 'Bash':
+            writer.write(MESSAGES_URL, body={
+                'model': HAIKU,
+                'messages': [{'role': 'user', 'content': f'Command: ls\nOutput: {output[:2000]}\n\nSummarize.'}]
+            }, response=sse_body([{'type': 'text', 'text': text(rng, 12)}], HAIKU))
+
+    answer = [{'type': 'text', 'text': text(rng, rng.randint(30, 300))}]
+    writer.write(MESSAGES_URL, body={'model': SONNET, 'max_tokens': 32000, 'stream': True, 'messages': messages},
+                 response=sse_body(answer, SONNET), system=True, tools=True)
+    messages.append({'role': 'assistant', 'content': answer})
+
+
+def generate_trace(output_file: Path, size: int, seed: int = 0,
+                   turns_per_session: int = 25) -> Tuple[int, int]:
+    """
+    Write a synthetic trace of at least size bytes.
+
+    Returns (entries, bytes) written.
+    """
+    rng = random.Random(seed)
+    system_json = json.dumps(system_blocks(rng))
+    tools_json = json.dumps(tool_definitions(rng))
+
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'wb') as f:
+        writer = TraceWriter(f, system_json, tools_json)
+        turn = 0
+        while writer.bytes < size:
+            write_session_start(writer)
+            messages = []
+            for _ in range(turns_per_session):
+                write_turn(writer, rng, messages, turn)
+                turn += 1
+                if writer.bytes >= size:
+                    break
+    return writer.entries, writer.bytes
+
+
+def main():
+    # Argument parsing
+    parser = argparse.ArgumentParser(
+        description='Generate a synthetic Claude Code trace for benchmarks',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s /tmp/log-2025-11-09-20-56-47_2.0.36.jsonl --size 50MB
+  %(prog)s /tmp/log-2025-11-09-20-56-47_2.0.36.jsonl --size 2GB --seed 7
+        """
+    )
+    parser.add_argument(
+        'output_file',
+        type=Path,
+        help='Trace file to write (name it ..._<version>.jsonl for the extractors)'
+    )
+    parser.add_argument(
+        '--size',
+        default='10MB',
+        help='Target size, e.g. 1MB, 500MB, 2GB (default: 10MB)'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Random seed (default: 0)'
+    )
+    parser.add_argument(
+        '--turns-per-session',
+        type=int,
+        default=25,
+        help='User turns before a new conversation starts (default: 25)'
+    )
+
+    args = parser.parse_args()
+
+    try:
+        size = parse_size(args.size)
+    except ValueError as e:
+        parser.error(str(e))
+
+    entries, written = generate_trace(args.output_file, size, args.seed, args.turns_per_session)
+    print(f"✓ Wrote {args.output_file} ({entries} entries, {format_size(written)})")
+
+
+if __name__ == '__main__':
+    main()
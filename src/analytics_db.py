@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+SQLite analytics database across all extracted versions.
+
+This script:
+1. Ingests the extracted outputs of every version - tool definitions and
+   their input schema properties, system prompt blocks, request flows and
+   the metadata.json records - into one local SQLite database
+   (output/analytics.db)
+2. Re-ingests a version's tools, system prompt or flow only when its source
+   file or metadata record changed, and drops versions whose outputs are gone
+3. Indexes every distinct system block and tool description in a positional
+   inverted index (text_index.py) for phrase lookups across versions
+4. Answers cross-version questions with canned queries or plain SQL
+
+Tables (all keyed by version; versions.sort_key orders them semantically):
+    versions        version, sort_key, tool/system/flow metadata and counts
+    tools           version, position, name, is_mcp, description, schema_hash, description_doc
+    tool_properties version, tool_name, property (dotted path), type, required, description
+    system_blocks   version, position, block_type, hash, length, doc_id
+    flow_requests   version, position, req_type, purpose, model, msg_count, turn
+    documents       doc_id, text_hash, text (each distinct block / description once)
+    postings        token, doc_id, positions (see text_index.py)
+
+Usage:
+    python analytics_db.py ingest
+    python analytics_db.py versions
+    python analytics_db.py tool <name>
+    python analytics_db.py blocks [<min_block_count>]
+    python analytics_db.py flows [<min_requests>]
+    python analytics_db.py find "<phrase>"
+    python analytics_db.py query "<SQL>"
+
+Examples:
+    python analytics_db.py ingest
+    python analytics_db.py tool Skill
+    python analytics_db.py blocks 3
+    python analytics_db.py flows 30
+    python analytics_db.py find "Intent Matching"
+    python analytics_db.py query "SELECT version, COUNT(*) FROM tool_properties WHERE tool_name = 'Bash' GROUP BY version"
+"""
+
+import argparse
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Any
+
+import blob_store
+import text_index
+import versions
+from blob_store import hash_blob
+from versions import REQUEST_FLOWS_DIR, SYSTEM_PROMPTS_DIR, TOOLS_DIR, file_signature, sort_key
+
+
+DB_FILE = Path('output/analytics.db')
+
+# Bump when the schema or the ingested fields change so the database is rebuilt
+SCHEMA_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE versions (
+    version TEXT PRIMARY KEY,
+    sort_key TEXT NOT NULL,
+    tools_trace_file TEXT, tools_entry_idx INTEGER, tool_count INTEGER, tool_count_no_mcp INTEGER,
+    system_trace_file TEXT, system_entry_idx INTEGER, block_count INTEGER,
+    flow_request_count INTEGER, flow_turn_count INTEGER
+);
+CREATE TABLE sources (
+    version TEXT NOT NULL, kind TEXT NOT NULL, signature TEXT NOT NULL,
+    PRIMARY KEY (version, kind)
+);
+CREATE TABLE tools (
+    version TEXT NOT NULL, position INTEGER NOT NULL, name TEXT NOT NULL, is_mcp INTEGER NOT NULL,
+    description TEXT, schema_hash TEXT, description_doc INTEGER,
+    PRIMARY KEY (version, position)
+);
+CREATE TABLE tool_properties (
+    version TEXT NOT NULL, tool_name TEXT NOT NULL, property TEXT NOT NULL,
+    type TEXT, required INTEGER NOT NULL, description TEXT,
+    PRIMARY KEY (version, tool_name, property)
+);
+CREATE TABLE system_blocks (
+    version TEXT NOT NULL, position INTEGER NOT NULL, block_type TEXT, hash TEXT NOT NULL, length INTEGER,
+    doc_id INTEGER,
+    PRIMARY KEY (version, position)
+);
+CREATE TABLE flow_requests (
+    version TEXT NOT NULL, position INTEGER NOT NULL, req_type TEXT, purpose TEXT,
+    model TEXT, msg_count INTEGER, turn INTEGER,
+    PRIMARY KEY (version, position)
+);
+CREATE INDEX tools_name ON tools (name, version);
+CREATE INDEX tool_properties_name ON tool_properties (tool_name, property);
+CREATE INDEX system_blocks_hash ON system_blocks (hash);
+CREATE INDEX system_blocks_doc ON system_blocks (doc_id);
+CREATE INDEX tools_description_doc ON tools (description_doc);
+CREATE INDEX flow_requests_type ON flow_requests (req_type, version);
+CREATE INDEX versions_sort_key ON versions (sort_key);
+"""
+
+# Per-kind version tables and the versions columns each kind fills
+KIND_TABLES = {
+    'tools': ['tools', 'tool_properties'],
+    'system_prompt': ['system_blocks'],
+    'request_flow': ['flow_requests'],
+}
+KIND_COLUMNS = {
+    'tools': ['tools_trace_file', 'tools_entry_idx', 'tool_count', 'tool_count_no_mcp'],
+    'system_prompt': ['system_trace_file', 'system_entry_idx', 'block_count'],
+    'request_flow': ['flow_request_count', 'flow_turn_count'],
+}
+
+
+def open_db(db_file: Path = DB_FILE) -> sqlite3.Connection:
+    """Open the database, creating (or recreating on a schema change) it."""
+    db_file.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_file)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+    except sqlite3.DatabaseError:
+        row = None
+    if row is None or row[0] != str(SCHEMA_VERSION):
+        conn.close()
+        db_file.unlink(missing_ok=True)
+        conn = sqlite3.connect(db_file)
+        conn.executescript(SCHEMA)
+        conn.executescript(text_index.SCHEMA)
+        conn.execute("INSERT INTO meta VALUES ('schema', ?)", (str(SCHEMA_VERSION),))
+        conn.commit()
+    return conn
+
+
+def load_metadata(output_dir: Path) -> Dict[str, Dict[str, Any]]:
+    """Per-version records of an output directory's metadata.json."""
+    metadata_file = output_dir / 'metadata.json'
+    if not metadata_file.exists():
+        return {}
+    with open(metadata_file, 'r', encoding='utf-8') as f:
+        return json.load(f).get('versions', {})
+
+
+def schema_properties(schema: Dict[str, Any], prefix: str = '') -> List[Tuple[str, Optional[str], bool, Optional[str]]]:
+    """(dotted path, type, required, description) of every property in an input schema."""
+    properties = []
+    required = set(schema.get('required', []))
+    for name, prop in (schema.get('properties') or {}).items():
+        if not isinstance(prop, dict):
+            continue
+        path = prefix + name
+        prop_type = prop.get('type')
+        if isinstance(prop_type, list):
+            prop_type = '|'.join(prop_type)
+        properties.append((path, prop_type, name in required, prop.get('description')))
+        properties.extend(schema_properties(prop, path + '.'))
+        items = prop.get('items')
+        if isinstance(items, dict):
+            properties.extend(schema_properties(items, path + '[].'))
+    return properties
+
+
+def ingest_tools(conn: sqlite3.Connection, version: str, info: Dict[str, Any]):
+    tools = versions.load_tools(version) or []
+    for position, tool in enumerate(tools):
+        name = tool.get('name', 'unknown')
+        schema = tool.get('input_schema') or {}
+        description = tool.get('description')
+        doc_id = text_index.add_document(conn, description) if description else None
+        conn.execute(
+            "INSERT INTO tools VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (version, position, name, int(name.startswith('mcp__')), description, hash_blob(schema), doc_id)
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO tool_properties VALUES (?, ?, ?, ?, ?, ?)",
+            [(version, name, path, prop_type, int(required), description)
+             for path, prop_type, required, description in schema_properties(schema)]
+        )
+    conn.execute(
+        "UPDATE versions SET tools_trace_file = ?, tools_entry_idx = ?, tool_count = ?, tool_count_no_mcp = ? "
+        "WHERE version = ?",
+        (info.get('trace_file'), info.get('entry_idx'), len(tools),
+         sum(1 for tool in tools if not tool.get('name', '').startswith('mcp__')), version)
+    )
+
+
+def ingest_system_prompt(conn: sqlite3.Connection, version: str, info: Dict[str, Any]):
+    blocks = versions.load_system_blocks(version) or []
+    for position, block in enumerate(blocks):
+        digest = hash_blob(block)
+        text = block.get('text', '') if block.get('type') == 'text' else json.dumps(block, ensure_ascii=False)
+        conn.execute(
+            "INSERT INTO system_blocks VALUES (?, ?, ?, ?, ?, ?)",
+            (version, position, block.get('type'), digest, len(text), text_index.add_document(conn, text))
+        )
+    conn.execute(
+        "UPDATE versions SET system_trace_file = ?, system_entry_idx = ?, block_count = ? WHERE version = ?",
+        (info.get('trace_file'), info.get('entry_idx'), len(blocks), version)
+    )
+
+
+def ingest_request_flow(conn: sqlite3.Connection, version: str, info: Dict[str, Any]):
+    flow = versions.load_request_flow(version) or []
+    conn.executemany(
+        "INSERT INTO flow_requests VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(version, position, request.req_type, request.purpose, request.model, request.msg_count, request.turn)
+         for position, request in enumerate(flow)]
+    )
+    conn.execute(
+        "UPDATE versions SET flow_request_count = ?, flow_turn_count = ? WHERE version = ?",
+        (len(flow), flow[-1].turn if flow else 0, version)
+    )
+
+
+INGESTERS = {
+    'tools': ingest_tools,
+    'system_prompt': ingest_system_prompt,
+    'request_flow': ingest_request_flow,
+}
+
+
+def output_sources() -> Dict[Tuple[str, str], Tuple[str, Dict[str, Any]]]:
+    """(version, kind) -> (signature, metadata record) of every extracted output."""
+    sources = {}
+    metadata = load_metadata(TOOLS_DIR)
+    for version in versions.tool_versions():
+        info = metadata.get(version, {})
+        signature = file_signature(TOOLS_DIR / f"tools_{version}.json",
+                                   blob_store.tools_manifest_path(version, TOOLS_DIR))
+        sources[(version, 'tools')] = (f"{signature}|{json.dumps(info, sort_keys=True)}", info)
+
+    metadata = load_metadata(SYSTEM_PROMPTS_DIR)
+    for version in versions.system_prompt_versions():
+        info = metadata.get(version, {})
+        signature = file_signature(SYSTEM_PROMPTS_DIR / f"system_prompt_{version}.txt",
+                                   blob_store.system_manifest_path(version, SYSTEM_PROMPTS_DIR))
+        sources[(version, 'system_prompt')] = (f"{signature}|{json.dumps(info, sort_keys=True)}", info)
+
+    for version in versions.request_flow_versions():
+        signature = file_signature(REQUEST_FLOWS_DIR / f"request_flow_{version}.json",
+                                   REQUEST_FLOWS_DIR / f"request_flow_{version}.txt")
+        sources[(version, 'request_flow')] = (signature, {})
+    return sources
+
+
+def clear_kind(conn: sqlite3.Connection, version: str, kind: str):
+    """Delete a version's rows and metadata columns of one kind."""
+    for table in KIND_TABLES[kind]:
+        conn.execute(f"DELETE FROM {table} WHERE version = ?", (version,))
+    columns = ', '.join(f"{column} = NULL" for column in KIND_COLUMNS[kind])
+    conn.execute(f"UPDATE versions SET {columns} WHERE version = ?", (version,))
+    conn.execute("DELETE FROM sources WHERE version = ? AND kind = ?", (version, kind))
+
+
+def ingest(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Bring the database up to date with output/; returns ingested/unchanged/removed counts."""
+    stats = {'ingested': 0, 'unchanged': 0, 'removed': 0}
+    sources = output_sources()
+    known = {(version, kind): signature for version, kind, signature in conn.execute("SELECT * FROM sources")}
+
+    with conn:
+        for (version, kind) in sorted(set(known) - set(sources)):
+            clear_kind(conn, version, kind)
+            print(f"  ⊘ {version} {kind}: outputs removed")
+            stats['removed'] += 1
+
+        for (version, kind), (signature, info) in sorted(sources.items()):
+            if known.get((version, kind)) == signature:
+                stats['unchanged'] += 1
+                continue
+            conn.execute("INSERT OR IGNORE INTO versions (version, sort_key) VALUES (?, ?)",
+                         (version, sort_key(version)))
+            clear_kind(conn, version, kind)
+            INGESTERS[kind](conn, version, info)
+            conn.execute("INSERT INTO sources VALUES (?, ?, ?)", (version, kind, signature))
+            print(f"  ✓ {version} {kind}")
+            stats['ingested'] += 1
+
+        # Versions without any output left
+        conn.execute("DELETE FROM versions WHERE version NOT IN (SELECT version FROM sources)")
+        text_index.prune_documents(
+            conn,
+            "SELECT doc_id FROM system_blocks UNION SELECT description_doc FROM tools WHERE description_doc IS NOT NULL"
+        )
+    return stats
+
+
+# Canned queries: (title, SQL) - parameters come from the command line
+QUERIES = {
+    'versions': (
+        "VERSIONS",
+        "SELECT version, tool_count, tool_count_no_mcp, block_count, flow_request_count, flow_turn_count "
+        "FROM versions ORDER BY sort_key"
+    ),
+    'tool': (
+        "VERSIONS WITH TOOL {0}",
+        "SELECT v.version, t.position, COUNT(p.property) AS properties, t.schema_hash "
+        "FROM tools t JOIN versions v ON v.version = t.version "
+        "LEFT JOIN tool_properties p ON p.version = t.version AND p.tool_name = t.name "
+        "WHERE t.name = ? GROUP BY t.version ORDER BY v.sort_key"
+    ),
+    'blocks': (
+        "SYSTEM PROMPT BLOCK COUNTS (>= {0})",
+        "SELECT version, block_count, (SELECT SUM(length) FROM system_blocks s WHERE s.version = v.version) AS chars "
+        "FROM versions v WHERE block_count >= ? ORDER BY sort_key"
+    ),
+    'flows': (
+        "REQUEST FLOWS WITH MORE THAN {0} REQUESTS",
+        "SELECT version, flow_request_count, flow_turn_count FROM versions "
+        "WHERE flow_request_count > ? ORDER BY sort_key"
+    ),
+}
+
+
+def print_phrase(conn: sqlite3.Connection, phrase: str):
+    """Print the first, last and all versions containing a phrase."""
+    start = time.perf_counter()
+    matches = text_index.find_phrase(conn, phrase)
+    elapsed = time.perf_counter() - start
+    all_versions = [version for (version,) in conn.execute("SELECT version FROM versions ORDER BY sort_key")]
+
+    print("=" * 120)
+    print(f"VERSIONS CONTAINING \"{phrase}\"")
+    print("=" * 120)
+    if not matches:
+        print("  ✗ Not found in any version")
+    else:
+        found = {match['version'] for match in matches}
+        first, last = matches[0]['version'], matches[-1]['version']
+        later = all_versions[all_versions.index(last) + 1:]
+        print(f"  First: {first}")
+        print(f"  Last:  {last}" + (f" (gone in {later[0]})" if later else " (latest)"))
+        missing = [version for version in all_versions[all_versions.index(first):all_versions.index(last)]
+                   if version not in found]
+        if missing:
+            print(f"  Absent in between: {', '.join(missing)}")
+        print("")
+        for match in matches:
+            print(f"  {match['version']:10s} {', '.join(match['where'])}")
+    print("")
+    print(f"  {len(matches)} version(s) in {elapsed * 1000:.1f}ms")
+    print("")
+
+
+def run_query(conn: sqlite3.Connection, title: str, sql: str, params: List[Any]):
+    """Run a query and print its rows as a table with the query time."""
+    start = time.perf_counter()
+    cursor = conn.execute(sql, params)
+    rows = cursor.fetchall()
+    elapsed = time.perf_counter() - start
+    columns = [description[0] for description in cursor.description or []]
+
+    print("=" * 120)
+    print(title)
+    print("=" * 120)
+    if columns:
+        cells = [[('' if value is None else str(value)) for value in row] for row in rows]
+        widths = [min(60, max([len(column)] + [len(row[i]) for row in cells])) for i, column in enumerate(columns)]
+        print("  " + "  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+        print("  " + "  ".join("-" * width for width in widths))
+        for row in cells:
+            print("  " + "  ".join(value[:width].ljust(width) for value, width in zip(row, widths)))
+    print("")
+    print(f"  {len(rows)} row(s) in {elapsed * 1000:.1f}ms")
+    print("")
+
+
+def main():
+    # Argument parsing
+    parser = argparse.ArgumentParser(
+        description='Ingest extracted outputs into a SQLite database and query them across versions',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s ingest
+  %(prog)s tool Skill
+  %(prog)s blocks 3
+  %(prog)s flows 30
+  %(prog)s find "Intent Matching"
+  %(prog)s query "SELECT name, COUNT(*) FROM tools GROUP BY name ORDER BY 2"
+        """
+    )
+    parser.add_argument(
+        'command',
+        choices=['ingest', 'versions', 'tool', 'blocks', 'flows', 'find', 'query'],
+        help='ingest outputs, run a canned query, find a phrase, or run SQL'
+    )
+    parser.add_argument(
+        'args',
+        nargs='*',
+        help='Tool name for tool; minimum block count for blocks; request count for flows; phrase for find; SQL for query'
+    )
+    parser.add_argument(
+        '--db',
+        type=Path,
+        default=DB_FILE,
+        help=f'Database file (default: {DB_FILE})'
+    )
+
+    args = parser.parse_args()
+
+    conn = open_db(args.db)
+
+    if args.command == 'ingest':
+        print(f"Ingesting outputs into {args.db}...")
+        start = time.perf_counter()
+        stats = ingest(conn)
+        print("")
+        print(f"✓ {stats['ingested']} ingested, {stats['unchanged']} unchanged, {stats['removed']} removed "
+              f"in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return
+
+    if args.command == 'find':
+        if len(args.args) != 1:
+            parser.error('find takes one phrase (quote it)')
+        print_phrase(conn, args.args[0])
+        return
+
+    if args.command == 'query':
+        if len(args.args) != 1:
+            parser.error('query takes one SQL statement (quote it)')
+        try:
+            run_query(conn, "QUERY", args.args[0], [])
+        except sqlite3.Error as e:
+            print(f"Error: {e}")
+        return
+
+    title, sql = QUERIES[args.command]
+    if args.command == 'tool':
+        if len(args.args) != 1:
+            parser.error('tool takes one tool name')
+        params = [args.args[0]]
+    elif args.command in ('blocks', 'flows'):
+        if len(args.args) > 1 or (args.args and not args.args[0].isdigit()):
+            parser.error(f'{args.command} takes an optional number')
+        params = [int(args.args[0]) if args.args else 0]
+    else:
+        params = []
+    run_query(conn, title.format(*params), sql, params)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Batch helpers for running an extractor over many trace files.
+
+Traces are independent, so extraction can be spread across a process pool.
+Results are always handed back in input order, which keeps the parent's
+keep-first-per-version de-duplication and metadata writes deterministic.
+
+A single large trace is spread the same way: it is split into newline-aligned
+byte ranges (chunks) whose results are merged in file order. Chunk workers
+only see their own lines, so anything that depends on earlier entries - entry
+numbers, running counters - is left to the merge.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import profiling
+from trace_reader import is_splittable, split_trace
+
+
+# Chunks per worker, so a slow chunk does not leave the other workers idle
+CHUNKS_PER_JOB = 4
+
+# Chunks are at least this big; smaller traces are split into fewer chunks
+MIN_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def resolve_jobs(jobs: int) -> int:
+    """Return the worker count to use; values below 1 mean one per CPU."""
+    if jobs < 1:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def profiled_result(future) -> Any:
+    """Result of a profiled worker, merging its profile into this process's."""
+    result, snapshot = future.result()
+    profiling.PROFILE.merge(snapshot)
+    return result
+
+
+def map_traces(
+    worker: Callable[[Path], Any],
+    trace_files: List[Path],
+    jobs: int = 1
+) -> Iterator[Tuple[Path, Callable[[], Any]]]:
+    """
+    Run worker over trace files, yielding (trace_file, get_result) in input order.
+
+    get_result() returns the worker's result for that file. With jobs == 1 the
+    worker only runs when get_result() is called, so callers that skip a file
+    (e.g. a duplicate version) never read it. With jobs > 1 every file is
+    submitted to a process pool up front and get_result() waits for its turn.
+
+    The worker must be a module-level function so it can be pickled.
+    """
+    jobs = resolve_jobs(jobs)
+
+    if jobs == 1 or len(trace_files) <= 1:
+        for trace_file in trace_files:
+            yield trace_file, partial(worker, trace_file)
+        return
+
+    # With --profile, workers send their stage timings back with each result
+    profiled = profiling.enabled()
+    if profiled:
+        worker = partial(profiling.run_in_worker, worker)
+
+    executor = ProcessPoolExecutor(max_workers=min(jobs, len(trace_files)))
+    try:
+        futures = [executor.submit(worker, trace_file) for trace_file in trace_files]
+        for trace_file, future in zip(trace_files, futures):
+            yield trace_file, partial(profiled_result, future) if profiled else future.result
+    finally:
+        # Don't leave queued work running if the caller stops early
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def chunk_ranges(trace_file: Path, jobs: int) -> List[Tuple[int, int]]:
+    """Byte ranges to split a trace into for `jobs` workers; empty if it should not be split."""
+    chunks = 1
+    if jobs > 1 and is_splittable(trace_file):
+        chunks = min(jobs * CHUNKS_PER_JOB, trace_file.stat().st_size // MIN_CHUNK_SIZE)
+    byte_ranges = split_trace(trace_file, chunks) if chunks > 1 else []
+    return byte_ranges if len(byte_ranges) > 1 else []
+
+
+def map_ranges(
+    worker: Callable[[Path, Optional[Tuple[int, int]]], Any],
+    trace_file: Path,
+    byte_ranges: List[Tuple[int, int]],
+    jobs: int
+) -> Iterator[Any]:
+    """
+    Run worker over byte ranges of one trace in a process pool, yielding its results in order.
+
+    At most two ranges per worker are in flight, so the parent only holds a
+    few chunk results at a time.
+    """
+    profiled = profiling.enabled()
+    if profiled:
+        worker = partial(profiling.run_in_worker, worker)
+
+    executor = ProcessPoolExecutor(max_workers=min(jobs, len(byte_ranges)))
+    try:
+        pending = []
+        submitted = 0
+        while submitted < len(byte_ranges) or pending:
+            while submitted < len(byte_ranges) and len(pending) < 2 * jobs:
+                pending.append(executor.submit(worker, trace_file, byte_ranges[submitted]))
+                submitted += 1
+            future = pending.pop(0)
+            yield profiled_result(future) if profiled else future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def map_chunks(
+    worker: Callable[[Path, Optional[Tuple[int, int]]], Any],
+    trace_file: Path,
+    jobs: int = 1
+) -> Iterator[Any]:
+    """
+    Run worker over the chunks of one trace, yielding its results in file order.
+
+    worker(trace_file, byte_range) handles the lines of one byte range
+    (trace_reader.split_trace()); byte_range is None for the whole trace,
+    which is what a single chunk, jobs == 1 and compressed or compacted
+    traces get.
+
+    The worker must be a module-level function (or a partial of one).
+    """
+    jobs = resolve_jobs(jobs)
+    byte_ranges = chunk_ranges(trace_file, jobs)
+    if not byte_ranges:
+        yield worker(trace_file, None)
+        return
+    yield from map_ranges(worker, trace_file, byte_ranges, jobs)
+
+
+def first_match(
+    worker: Callable[[Path, Optional[Tuple[int, int]]], Tuple[int, Optional[Dict[str, Any]]]],
+    trace_file: Path,
+    jobs: int = 1
+) -> Optional[Dict[str, Any]]:
+    """
+    First match of a first-match extractor in one trace, searching its chunks in parallel.
+
+    worker(trace_file, byte_range) returns (entries, match) for one chunk:
+    the match's 'entry_idx' counts from the chunk start, and entries is the
+    number of entries it read - all of the chunk's when there is no match.
+
+    The match is nearly always early in a trace, so the first chunk is
+    searched here, like a sequential run that stops at the match; only if it
+    has none are the other chunks searched by the pool. Chunks after the
+    first one with a match are cancelled.
+    """
+    jobs = resolve_jobs(jobs)
+    byte_ranges = chunk_ranges(trace_file, jobs)
+    if not byte_ranges:
+        return worker(trace_file, None)[1]
+
+    offset, match = worker(trace_file, byte_ranges[0])
+    if match is not None:
+        return match
+    with closing(map_ranges(worker, trace_file, byte_ranges[1:], jobs)) as results:
+        for entries, match in results:
+            if match is not None:
+                return dict(match, entry_idx=offset + match['entry_idx'])
+            offset += entries
+    return None
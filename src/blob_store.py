@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store for tool definitions and system prompt blocks.
+
+Most tools and system blocks are byte-identical from one version to the
+next, so each distinct tool definition / system block is written once to
+output/blobs/ under its SHA-256 hash. Each version gets a small manifest of
+hashes:
+
+    output/tool_definitions/manifests/tools_{version}.json
+    output/system_prompts/manifests/system_prompt_{version}.json
+
+The full per-version files (tools_*.txt/json, tools_no_mcp_*, and
+system_prompt_*.txt) can be rebuilt from the store on demand.
+
+Usage:
+    python blob_store.py rebuild [--tools] [--system-prompts] [VERSION ...]
+    python blob_store.py stats
+
+Examples:
+    python blob_store.py rebuild             # Rebuild every version with a manifest
+    python blob_store.py rebuild --tools 2.0.36
+    python blob_store.py stats
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+import profiling
+
+
+TOOLS_DIR = Path('output/tool_definitions')
+SYSTEM_PROMPTS_DIR = Path('output/system_prompts')
+MANIFEST_DIRNAME = 'manifests'
+BLOBS_DIRNAME = 'blobs'
+
+
+def encode_blob(obj: Any) -> bytes:
+    """
+    Serialize an object for storage (compact, key order preserved).
+
+    Lone UTF-16 surrogates (a truncated emoji pair in a trace) are kept with
+    surrogatepass, so any decoded trace text can be hashed and stored.
+    """
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8', 'surrogatepass')
+
+
+def hash_blob(obj: Any) -> str:
+    """Return the store hash of an object (SHA-256 of its encoded form)."""
+    return hashlib.sha256(encode_blob(obj)).hexdigest()
+
+
+def write_if_changed(path: Path, data: bytes) -> bool:
+    """Atomically write data to path unless it already has that content."""
+    if path.exists() and path.stat().st_size == len(data) and path.read_bytes() == data:
+        return False
+
+    with profiling.stage('write'):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return True
+
+
+class BlobStore:
+    """Hash-addressed JSON blob store (blobs/ab/cdef...json)."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.written = 0
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / f"{digest[2:]}.json"
+
+    def put(self, obj: Any) -> str:
+        """Store an object if not already present and return its hash."""
+        digest = hash_blob(obj)
+        path = self.blob_path(digest)
+        if not path.exists():
+            write_if_changed(path, encode_blob(obj))
+            self.written += 1
+        return digest
+
+    def get(self, digest: str) -> Any:
+        """Load an object by hash."""
+        with open(self.blob_path(digest), 'r', encoding='utf-8', errors='surrogatepass') as f:
+            return json.load(f)
+
+
+def store_for(output_dir: Path) -> BlobStore:
+    """Return the shared blob store for an output directory (output/blobs/)."""
+    return BlobStore(output_dir.parent / BLOBS_DIRNAME)
+
+
+def tools_manifest_path(version: str, output_dir: Path) -> Path:
+    return output_dir / MANIFEST_DIRNAME / f"tools_{version}.json"
+
+
+def system_manifest_path(version: str, output_dir: Path) -> Path:
+    return output_dir / MANIFEST_DIRNAME / f"system_prompt_{version}.json"
+
+
+def save_tools_manifest(version: str, tools_data: Dict[str, Any], output_dir: Path) -> Path:
+    """Store each tool definition as a blob and write the version's manifest."""
+    store = store_for(output_dir)
+    manifest = {
+        'version': version,
+        'tool_count': tools_data['tool_count'],
+        'extracted_from_entry': tools_data['entry_idx'],
+        'tools': [store.put(tool) for tool in tools_data['tools']]
+    }
+    manifest_file = tools_manifest_path(version, output_dir)
+    write_if_changed(manifest_file, json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest_file
+
+
+def save_system_manifest(version: str, prompt_data: Dict[str, Any], output_dir: Path) -> Path:
+    """Store each system block as a blob and write the version's manifest."""
+    store = store_for(output_dir)
+    manifest = {
+        'version': version,
+        'block_count': prompt_data['block_count'],
+        'entry_idx': prompt_data['entry_idx'],
+        'system': [store.put(block) for block in prompt_data['system']]
+    }
+    manifest_file = system_manifest_path(version, output_dir)
+    write_if_changed(manifest_file, json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest_file
+
+
+def load_tools_data(version: str, output_dir: Path = TOOLS_DIR) -> Optional[Dict[str, Any]]:
+    """
+    Rebuild a version's tools dict (as returned by extract_tools) from its manifest.
+
+    Returns None if the version has no manifest.
+    """
+    manifest_file = tools_manifest_path(version, output_dir)
+    if not manifest_file.exists():
+        return None
+
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    store = store_for(output_dir)
+    tools = [store.get(digest) for digest in manifest['tools']]
+    return {
+        'entry_idx': manifest['extracted_from_entry'],
+        'tools': tools,
+        'tool_count': len(tools),
+        'tool_names': [tool.get('name', 'unknown') for tool in tools]
+    }
+
+
+def load_prompt_data(version: str, output_dir: Path = SYSTEM_PROMPTS_DIR) -> Optional[Dict[str, Any]]:
+    """
+    Rebuild a version's prompt dict (as returned by extract_system_prompt) from its manifest.
+
+    Returns None if the version has no manifest.
+    """
+    manifest_file = system_manifest_path(version, output_dir)
+    if not manifest_file.exists():
+        return None
+
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    store = store_for(output_dir)
+    system = [store.get(digest) for digest in manifest['system']]
+    return {
+        'entry_idx': manifest['entry_idx'],
+        'system': system,
+        'block_count': len(system)
+    }
+
+
+def manifest_versions(output_dir: Path, prefix: str) -> List[str]:
+    """List versions that have a manifest in output_dir."""
+    manifest_dir = output_dir / MANIFEST_DIRNAME
+    if not manifest_dir.exists():
+        return []
+    return sorted(path.stem[len(prefix):] for path in manifest_dir.glob(f"{prefix}*.json"))
+
+
+def rebuild_tools(versions: List[str], output_dir: Path = TOOLS_DIR) -> List[Path]:
+    """Rewrite the full tools_* / tools_no_mcp_* files for versions from the store."""
+    import extract_tools
+
+    saved_files = []
+    for version in versions:
+        tools_data = load_tools_data(version, output_dir)
+        if tools_data is None:
+            print(f"  ✗ No tools manifest for v{version}")
+            continue
+        files = extract_tools.save_tools_outputs(version, tools_data, output_dir)
+        print(f"  ✓ v{version}: {', '.join(f.name for f in files)}")
+        saved_files.extend(files)
+    return saved_files
+
+
+def rebuild_system_prompts(versions: List[str], output_dir: Path = SYSTEM_PROMPTS_DIR) -> List[Path]:
+    """Rewrite the full system_prompt_*.txt files for versions from the store."""
+    import extract_system_prompts
+
+    saved_files = []
+    for version in versions:
+        prompt_data = load_prompt_data(version, output_dir)
+        if prompt_data is None:
+            print(f"  ✗ No system prompt manifest for v{version}")
+            continue
+        output_file = extract_system_prompts.save_system_prompt(version, prompt_data, output_dir)
+        print(f"  ✓ v{version}: {output_file.name}")
+        saved_files.append(output_file)
+    return saved_files
+
+
+def print_stats():
+    """Print blob and manifest counts and sizes."""
+    blobs_root = TOOLS_DIR.parent / BLOBS_DIRNAME
+    blob_files = list(blobs_root.glob('*/*.json')) if blobs_root.exists() else []
+    blob_bytes = sum(path.stat().st_size for path in blob_files)
+
+    print("=" * 80)
+    print("BLOB STORE")
+    print("=" * 80)
+    print(f"  Blobs: {len(blob_files)} ({blob_bytes / 1024:.1f} KB) in {blobs_root}")
+    for label, output_dir in (('Tool manifests', TOOLS_DIR), ('System prompt manifests', SYSTEM_PROMPTS_DIR)):
+        manifests = list((output_dir / MANIFEST_DIRNAME).glob('*.json')) if output_dir.exists() else []
+        manifest_bytes = sum(path.stat().st_size for path in manifests)
+        print(f"  {label}: {len(manifests)} ({manifest_bytes / 1024:.1f} KB)")
+    print("")
+
+
+def main():
+    # Argument parsing
+    parser = argparse.ArgumentParser(
+        description='Rebuild per-version tool / system prompt files from the blob store',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s rebuild
+  %(prog)s rebuild --tools 2.0.36
+  %(prog)s stats
+        """
+    )
+    parser.add_argument(
+        'command',
+        choices=['rebuild', 'stats'],
+        help='rebuild per-version files, or show store statistics'
+    )
+    parser.add_argument(
+        'versions',
+        nargs='*',
+        help='Version(s) to rebuild (default: every version with a manifest)'
+    )
+    parser.add_argument(
+        '--tools',
+        action='store_true',
+        help='Only rebuild tool definition files'
+    )
+    parser.add_argument(
+        '--system-prompts',
+        action='store_true',
+        help='Only rebuild system prompt files'
+    )
+
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        print_stats()
+        return
+
+    # Neither flag means both
+    do_tools = args.tools or not args.system_prompts
+    do_system = args.system_prompts or not args.tools
+
+    if do_tools:
+        versions = args.versions or manifest_versions(TOOLS_DIR, 'tools_')
+        print(f"Rebuilding tool definitions for {len(versions)} version(s)...")
+        rebuild_tools(versions)
+        print("")
+
+    if do_system:
+        versions = args.versions or manifest_versions(SYSTEM_PROMPTS_DIR, 'system_prompt_')
+        print(f"Rebuilding system prompts for {len(versions)} version(s)...")
+        rebuild_system_prompts(versions)
+        print("")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Compiled request classification rules for request_flow.py.
+
+The rules are data, in classification_rules.json next to this file (set
+TRACE_CLASSIFICATION_RULES to use another file), so a new Claude Code request
+type is one more line there:
+
+    endpoints:  URL substring -> (request type, purpose)
+    messages:   per model family (substring of the model name), keywords of
+                the user message or the system prompt -> purpose, plus the
+                fallback purpose when no keyword matches (or, for the
+                main-loop family, the main_loop_label naming its turns)
+
+Rules are checked in order and the first match wins, as before. Instead of
+one substring test per rule, each ordered keyword list is compiled once into
+a single regex alternation inside a lookahead: one scan of a text finds every
+rule matching anywhere in it, and the lowest-numbered one wins. Keyword
+matching of messages is case-insensitive, so texts are no longer lowercased,
+and results are cached per text, keyed by a digest computed once per text,
+so a system prompt repeated by every request of a session is scanned once
+and the cache holds 16-byte keys rather than whole prompts.
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple, Any
+
+
+RULES_FILE = Path(__file__).resolve().with_name('classification_rules.json')
+
+CHECK_LOCATIONS = ('user', 'system')
+
+# Distinct texts whose match results are kept per matcher
+MATCH_CACHE_SIZE = 256
+
+# Digest size of cached texts
+MATCH_KEY_SIZE = 16
+
+
+class KeywordMatcher:
+    """
+    First-match-wins substring matcher over an ordered keyword list.
+
+    first(text) returns the index of the first keyword (in list order, not
+    text order) occurring in text, or None. Results are cached by a BLAKE2b
+    digest of the text, so a cache hit costs one hash of the text and no
+    long-lived copy of it.
+    """
+
+    def __init__(self, keywords: List[str], ignore_case: bool = False):
+        self.keywords = keywords
+        # Group i+1 is keyword i; the lookahead tests every position without
+        # consuming text, so overlapping keywords are all seen. At one
+        # position the alternation tries keywords in order, so a hidden
+        # match is always a later keyword.
+        alternation = '|'.join(f'({re.escape(keyword)})' for keyword in keywords)
+        self.regex = re.compile(f'(?=(?:{alternation}))', re.IGNORECASE if ignore_case else 0) if keywords else None
+        self.results = OrderedDict()
+
+    def first(self, text: str) -> Optional[int]:
+        key = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=MATCH_KEY_SIZE).digest()
+        if key in self.results:
+            self.results.move_to_end(key)
+            return self.results[key]
+        found = self.results[key] = self.scan(text)
+        if len(self.results) > MATCH_CACHE_SIZE:
+            self.results.popitem(last=False)
+        return found
+
+    def scan(self, text: str) -> Optional[int]:
+        if self.regex is None:
+            return None
+        best = None
+        for match in self.regex.finditer(text):
+            found = match.lastindex - 1
+            if best is None or found < best:
+                best = found
+                if best == 0:
+                    break
+        return best
+
+
+class MessageRules:
+    """Ordered keyword rules of one model family."""
+
+    def __init__(self, model: str, rules: List[Dict[str, Any]], fallback: Optional[str],
+                 main_loop_label: Optional[str] = None):
+        self.model = model.lower()
+        self.fallback = fallback
+        # Name of unmatched requests labelled as main-loop turns (no fallback)
+        self.main_loop_label = main_loop_label or model.capitalize()
+        self.purposes = [rule['purpose'] for rule in rules]
+        # Rule numbers per location; matchers return positions in these lists
+        self.user_rules = [i for i, rule in enumerate(rules) if rule['check'] == 'user']
+        self.system_rules = [i for i, rule in enumerate(rules) if rule['check'] == 'system']
+        self.user = KeywordMatcher([rules[i]['keyword'] for i in self.user_rules], ignore_case=True)
+        self.system = KeywordMatcher([rules[i]['keyword'] for i in self.system_rules], ignore_case=True)
+
+    def match(self, user_msg: str, system_text) -> Optional[str]:
+        """
+        Purpose of the first matching rule, or None.
+
+        system_text is a callable returning the system prompt, so the prompt
+        is only built when a system rule could still win.
+        """
+        found = self.user.first(user_msg)
+        best = self.user_rules[found] if found is not None else len(self.purposes)
+        if self.system_rules and self.system_rules[0] < best:
+            found = self.system.first(system_text())
+            if found is not None:
+                best = min(best, self.system_rules[found])
+        return self.purposes[best] if best < len(self.purposes) else None
+
+
+class ClassificationRules(NamedTuple):
+    """Compiled rules of one rules file."""
+    endpoints: KeywordMatcher
+    endpoint_labels: List[Tuple[str, str]]
+    messages: List[MessageRules]
+    digest: str
+
+
+def load_rules(rules_file: Path) -> ClassificationRules:
+    """Load and compile a rules file; raises ValueError if it is malformed."""
+    data = rules_file.read_bytes()
+    try:
+        rules = json.loads(data)
+        endpoints = rules['endpoints']
+        for family in rules['messages']:
+            for rule in family['rules']:
+                if rule['check'] not in CHECK_LOCATIONS:
+                    raise ValueError(f"unknown check location {rule['check']!r} (expected user or system)")
+        messages = [
+            MessageRules(family['model'], family['rules'], family.get('fallback'), family.get('main_loop_label'))
+            for family in rules['messages']
+        ]
+        endpoint_patterns = [rule['pattern'] for rule in endpoints]
+        endpoint_labels = [(rule['type'], rule['purpose']) for rule in endpoints]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid classification rules in {rules_file}: {e}") from e
+
+    return ClassificationRules(
+        endpoints=KeywordMatcher(endpoint_patterns),
+        endpoint_labels=endpoint_labels,
+        messages=messages,
+        digest=hashlib.sha256(data).hexdigest()[:16]
+    )
+
+
+RULES = load_rules(Path(os.environ.get('TRACE_CLASSIFICATION_RULES', RULES_FILE)))
+
+
+def match_endpoint(url: str) -> Optional[Tuple[str, str]]:
+    """(type, purpose) of the first endpoint rule matching url, or None."""
+    found = RULES.endpoints.first(url)
+    return RULES.endpoint_labels[found] if found is not None else None
+
+
+def model_rules(model: str) -> Optional[MessageRules]:
+    """Rules of the first model family whose name is part of model, or None."""
+    model = model.lower()
+    for family in RULES.messages:
+        if family.model in model:
+            return family
+    return None
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Request flow diffs between Claude Code versions.
+
+This script:
+1. Loads the structured flow of each version (request_flow_{version}.json
+   sidecar, or parsed from request_flow_{version}.txt) - no traces are read
+2. Aligns consecutive flows by (request type, purpose) with a sequence matcher
+3. Reports Added / Removed / Modified / Reordered requests in the format of
+   workflows/request_flow_changelog_template.md
+4. Diffs every adjacent version pair in one batch run (semantic-version order)
+
+A request that disappears from one position and reappears at another is
+reported as Reordered rather than removed + added. Requests that only shift
+index because something before them was added or removed are not reported.
+Modified covers model changes of aligned requests.
+
+Usage:
+    python diff_request_flows.py                   # All adjacent version pairs
+    python diff_request_flows.py <old> <new>       # One version pair
+    python diff_request_flows.py --json            # Machine-readable output
+
+Examples:
+    python diff_request_flows.py 2.0.35 2.0.36
+    python diff_request_flows.py > request_flow_diffs.md
+"""
+
+import argparse
+import difflib
+import json
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple, Any
+
+from request_flow import FlowRequest
+from versions import REQUEST_FLOWS_DIR, load_request_flow, request_flow_versions
+
+
+VERSION_DATES_FILE = Path('version_dates.md')
+
+# "💬 Sonnet turn (msgs:3, sys:True)" varies with the conversation, not the flow
+TURN_DETAILS = re.compile(r'\s*\(msgs:\d+, sys:\w+\)$')
+
+
+def load_version_dates(file_path: Path = VERSION_DATES_FILE) -> Dict[str, str]:
+    """Read the version → published date table from version_dates.md."""
+    dates = {}
+    if not file_path.exists():
+        return dates
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            cells = [cell.strip() for cell in line.strip().strip('|').split('|')]
+            if len(cells) == 2 and cells[0][:1].isdigit():
+                dates[cells[0]] = cells[1]
+    return dates
+
+
+def flow_key(request: FlowRequest) -> Tuple[str, str]:
+    """Alignment key of a request (its model is compared separately)."""
+    return request.req_type, TURN_DETAILS.sub('', request.purpose)
+
+
+def label(request: FlowRequest) -> str:
+    """Purpose without its leading emoji, e.g. "Check quota limits"."""
+    purpose = TURN_DETAILS.sub('', request.purpose)
+    return purpose.split(' ', 1)[1].strip() if purpose[:1] and not purpose[:1].isascii() else purpose
+
+
+def describe(request: FlowRequest) -> Dict[str, Any]:
+    return {
+        'req_type': request.req_type,
+        'purpose': label(request),
+        'model': request.model,
+        'turn': request.turn
+    }
+
+
+def diff_versions(old_version: str, old_flow: List[FlowRequest],
+                  new_version: str, new_flow: List[FlowRequest]) -> Dict[str, Any]:
+    """Structured diff between the request flows of two versions."""
+    old_keys = [flow_key(request) for request in old_flow]
+    new_keys = [flow_key(request) for request in new_flow]
+
+    pairs = []
+    removed = []
+    added = []
+    matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == 'equal':
+            pairs.extend(zip(range(i1, i2), range(j1, j2)))
+            continue
+        removed.extend(range(i1, i2))
+        added.extend(range(j1, j2))
+
+    # A request removed in one place and added in another moved (unless it
+    # kept its index and turn - then only its neighbours moved around it)
+    moved = []
+    for i in list(removed):
+        for j in added:
+            if old_keys[i] == new_keys[j]:
+                if i == j and old_flow[i].turn == new_flow[j].turn:
+                    pairs.append((i, j))
+                else:
+                    moved.append((i, j))
+                removed.remove(i)
+                added.remove(j)
+                break
+
+    modified = []
+    for i, j in sorted(pairs + moved, key=lambda pair: pair[1]):
+        old_model, new_model = old_flow[i].model, new_flow[j].model
+        if old_model != new_model:
+            modified.append(dict(describe(new_flow[j]), index=j, old_model=old_model))
+
+    return {
+        'old_version': old_version,
+        'new_version': new_version,
+        'old_count': len(old_flow),
+        'new_count': len(new_flow),
+        'added': [dict(describe(new_flow[j]), index=j) for j in added],
+        'removed': [dict(describe(old_flow[i]), index=i) for i in removed],
+        'modified': modified,
+        'reordered': [
+            dict(describe(new_flow[j]), old_index=i, new_index=j, old_turn=old_flow[i].turn)
+            for i, j in sorted(moved, key=lambda pair: pair[1])
+        ]
+    }
+
+
+def format_indices(indices: List[int]) -> str:
+    """Compact index list, e.g. "[5-7, 11, 13]"."""
+    ranges = []
+    for index in indices:
+        if ranges and index == ranges[-1][1] + 1:
+            ranges[-1][1] = index
+        else:
+            ranges.append([index, index])
+    return '[' + ', '.join(f"{start}" if start == end else f"{start}-{end}" for start, end in ranges) + ']'
+
+
+def group_requests(requests: List[Dict[str, Any]]) -> List[Tuple[List[int], Dict[str, Any]]]:
+    """Group repeated requests (same type and purpose) into one changelog line."""
+    groups = {}
+    for request in requests:
+        key = (request['req_type'], request['purpose'])
+        groups.setdefault(key, ([], request))[0].append(request['index'])
+    return list(groups.values())
+
+
+def turn_name(turn: int) -> str:
+    return 'initialization' if turn == 0 else f"Turn {turn}"
+
+
+def count_change(diff: Dict[str, Any]) -> str:
+    """Request count line, e.g. "24 → 23 (-1 request)"."""
+    delta = diff['new_count'] - diff['old_count']
+    if not delta:
+        return f"{diff['old_count']} → {diff['new_count']} (no change)"
+    return f"{diff['old_count']} → {diff['new_count']} ({delta:+d} {'request' if abs(delta) == 1 else 'requests'})"
+
+
+def format_diff(diff: Dict[str, Any], date: str = '') -> str:
+    """Render a version pair diff as a changelog entry (without Summary/Analysis)."""
+    lines = []
+    lines.append(f"## v{diff['new_version']}" + (f" • {date}" if date else ""))
+    lines.append("")
+    lines.append(f"**Request Count:** {count_change(diff)}")
+    lines.append("")
+
+    if not any(diff[key] for key in ('added', 'removed', 'modified', 'reordered')):
+        lines.append(f"No request flow changes from v{diff['old_version']}")
+        lines.append("")
+        lines.append("---")
+        lines.append("")
+        return '\n'.join(lines)
+
+    lines.append("### Changes")
+    lines.append("")
+
+    if diff['added']:
+        lines.append("#### ➕ Added")
+        for indices, request in group_requests(diff['added']):
+            repeat = f" (×{len(indices)})" if len(indices) > 1 else ""
+            lines.append(f"- {format_indices(indices)} {request['req_type']}: {request['purpose']}{repeat}")
+        lines.append("")
+
+    if diff['removed']:
+        lines.append("#### ➖ Removed")
+        for indices, request in group_requests(diff['removed']):
+            repeat = f" (×{len(indices)})" if len(indices) > 1 else ""
+            lines.append(f"- {request['req_type']}: {request['purpose']}{repeat} "
+                         f"(was at {format_indices(indices)} in v{diff['old_version']})")
+        lines.append("")
+
+    if diff['modified']:
+        lines.append("#### 🔄 Modified")
+        for request in diff['modified']:
+            lines.append(f"- [{request['index']}] {request['req_type']}: {request['purpose']} - "
+                         f"Model changed: {request['old_model']} → {request['model']}")
+        lines.append("")
+
+    if diff['reordered']:
+        lines.append("#### ↕️ Reordered")
+        for request in diff['reordered']:
+            if request['old_turn'] != request['turn']:
+                where = (f"from {turn_name(request['old_turn'])} [{request['old_index']}] "
+                         f"to {turn_name(request['turn'])} [{request['new_index']}]")
+            else:
+                where = f"from [{request['old_index']}] to [{request['new_index']}]"
+            lines.append(f"- {request['req_type']} ({request['purpose']}) moved {where}")
+        lines.append("")
+
+    lines.append("---")
+    lines.append("")
+    return '\n'.join(lines)
+
+
+def main():
+    # Argument parsing
+    parser = argparse.ArgumentParser(
+        description='Diff request flows between Claude Code versions',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s
+  %(prog)s 2.0.35 2.0.36
+  %(prog)s --json
+        """
+    )
+    parser.add_argument(
+        'versions',
+        nargs='*',
+        help='Two versions to compare (default: every adjacent pair)'
+    )
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help='Print structured diffs as JSON'
+    )
+    parser.add_argument(
+        '--output-dir',
+        type=Path,
+        default=REQUEST_FLOWS_DIR,
+        help=f'Request flows directory (default: {REQUEST_FLOWS_DIR})'
+    )
+
+    args = parser.parse_args()
+
+    if args.versions and len(args.versions) != 2:
+        parser.error('Provide exactly two versions, or none to diff every adjacent pair')
+
+    start = time.perf_counter()
+    versions = args.versions or request_flow_versions(args.output_dir)
+    if len(versions) < 2:
+        print(f"Error: Need at least two versions in {args.output_dir}")
+        return
+
+    flows = {}
+    for version in versions:
+        flow = load_request_flow(version, args.output_dir)
+        if flow is None:
+            print(f"Error: No request flow found for v{version}")
+            return
+        flows[version] = flow
+
+    diffs = [
+        diff_versions(old, flows[old], new, flows[new])
+        for old, new in zip(versions, versions[1:])
+    ]
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(diffs, indent=2, ensure_ascii=False))
+        return
+
+    dates = load_version_dates()
+    for diff in reversed(diffs):
+        print(format_diff(diff, dates.get(diff['new_version'], '')))
+    print(f"Compared {len(diffs)} version pair(s) in {elapsed * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
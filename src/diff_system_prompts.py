@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Block-level system prompt diffs between Claude Code versions.
+
+This script:
+1. Loads system_prompt_{version}.txt (or the blob store manifest) for each version
+2. Hashes every system block and aligns blocks by hash
+3. Runs a line-level (or paragraph-level) diff only on blocks that changed
+4. Reports a similarity ratio per version pair, like system_prompt_changelog.md
+
+Unchanged blocks never reach the sequence matcher, so a sweep over the full
+version history only pays for the blocks that actually changed.
+
+Usage:
+    python diff_system_prompts.py                  # All adjacent version pairs
+    python diff_system_prompts.py <old> <new>      # One version pair
+    python diff_system_prompts.py --paragraphs     # Diff by paragraph instead of line
+    python diff_system_prompts.py --summary        # Only the per-pair summary lines
+    python diff_system_prompts.py --json           # Machine-readable output
+
+Examples:
+    python diff_system_prompts.py 2.0.35 2.0.36
+    python diff_system_prompts.py --summary
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Any
+
+from blob_store import hash_blob
+from versions import SYSTEM_PROMPTS_DIR, load_system_blocks, system_prompt_versions
+
+
+def block_text(block: Dict[str, Any]) -> str:
+    """Comparable text of a block (JSON dump for non-text blocks, as in the .txt files)."""
+    if block.get('type') == 'text':
+        return block.get('text', '')
+    return json.dumps(block, indent=2)
+
+
+def block_hash(block: Dict[str, Any]) -> str:
+    """
+    Content hash of a block.
+
+    Text blocks hash only their text, so a block parsed from a .txt file and
+    the same block from a store manifest (with cache_control) compare equal.
+    """
+    if block.get('type') == 'text':
+        return hashlib.sha256(block.get('text', '').encode('utf-8')).hexdigest()
+    return hash_blob(block)
+
+
+def split_units(text: str, paragraphs: bool) -> List[str]:
+    """Split block text into diff units: lines, or blank-line separated paragraphs."""
+    if paragraphs:
+        return text.split('\n\n')
+    return text.split('\n')
+
+
+def diff_block(old_text: str, new_text: str, paragraphs: bool) -> Dict[str, Any]:
+    """Line/paragraph diff of one changed block."""
+    old_units = split_units(old_text, paragraphs)
+    new_units = split_units(new_text, paragraphs)
+    matcher = difflib.SequenceMatcher(None, old_units, new_units, autojunk=False)
+
+    changes = []
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == 'equal':
+            continue
+        changes.append({
+            'op': op,
+            'old': [i1 + 1, i2] if i2 > i1 else None,
+            'new': [j1 + 1, j2] if j2 > j1 else None,
+            'old_text': old_units[i1:i2],
+            'new_text': new_units[j1:j2]
+        })
+
+    matched = sum(block.size for block in matcher.get_matching_blocks())
+    return {
+        'changes': changes,
+        'matched': matched,
+        'total': len(old_units) + len(new_units)
+    }
+
+
+def diff_versions(old_version: str, old_blocks: List[Dict[str, Any]],
+                  new_version: str, new_blocks: List[Dict[str, Any]],
+                  paragraphs: bool = False) -> Dict[str, Any]:
+    """Structured diff between the system prompts of two versions."""
+    old_hashes = [block_hash(block) for block in old_blocks]
+    new_hashes = [block_hash(block) for block in new_blocks]
+
+    modified = []
+    added = []
+    removed = []
+    unchanged = 0
+    matched = 0
+    total = 0
+
+    # Align blocks by hash; unequal runs pair up positionally as modifications
+    aligner = difflib.SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+    for op, i1, i2, j1, j2 in aligner.get_opcodes():
+        if op == 'equal':
+            for i in range(i1, i2):
+                units = len(split_units(block_text(old_blocks[i]), paragraphs))
+                matched += 2 * units
+                total += 2 * units
+            unchanged += i2 - i1
+            continue
+
+        pairs = min(i2 - i1, j2 - j1)
+        for k in range(pairs):
+            old_block, new_block = old_blocks[i1 + k], new_blocks[j1 + k]
+            block_diff = diff_block(block_text(old_block), block_text(new_block), paragraphs)
+            matched += 2 * block_diff['matched']
+            total += block_diff['total']
+            modified.append({
+                'old_block': i1 + k + 1,
+                'new_block': j1 + k + 1,
+                'type': new_block.get('type', 'unknown'),
+                'changes': block_diff['changes']
+            })
+        for i in range(i1 + pairs, i2):
+            removed.append(i + 1)
+            total += len(split_units(block_text(old_blocks[i]), paragraphs))
+        for j in range(j1 + pairs, j2):
+            added.append(j + 1)
+            total += len(split_units(block_text(new_blocks[j]), paragraphs))
+
+    return {
+        'old_version': old_version,
+        'new_version': new_version,
+        'unit': 'paragraph' if paragraphs else 'line',
+        'blocks_added': added,
+        'blocks_removed': removed,
+        'blocks_modified': modified,
+        'blocks_unchanged': unchanged,
+        'similarity': matched / total if total else 1.0
+    }
+
+
+def summary_line(diff: Dict[str, Any]) -> str:
+    """One-line change summary, e.g. "1 block modified • 99.9% similar"."""
+    parts = []
+    for key, label in (('blocks_added', 'added'), ('blocks_removed', 'removed'), ('blocks_modified', 'modified')):
+        count = len(diff[key])
+        if count:
+            parts.append(f"{count} {'block' if count == 1 else 'blocks'} {label}")
+    if not parts:
+        return "No changes"
+    return f"{', '.join(parts)} • {diff['similarity'] * 100:.1f}% similar"
+
+
+def format_range(unit: str, unit_range: List[int]) -> str:
+    start, end = unit_range
+    label = unit.capitalize()
+    return f"{label} {start}" if start == end else f"{label}s {start}-{end}"
+
+
+def quote(units: List[str]) -> List[str]:
+    """Quote diff units line by line (paragraph units span several lines)."""
+    return [f"  > {line}" for unit in units for line in unit.split('\n')]
+
+
+def format_diff(diff: Dict[str, Any], summary_only: bool = False) -> str:
+    """Render a version pair diff as text (changelog-style)."""
+    if summary_only:
+        return f"v{diff['old_version']} → v{diff['new_version']}: {summary_line(diff)}"
+
+    lines = []
+    lines.append("=" * 120)
+    lines.append(f"SYSTEM PROMPT DIFF - v{diff['old_version']} → v{diff['new_version']}")
+    lines.append("=" * 120)
+    lines.append(f"Changes: {summary_line(diff)}")
+    lines.append("")
+
+    unit = diff['unit']
+    for index in diff['blocks_added']:
+        lines.append(f"➕ Added block {index}")
+    for index in diff['blocks_removed']:
+        lines.append(f"➖ Removed block {index}")
+    if diff['blocks_added'] or diff['blocks_removed']:
+        lines.append("")
+
+    for block in diff['blocks_modified']:
+        lines.append(f"### Block {block['new_block']} ({block['type'].upper()})")
+        lines.append("")
+        for change in block['changes']:
+            if change['op'] == 'insert':
+                lines.append(f"#### ➕ Added - {format_range(unit, change['new'])}")
+                lines.extend(quote(change['new_text']))
+            elif change['op'] == 'delete':
+                lines.append(f"#### ➖ Removed - {format_range(unit, change['old'])}")
+                lines.extend(quote(change['old_text']))
+            else:
+                lines.append(f"#### 🔄 Modified - {format_range(unit, change['new'])} "
+                             f"(was {format_range(unit, change['old']).lower()})")
+                lines.append("  **Before:**")
+                lines.extend(quote(change['old_text']))
+                lines.append("  **After:**")
+                lines.extend(quote(change['new_text']))
+            lines.append("")
+
+    return '\n'.join(lines)
+
+
+def main():
+    # Argument parsing
+    parser = argparse.ArgumentParser(
+        description='Diff system prompts between Claude Code versions, block by block',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s
+  %(prog)s 2.0.35 2.0.36
+  %(prog)s --summary
+  %(prog)s --paragraphs --json
+        """
+    )
+    parser.add_argument(
+        'versions',
+        nargs='*',
+        help='Two versions to compare (default: every adjacent pair)'
+    )
+    parser.add_argument(
+        '--paragraphs',
+        action='store_true',
+        help='Diff changed blocks by paragraph instead of by line'
+    )
+    parser.add_argument(
+        '--summary',
+        action='store_true',
+        help='Only print the one-line summary per version pair'
+    )
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help='Print structured diffs as JSON'
+    )
+    parser.add_argument(
+        '--output-dir',
+        type=Path,
+        default=SYSTEM_PROMPTS_DIR,
+        help=f'System prompts directory (default: {SYSTEM_PROMPTS_DIR})'
+    )
+
+    args = parser.parse_args()
+
+    if args.versions and len(args.versions) != 2:
+        parser.error('Provide exactly two versions, or none to diff every adjacent pair')
+
+    start = time.perf_counter()
+    versions = args.versions or system_prompt_versions(args.output_dir)
+    if len(versions) < 2:
+        print(f"Error: Need at least two versions in {args.output_dir}")
+        return
+
+    blocks = {}
+    for version in versions:
+        system = load_system_blocks(version, args.output_dir)
+        if system is None:
+            print(f"Error: No system prompt found for v{version}")
+            return
+        blocks[version] = system
+
+    diffs = [
+        diff_versions(old, blocks[old], new, blocks[new], args.paragraphs)
+        for old, new in zip(versions, versions[1:])
+    ]
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(diffs, indent=2))
+        return
+
+    for diff in reversed(diffs):
+        print(format_diff(diff, args.summary))
+    if args.summary:
+        print("")
+    print(f"Compared {len(diffs)} version pair(s) in {elapsed * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Structured tool definition diffs between Claude Code versions.
+
+This script:
+1. Loads tools_{version}.json (or the blob store manifest) for each version
+2. Matches tools by name and skips unchanged tools by hash
+3. Reports added/removed tools, added/removed/retyped/modified input_schema
+   properties, required field changes and changed description line ranges
+4. Diffs every adjacent version pair in one batch run (semantic-version order)
+
+Usage:
+    python diff_tools.py                      # All adjacent version pairs
+    python diff_tools.py <old> <new>          # One version pair
+    python diff_tools.py --include-mcp        # Also diff mcp__* tools
+    python diff_tools.py --json               # Machine-readable output
+
+Examples:
+    python diff_tools.py 2.0.35 2.0.36
+    python diff_tools.py --json > tool_diffs.json
+"""
+
+import argparse
+import difflib
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, Any
+
+from blob_store import hash_blob
+from versions import TOOLS_DIR, load_tools, tool_versions
+
+
+def is_mcp_tool(tool: Dict[str, Any]) -> bool:
+    return tool.get('name', '').startswith('mcp__')
+
+
+def schema_type(schema: Dict[str, Any]) -> str:
+    """Short type label for a JSON schema node."""
+    if 'type' in schema:
+        schema_t = schema['type']
+        return '|'.join(schema_t) if isinstance(schema_t, list) else str(schema_t)
+    if 'enum' in schema:
+        return 'enum'
+    for key in ('anyOf', 'oneOf', 'allOf'):
+        if key in schema:
+            return '|'.join(schema_type(option) for option in schema[key] if isinstance(option, dict))
+    return '?'
+
+
+def flatten_schema(schema: Dict[str, Any]) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
+    """
+    Flatten an input_schema into property paths.
+
+    Nested object properties use dots and array items use [] (e.g.
+    "todos[].status"). Returns ({path: property schema}, {required paths}).
+    """
+    properties = {}
+    required = set()
+
+    def walk(node: Any, prefix: str):
+        if not isinstance(node, dict):
+            return
+        for name in node.get('required', []):
+            required.add(prefix + name)
+        for name, prop in (node.get('properties') or {}).items():
+            properties[prefix + name] = prop
+            walk(prop, prefix + name + '.')
+        items = node.get('items')
+        if isinstance(items, dict):
+            walk(items, (prefix[:-1] if prefix else '') + '[].')
+
+    walk(schema, '')
+    return properties, required
+
+
+def own_fields(prop: Dict[str, Any]) -> Dict[str, Any]:
+    """Property schema without nested children (those are diffed by path)."""
+    return {key: value for key, value in prop.items() if key not in ('properties', 'items', 'required')}
+
+
+def line_ranges(old_lines: List[str], new_lines: List[str]) -> List[Dict[str, Any]]:
+    """Changed line ranges (1-based, inclusive) between two line lists."""
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    changes = []
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == 'equal':
+            continue
+        changes.append({
+            'op': op,
+            'old': [i1 + 1, i2] if i2 > i1 else None,
+            'new': [j1 + 1, j2] if j2 > j1 else None
+        })
+    return changes
+
+
+def tool_lines(tool: Dict[str, Any]) -> List[str]:
+    """Description and schema lines as rendered in tools_*.txt."""
+    return tool.get('description', '').split('\n') + json.dumps(tool.get('input_schema', {}), indent=2).split('\n')
+
+
+def diff_tool(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Structured diff of one tool present in both versions."""
+    old_props, old_required = flatten_schema(old.get('input_schema', {}))
+    new_props, new_required = flatten_schema(new.get('input_schema', {}))
+
+    retyped = []
+    modified = []
+    for path in sorted(old_props.keys() & new_props.keys()):
+        old_type, new_type = schema_type(old_props[path]), schema_type(new_props[path])
+        if old_type != new_type:
+            retyped.append({'property': path, 'old_type': old_type, 'new_type': new_type})
+            continue
+        old_fields, new_fields = own_fields(old_props[path]), own_fields(new_props[path])
+        if old_fields != new_fields:
+            keys = sorted(key for key in old_fields.keys() | new_fields.keys()
+                          if old_fields.get(key) != new_fields.get(key))
+            modified.append({'property': path, 'fields': keys})
+
+    old_desc = old.get('description', '').split('\n')
+    new_desc = new.get('description', '').split('\n')
+
+    return {
+        'name': new.get('name', 'unknown'),
+        'properties_added': [
+            {'property': path, 'type': schema_type(new_props[path])}
+            for path in sorted(new_props.keys() - old_props.keys())
+        ],
+        'properties_removed': [
+            {'property': path, 'type': schema_type(old_props[path])}
+            for path in sorted(old_props.keys() - new_props.keys())
+        ],
+        'properties_retyped': retyped,
+        'properties_modified': modified,
+        'required_added': sorted(new_required - old_required),
+        'required_removed': sorted(old_required - new_required),
+        'description_changes': line_ranges(old_desc, new_desc) if old_desc != new_desc else []
+    }
+
+
+def similarity(old_tools: List[Dict[str, Any]], new_tools: List[Dict[str, Any]],
+               old_hashes: Dict[str, str], new_hashes: Dict[str, str]) -> float:
+    """
+    Line similarity between two tool sets (2 * matched lines / total lines).
+
+    Unchanged tools count as fully matched without running a sequence matcher.
+    """
+    old_by_name = {tool.get('name', 'unknown'): tool for tool in old_tools}
+    new_by_name = {tool.get('name', 'unknown'): tool for tool in new_tools}
+
+    total = 0
+    matched = 0
+    for name in old_by_name.keys() | new_by_name.keys():
+        old_tool, new_tool = old_by_name.get(name), new_by_name.get(name)
+        old_lines = tool_lines(old_tool) if old_tool else []
+        new_lines = tool_lines(new_tool) if new_tool else []
+        total += len(old_lines) + len(new_lines)
+        if old_tool and new_tool:
+            if old_hashes[name] == new_hashes[name]:
+                matched += len(old_lines)
+            else:
+                matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+                matched += sum(block.size for block in matcher.get_matching_blocks())
+
+    return 2 * matched / total if total else 1.0
+
+
+def diff_versions(old_version: str, old_tools: List[Dict[str, Any]],
+                  new_version: str, new_tools: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Structured diff between the tool sets of two versions."""
+    old_hashes = {tool.get('name', 'unknown'): hash_blob(tool) for tool in old_tools}
+    new_hashes = {tool.get('name', 'unknown'): hash_blob(tool) for tool in new_tools}
+    old_by_name = {tool.get('name', 'unknown'): tool for tool in old_tools}
+
+    modified = []
+    unchanged = 0
+    for tool in new_tools:
+        name = tool.get('name', 'unknown')
+        if name not in old_hashes:
+            continue
+        # Hash first - unchanged tools never reach the schema/line diff
+        if old_hashes[name] == new_hashes[name]:
+            unchanged += 1
+            continue
+        modified.append(diff_tool(old_by_name[name], tool))
+
+    return {
+        'old_version': old_version,
+        'new_version': new_version,
+        'tools_added': [name for name in new_hashes if name not in old_hashes],
+        'tools_removed': [name for name in old_hashes if name not in new_hashes],
+        'tools_modified': modified,
+        'tools_unchanged': unchanged,
+        'similarity': similarity(old_tools, new_tools, old_hashes, new_hashes)
+    }
+
+
+def format_range(line_range: Optional[List[int]]) -> str:
+    start, end = line_range
+    return f"Line {start}" if start == end else f"Lines {start}-{end}"
+
+
+def format_diff(diff: Dict[str, Any]) -> str:
+    """Render a version pair diff as text (changelog-style)."""
+    lines = []
+    lines.append("=" * 120)
+    lines.append(f"TOOL DIFF - v{diff['old_version']} → v{diff['new_version']}")
+    lines.append("=" * 120)
+
+    summary = []
+    for key, label in (('tools_added', 'added'), ('tools_removed', 'removed'), ('tools_modified', 'modified')):
+        count = len(diff[key])
+        if count:
+            summary.append(f"{count} {'tool' if count == 1 else 'tools'} {label}")
+
+    if not summary:
+        lines.append("No changes")
+        lines.append("")
+        return '\n'.join(lines)
+
+    lines.append(f"Changes: {', '.join(summary)} • {diff['similarity'] * 100:.1f}% similar")
+    lines.append("")
+
+    for name in diff['tools_added']:
+        lines.append(f"➕ Added tool: {name}")
+    for name in diff['tools_removed']:
+        lines.append(f"➖ Removed tool: {name}")
+    if diff['tools_added'] or diff['tools_removed']:
+        lines.append("")
+
+    for tool in diff['tools_modified']:
+        lines.append(f"### Tool: {tool['name']}")
+        for prop in tool['properties_added']:
+            lines.append(f"  ➕ Property {prop['property']} ({prop['type']})")
+        for prop in tool['properties_removed']:
+            lines.append(f"  ➖ Property {prop['property']} ({prop['type']})")
+        for prop in tool['properties_retyped']:
+            lines.append(f"  🔄 Property {prop['property']}: {prop['old_type']} → {prop['new_type']}")
+        for prop in tool['properties_modified']:
+            lines.append(f"  🔄 Property {prop['property']}: {', '.join(prop['fields'])} changed")
+        for path in tool['required_added']:
+            lines.append(f"  ➕ Required: {path}")
+        for path in tool['required_removed']:
+            lines.append(f"  ➖ Required: {path}")
+        for change in tool['description_changes']:
+            if change['op'] == 'insert':
+                lines.append(f"  ➕ Description {format_range(change['new']).lower()} added")
+            elif change['op'] == 'delete':
+                lines.append(f"  ➖ Description {format_range(change['old']).lower()} removed")
+            else:
+                lines.append(f"  🔄 Description {format_range(change['new']).lower()} changed "
+                             f"(was {format_range(change['old']).lower()})")
+        lines.append("")
+
+    return '\n'.join(lines)
+
+
+def main():
+    # Argument parsing
+    parser = argparse.ArgumentParser(
+        description='Diff tool definitions between Claude Code versions',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s
+  %(prog)s 2.0.35 2.0.36
+  %(prog)s --include-mcp --json
+        """
+    )
+    parser.add_argument(
+        'versions',
+        nargs='*',
+        help='Two versions to compare (default: every adjacent pair)'
+    )
+    parser.add_argument(
+        '--include-mcp',
+        action='store_true',
+        help='Include mcp__* tools (excluded by default, like the changelog)'
+    )
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help='Print structured diffs as JSON'
+    )
+    parser.add_argument(
+        '--output-dir',
+        type=Path,
+        default=TOOLS_DIR,
+        help=f'Tool definitions directory (default: {TOOLS_DIR})'
+    )
+
+    args = parser.parse_args()
+
+    if args.versions and len(args.versions) != 2:
+        parser.error('Provide exactly two versions, or none to diff every adjacent pair')
+
+    start = time.perf_counter()
+    versions = args.versions or tool_versions(args.output_dir)
+    if len(versions) < 2:
+        print(f"Error: Need at least two versions in {args.output_dir}")
+        return
+
+    tool_sets = {}
+    for version in versions:
+        tools = load_tools(version, args.output_dir)
+        if tools is None:
+            print(f"Error: No tool definitions found for v{version}")
+            return
+        tool_sets[version] = tools if args.include_mcp else [t for t in tools if not is_mcp_tool(t)]
+
+    diffs = [
+        diff_versions(old, tool_sets[old], new, tool_sets[new])
+        for old, new in zip(versions, versions[1:])
+    ]
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(diffs, indent=2))
+        return
+
+    for diff in reversed(diffs):
+        print(format_diff(diff))
+    print(f"Compared {len(diffs)} version pair(s) in {elapsed * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Single-pass extraction engine for Claude Code trace files.
+
+This script:
+1. Reads each trace file once
+2. Feeds every entry to the registered extractor stages (tools, system
+   prompt, request flow, ...)
+3. Stops reading a trace as soon as every stage has what it needs
+4. Writes the same outputs as the standalone scripts (plus the structured
+   request_flow_{version}.json sidecar used by diff_request_flows.py)
+
+Usage:
+    python extract_engine.py <trace_file> [<trace_file> ...]
+    python extract_engine.py --all
+    python extract_engine.py --all --stages tools,system_prompt
+
+Examples:
+    python extract_engine.py .claude-trace/log-2025-10-31-21-48-26_2.0.5.jsonl
+    python extract_engine.py --all --stages request_flow
+"""
+
+import argparse
+from abc import ABC, abstractmethod
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, List, Any
+
+import extract_system_prompts
+import extract_tools
+import request_flow
+from trace_reader import SONNET_MESSAGE_MARKERS, find_traces, iter_entries, trace_version
+
+
+# Registered stage classes by name, in registration order
+STAGES: Dict[str, type] = {}
+
+
+def register_stage(cls: type) -> type:
+    """Class decorator that makes a stage available to the engine."""
+    STAGES[cls.name] = cls
+    return cls
+
+
+class ExtractorStage(ABC):
+    """
+    Base class for extractor stages.
+
+    One stage instance handles a whole batch run:
+    - wants(version): whether this stage still needs the version
+    - begin(trace_file, version): reset per-trace state before the first entry
+    - feed(idx, entry): consume one entry, return True once done
+    - end(trace_file, version): save outputs for the trace
+    - finalize(): write batch-level outputs such as metadata
+
+    markers: raw-byte markers every line the stage can match contains (see
+    trace_reader.iter_entries), or None if the stage needs every entry.
+    """
+
+    name = ''
+    output_dir = Path('output')
+    markers = None
+
+    def __init__(self):
+        self.versions_info = {}
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+    def wants(self, version: str) -> bool:
+        # Skip duplicates (keep first occurrence)
+        return version not in self.versions_info
+
+    def begin(self, trace_file: Path, version: str):
+        pass
+
+    @abstractmethod
+    def feed(self, idx: int, entry: Dict[str, Any]) -> bool:
+        pass
+
+    @abstractmethod
+    def end(self, trace_file: Path, version: str):
+        pass
+
+    def finalize(self):
+        pass
+
+
+@register_stage
+class ToolsStage(ExtractorStage):
+    """Tool definitions from the "Hi, what is your name?" Sonnet request."""
+
+    name = 'tools'
+    output_dir = Path('output/tool_definitions')
+    markers = SONNET_MESSAGE_MARKERS
+
+    def begin(self, trace_file: Path, version: str):
+        self.tools_data = None
+
+    def feed(self, idx: int, entry: Dict[str, Any]) -> bool:
+        self.tools_data = extract_tools.match_tools_entry(idx, entry)
+        return self.tools_data is not None
+
+    def end(self, trace_file: Path, version: str):
+        if not self.tools_data:
+            print(f"  ✗ [{self.name}] No tools found")
+            return
+        saved_files = extract_tools.save_tools_outputs(version, self.tools_data, self.output_dir)
+        self.versions_info[version] = extract_tools.build_version_info(trace_file, self.tools_data)
+        info = self.versions_info[version]
+        print(f"  ✓ [{self.name}] Extracted {info['tool_count']} tools "
+              f"({info['tool_count_no_mcp']} core), saved {len(saved_files)} files")
+
+    def finalize(self):
+        if self.versions_info:
+            metadata_file = extract_tools.save_metadata(self.versions_info, self.output_dir)
+            print(f"✓ [{self.name}] Saved metadata to {metadata_file}")
+
+
+@register_stage
+class SystemPromptStage(ExtractorStage):
+    """System prompt from the first non-warmup Sonnet request."""
+
+    name = 'system_prompt'
+    output_dir = Path('output/system_prompts')
+    markers = SONNET_MESSAGE_MARKERS
+
+    def begin(self, trace_file: Path, version: str):
+        self.prompt_data = None
+
+    def feed(self, idx: int, entry: Dict[str, Any]) -> bool:
+        self.prompt_data = extract_system_prompts.match_system_prompt_entry(idx, entry)
+        return self.prompt_data is not None
+
+    def end(self, trace_file: Path, version: str):
+        if not self.prompt_data:
+            print(f"  ✗ [{self.name}] No system prompt found")
+            return
+        output_file = extract_system_prompts.save_system_prompt(version, self.prompt_data, self.output_dir)
+        self.versions_info[version] = extract_system_prompts.build_version_info(trace_file, self.prompt_data)
+        print(f"  ✓ [{self.name}] Extracted {self.prompt_data['block_count']} blocks, saved {output_file.name}")
+
+    def finalize(self):
+        if self.versions_info:
+            metadata_file = extract_system_prompts.save_metadata(self.versions_info, self.output_dir)
+            print(f"✓ [{self.name}] Updated metadata in {metadata_file}")
+
+
+@register_stage
+class RequestFlowStage(ExtractorStage):
+    """
+    Full request flow report; needs every entry of the trace.
+
+    The report is streamed into request_flow_{version}.txt.partial as entries
+    are classified and renamed into place once the trace is done.
+    """
+
+    name = 'request_flow'
+    output_dir = Path('output/request_flows')
+
+    def begin(self, trace_file: Path, version: str):
+        self.output_file = self.output_dir / f"request_flow_{version}.txt"
+        self.partial_file = self.output_file.with_name(self.output_file.name + '.partial')
+        # Same content as `request_flow.py <trace> > request_flow_{version}.txt`
+        self.report = open(self.partial_file, 'w', encoding='utf-8')
+        self.report.write(f"Analyzing {trace_file.name}...\n")
+        self.analyzer = request_flow.RequestFlowAnalyzer(version, output=self.report)
+
+    def feed(self, idx: int, entry: Dict[str, Any]) -> bool:
+        self.analyzer.add_entry(idx, entry)
+        return False
+
+    def end(self, trace_file: Path, version: str):
+        self.analyzer.finish()
+        self.report.close()
+        output_file = self.partial_file.replace(self.output_file)
+        request_flow.save_flow_json(version, self.analyzer.flow, output_file.with_suffix('.json'))
+        self.versions_info[version] = {'trace_file': trace_file.name}
+        print(f"  ✓ [{self.name}] {self.analyzer.request_count} requests, "
+              f"{self.analyzer.turn_number} turns, saved {output_file.name}")
+
+
+def run_trace(trace_file: Path, stages: List[ExtractorStage]) -> int:
+    """
+    Read one trace file once, feeding every entry to the active stages.
+
+    If all active stages share the same markers, lines without them are
+    skipped before decoding. Returns the number of entries decoded.
+    """
+    version = trace_version(trace_file)
+
+    active = [stage for stage in stages if stage.wants(version)]
+    if not active:
+        print(f"⊘ Skipping {trace_file.name} - version {version} already extracted")
+        return 0
+
+    print(f"Processing {trace_file.name}...")
+    for stage in active:
+        stage.begin(trace_file, version)
+
+    pending = list(active)
+    entries_read = 0
+    markers = {stage.markers for stage in active}
+    markers = markers.pop() if len(markers) == 1 and None not in markers else ()
+    with closing(iter_entries(trace_file, markers)) as entries:
+        for idx, entry in entries:
+            entries_read += 1
+            pending = [stage for stage in pending if not stage.feed(idx, entry)]
+            if not pending:
+                break
+
+    for stage in active:
+        stage.end(trace_file, version)
+
+    return entries_read
+
+
+def main():
+    # Argument parsing
+    parser = argparse.ArgumentParser(
+        description='Run all extractors over Claude Code trace files in a single pass',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s .claude-trace/log-2025-10-31-21-48-26_2.0.5.jsonl
+  %(prog)s --all
+  %(prog)s --all --stages tools,system_prompt
+        """
+    )
+    parser.add_argument(
+        'trace_files',
+        nargs='*',
+        help='Trace file(s) to extract from'
+    )
+    parser.add_argument(
+        '--all',
+        action='store_true',
+        help='Extract from all trace files in .claude-trace/ directory'
+    )
+    parser.add_argument(
+        '--stages',
+        default=','.join(STAGES),
+        help=f"Comma-separated stages to run (default: {','.join(STAGES)})"
+    )
+
+    args = parser.parse_args()
+
+    stage_names = [name.strip() for name in args.stages.split(',') if name.strip()]
+    unknown = [name for name in stage_names if name not in STAGES]
+    if unknown or not stage_names:
+        print(f"Error: Unknown stage(s): {', '.join(unknown)}")
+        print(f"Available stages: {', '.join(STAGES)}")
+        return
+
+    # Determine which files to process
+    trace_dir = Path('.claude-trace')
+    if args.all:
+        if not trace_dir.exists():
+            print(f"Error: {trace_dir} directory not found")
+            return
+        trace_files = find_traces(trace_dir)
+        if not trace_files:
+            print(f"Error: No .jsonl(.gz/.xz/.bz2) files found in {trace_dir}")
+            return
+        print(f"Found {len(trace_files)} trace files")
+    elif args.trace_files:
+        trace_files = []
+        for arg in args.trace_files:
+            path = Path(arg)
+            if path.exists() and path.is_file():
+                trace_files.append(path)
+            else:
+                print(f"Warning: File not found or not a file: {arg}")
+        if not trace_files:
+            print("Error: No valid trace files found")
+            return
+        print(f"Processing {len(trace_files)} trace file(s)")
+    else:
+        parser.print_help()
+        print("\nError: Please provide at least one trace file or use --all flag")
+        return
+
+    print(f"Stages: {', '.join(stage_names)}")
+    print("")
+
+    stages = [STAGES[name]() for name in stage_names]
+
+    total_entries = 0
+    for trace_file in trace_files:
+        total_entries += run_trace(trace_file, stages)
+        print("")
+
+    for stage in stages:
+        stage.finalize()
+
+    print("")
+    print("=" * 80)
+    print("EXTRACTION SUMMARY")
+    print("=" * 80)
+    print(f"  Traces: {len(trace_files)}, entries decoded: {total_entries}")
+    for stage in stages:
+        versions = ', '.join(f"v{v}" for v in sorted(stage.versions_info)) or 'none'
+        print(f"  {stage.name}: {versions}")
+    print("")
+
+
+if __name__ == '__main__':
+    main()
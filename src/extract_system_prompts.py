@@ -10,28 +10,75 @@ This script:
 Usage:
     python extract_system_prompts.py trace_file1.jsonl [trace_file2.jsonl ...]
     python extract_system_prompts.py --all  # Extract all traces in .claude-trace/
+    python extract_system_prompts.py --all --jobs 8  # ...using 8 worker processes
+    python extract_system_prompts.py --all --no-cache  # Re-extract unchanged traces too
+    python extract_system_prompts.py --all --store-only  # Only write blobs + manifests
+    python extract_system_prompts.py trace_file.jsonl --entry 7  # Print the system prompt of entry 7
+    python extract_system_prompts.py --all --profile  # Stage timings and entry counters on stderr
+    python extract_system_prompts.py --all --profile-output prompts.prof  # ...plus cProfile stats
 """
 
 import argparse
 import json
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, Iterable, Optional, Tuple, Any
 
+import profiling
+from batch import first_match, map_traces, resolve_jobs
+from blob_store import save_system_manifest
+from extraction_cache import ExtractionCache
+from trace_index import read_entry
+from trace_reader import SONNET_MESSAGE_MARKERS, find_entry, find_traces, trace_version
 
-def load_jsonl(file_path: Path) -> List[Dict[str, Any]]:
-    """Load JSONL file into list of parsed entries."""
-    entries = []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            if line.strip():
-                entries.append(json.loads(line))
-    return entries
+
+def match_system_prompt_entry(idx: int, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Check a single trace entry for the first real (non-warmup) Sonnet request.
+
+    Returns the prompt dict described in extract_system_prompt() if the entry
+    matches, otherwise None.
+    """
+    url = entry.get('request', {}).get('url', '')
+    body = entry.get('request', {}).get('body')
+
+    if '/v1/messages' in url and body:
+        model = body.get('model', '')
+        system = body.get('system', [])
+        messages = body.get('messages', [])
+
+        # Get user message
+        user_msg = ''
+        for msg in messages:
+            if msg.get('role') == 'user':
+                content = msg.get('content', '')
+                if isinstance(content, str):
+                    user_msg = content
+                elif isinstance(content, list):
+                    for block in content:
+                        if block.get('type') == 'text':
+                            user_msg = block.get('text', '')
+                            break
+                break
+
+        # Skip warmup, look for first real prompt
+        if 'sonnet' in model.lower() and system and 'Warmup' not in user_msg:
+            return {
+                'entry_idx': idx,
+                'user_msg': user_msg,
+                'system': system,
+                'block_count': len(system)
+            }
+
+    return None
 
 
-def extract_system_prompt(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+def extract_system_prompt(entries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Extract system prompt from the first Sonnet message after warmup.
 
+    Entries are consumed lazily, so iteration stops at the first match.
+
     Returns dict with:
     - entry_idx: Index of the entry
     - user_msg: User message that triggered this
@@ -39,44 +86,54 @@ def extract_system_prompt(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
     - block_count: Number of blocks
     """
     for idx, entry in enumerate(entries):
-        url = entry.get('request', {}).get('url', '')
-        body = entry.get('request', {}).get('body')
-
-        if '/v1/messages' in url and body:
-            model = body.get('model', '')
-            system = body.get('system', [])
-            messages = body.get('messages', [])
-
-            # Get user message
-            user_msg = ''
-            for msg in messages:
-                if msg.get('role') == 'user':
-                    content = msg.get('content', '')
-                    if isinstance(content, str):
-                        user_msg = content
-                    elif isinstance(content, list):
-                        for block in content:
-                            if block.get('type') == 'text':
-                                user_msg = block.get('text', '')
-                                break
-                    break
-
-            # Skip warmup, look for first real prompt
-            if 'sonnet' in model.lower() and system and 'Warmup' not in user_msg:
-                return {
-                    'entry_idx': idx,
-                    'user_msg': user_msg,
-                    'system': system,
-                    'block_count': len(system)
-                }
+        prompt_data = match_system_prompt_entry(idx, entry)
+        if prompt_data:
+            return prompt_data
 
     return None
 
 
-def save_system_prompt(version: str, prompt_data: Dict[str, Any], output_dir: Path):
-    """Save system prompt to structured file."""
+def extract_system_prompt_from_file(trace_file: Path) -> Dict[str, Any]:
+    """
+    Extract the system prompt from a trace file (process pool worker).
+
+    Only lines that can hold a Sonnet /v1/messages request are decoded.
+    """
+    return find_entry(trace_file, SONNET_MESSAGE_MARKERS, match_system_prompt_entry)[1]
+
+
+def extract_system_prompt_from_chunk(trace_file: Path, byte_range: Optional[Tuple[int, int]]) -> Tuple[int, Optional[Dict[str, Any]]]:
+    """
+    Extract the system prompt from one chunk of a trace (batch.first_match() worker).
+
+    Returns (entries read, match); without a match that is every entry of
+    the chunk, counted in the same pass.
+    """
+    return find_entry(trace_file, SONNET_MESSAGE_MARKERS, match_system_prompt_entry, byte_range)
+
+
+def save_system_prompt(version: str, prompt_data: Dict[str, Any], output_dir: Path, store_only: bool = False):
+    """
+    Save system prompt to structured file.
+
+    Each distinct system block is also written once to the blob store and the
+    version gets a manifest of hashes. With store_only, only the manifest is
+    written (the full file can be rebuilt with blob_store.py).
+    """
+    manifest_file = save_system_manifest(version, prompt_data, output_dir)
+    if store_only:
+        return manifest_file
+
     output_file = output_dir / f"system_prompt_{version}.txt"
+    text = format_system_prompt(version, prompt_data)
+    with profiling.stage('write'), open(output_file, 'w', encoding='utf-8') as f:
+        f.write(text)
 
+    return output_file
+
+
+def format_system_prompt(version: str, prompt_data: Dict[str, Any]) -> str:
+    """Render a prompt dict in the system_prompt_{version}.txt layout."""
     lines = []
     lines.append("=" * 120)
     lines.append(f"SYSTEM PROMPT - Claude Code v{version}")
@@ -106,21 +163,34 @@ def save_system_prompt(version: str, prompt_data: Dict[str, Any], output_dir: Pa
     lines.append("END OF SYSTEM PROMPT")
     lines.append("=" * 120)
 
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(lines))
+    return '\n'.join(lines)
 
-    return output_file
 
+def build_version_info(trace_file: Path, prompt_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the metadata entry recorded for one extracted version."""
+    return {
+        'trace_file': trace_file.name,
+        'block_count': prompt_data['block_count'],
+        'entry_idx': prompt_data['entry_idx']
+    }
 
-def save_metadata(versions_info: Dict[str, Any], output_dir: Path):
-    """Update metadata about all extracted versions."""
-    metadata_file = output_dir / 'metadata.json'
 
-    # Load existing metadata if it exists
-    if metadata_file.exists():
+def read_metadata(metadata_file: Path) -> Optional[Dict[str, Any]]:
+    """Load an existing metadata.json, or None if it is missing or unreadable."""
+    try:
         with open(metadata_file, 'r', encoding='utf-8') as f:
-            metadata = json.load(f)
-    else:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_metadata(versions_info: Dict[str, Any], output_dir: Path) -> Dict[str, Any]:
+    """Existing metadata updated with the extracted versions, as saved to metadata.json."""
+    metadata_file = output_dir / 'metadata.json'
+
+    # Start from the existing metadata if there is one
+    metadata = read_metadata(metadata_file)
+    if metadata is None:
         metadata = {
             'versions': {},
             'extraction_order': []
@@ -139,12 +209,44 @@ def save_metadata(versions_info: Dict[str, Any], output_dir: Path):
     # Sort extraction order
     metadata['extraction_order'] = sorted(metadata['extraction_order'])
 
-    with open(metadata_file, 'w', encoding='utf-8') as f:
+    return metadata
+
+
+def save_metadata(versions_info: Dict[str, Any], output_dir: Path):
+    """Update metadata about all extracted versions."""
+    metadata = build_metadata(versions_info, output_dir)
+    metadata_file = output_dir / 'metadata.json'
+    with profiling.stage('write'), open(metadata_file, 'w', encoding='utf-8') as f:
         json.dump(metadata, f, indent=2)
 
     return metadata_file
 
 
+def print_entry_system_prompt(trace_file: Path, idx: int):
+    """Print the system prompt sent with one entry, read through the trace's .idx sidecar."""
+    try:
+        entry = read_entry(trace_file, idx)
+    except IndexError as e:
+        print(f"Error: {e}")
+        return
+
+    body = entry.get('request', {}).get('body')
+    system = body.get('system') if isinstance(body, dict) else None
+    if not system:
+        print(f"Error: Entry {idx} has no system prompt")
+        return
+    if isinstance(system, str):
+        system = [{'type': 'text', 'text': system}]
+
+    version = trace_version(trace_file)
+    prompt_data = {
+        'entry_idx': idx,
+        'system': system,
+        'block_count': len(system)
+    }
+    print(format_system_prompt(version, prompt_data))
+
+
 def main():
     # Argument parsing
     parser = argparse.ArgumentParser(
@@ -155,6 +257,9 @@ Examples:
   %(prog)s trace_2025-01-05_2.0.29.jsonl
   %(prog)s trace1.jsonl trace2.jsonl trace3.jsonl
   %(prog)s --all
+  %(prog)s --all --jobs 8
+  %(prog)s trace_2025-01-05_2.0.29.jsonl --entry 7
+  %(prog)s --all --profile
         """
     )
     parser.add_argument(
@@ -167,22 +272,70 @@ Examples:
         action='store_true',
         help='Extract from all trace files in .claude-trace/ directory'
     )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        metavar='N',
+        help='Number of worker processes (default: 1, 0 = one per CPU)'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Re-extract traces even if they are unchanged since the last run'
+    )
+    parser.add_argument(
+        '--store-only',
+        action='store_true',
+        help='Only write blob store manifests (rebuild full files with blob_store.py)'
+    )
+    parser.add_argument(
+        '--entry',
+        type=int,
+        metavar='N',
+        help='Print the system prompt of entry N of one trace (read through its .idx sidecar index)'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Report load/decode/extract/render/write timings and entry counters on stderr'
+    )
+    parser.add_argument(
+        '--profile-output',
+        type=Path,
+        metavar='FILE',
+        help='Also dump cProfile stats to FILE (implies --profile)'
+    )
 
     args = parser.parse_args()
 
+    if args.profile or args.profile_output:
+        profiling.enable(args.profile_output)
+
     # Setup
     trace_dir = Path('.claude-trace')
     output_dir = Path('output/system_prompts')
     output_dir.mkdir(parents=True, exist_ok=True)
 
+    if args.entry is not None:
+        if args.all or len(args.trace_files) != 1:
+            parser.error('--entry takes exactly one trace file')
+        trace_file = trace_dir / args.trace_files[0]
+        if not trace_file.exists():
+            print(f"Error: {trace_file} not found")
+            return
+        print_entry_system_prompt(trace_file, args.entry)
+        profiling.finish()
+        return
+
     # Determine which files to process
     if args.all:
         if not trace_dir.exists():
             print(f"Error: {trace_dir} directory not found")
             return
-        trace_files = sorted(trace_dir.glob('*.jsonl'))
+        trace_files = find_traces(trace_dir)
         if not trace_files:
-            print(f"Error: No .jsonl files found in {trace_dir}")
+            print(f"Error: No .jsonl(.gz/.xz/.bz2) files found in {trace_dir}")
             return
         print(f"Found {len(trace_files)} trace files")
         print("")
@@ -200,40 +353,75 @@ Examples:
         print("\nError: Please provide at least one trace file or use --all flag")
         return
 
-    # Extract from each file
+    # Traces whose size/mtime/hash are unchanged are skipped along with their writes
+    cache = ExtractionCache(output_dir, 'system_prompt', 'store-only' if args.store_only else 'full')
+    cached = {trace_file: None if args.no_cache else cache.lookup(trace_file) for trace_file in trace_files}
+
+    # Extract from each file (in parallel when --jobs > 1; results arrive in order).
+    # Later traces of a version already served from the cache would be skipped
+    # as duplicates, so they are not submitted at all.
+    to_extract = []
+    cached_versions = set()
+    for trace_file in trace_files:
+        record = cached[trace_file]
+        if record is not None and record['info']:
+            cached_versions.add(record['version'])
+        elif record is None and trace_version(trace_file) not in cached_versions:
+            to_extract.append(trace_file)
+    extract_set = set(to_extract)
+    if len(to_extract) == 1 and resolve_jobs(args.jobs) > 1:
+        # A single trace is split into chunks searched in parallel instead
+        results = map_traces(partial(first_match, extract_system_prompt_from_chunk, jobs=args.jobs), to_extract)
+    else:
+        results = map_traces(extract_system_prompt_from_file, to_extract, args.jobs)
     versions_info = {}
 
     for trace_file in trace_files:
         # Extract version from filename (last part after underscore)
-        version = trace_file.stem.split('_')[-1]
+        version = trace_version(trace_file)
+        record = cached[trace_file]
+        if trace_file in extract_set:
+            _, get_result = next(results)
 
         # Skip duplicates (keep first occurrence)
         if version in versions_info:
             print(f"⊘ Skipping {trace_file.name} - version {version} already extracted in this run")
             continue
 
+        if record is not None:
+            if record['info']:
+                versions_info[version] = record['info']
+            print(f"↺ Unchanged {trace_file.name} - using cached result")
+            continue
+
         print(f"Processing {trace_file.name}...")
-        entries = load_jsonl(trace_file)
-        prompt_data = extract_system_prompt(entries)
+        prompt_data = get_result()
 
         if prompt_data:
-            output_file = save_system_prompt(version, prompt_data, output_dir)
-            versions_info[version] = {
-                'trace_file': trace_file.name,
-                'block_count': prompt_data['block_count'],
-                'entry_idx': prompt_data['entry_idx']
-            }
+            with profiling.stage('render'):
+                output_file = save_system_prompt(version, prompt_data, output_dir, args.store_only)
+            versions_info[version] = build_version_info(trace_file, prompt_data)
             print(f"  ✓ Extracted {prompt_data['block_count']} blocks")
             print(f"  ✓ Saved to {output_file.name}")
+            cache.store(trace_file, version, versions_info[version], [output_file])
         else:
             print(f"  ✗ No system prompt found")
+            cache.store(trace_file, version, None, [])
 
         print("")
 
+    with profiling.stage('write'):
+        cache.save()
+
     # Save metadata
     if versions_info:
-        metadata_file = save_metadata(versions_info, output_dir)
-        print(f"✓ Updated metadata in {metadata_file.name}")
+        # Rewritten whenever this run's versions are not recorded as they are
+        metadata_file = output_dir / 'metadata.json'
+        if read_metadata(metadata_file) != build_metadata(versions_info, output_dir):
+            metadata_file = save_metadata(versions_info, output_dir)
+            print(f"✓ Updated metadata in {metadata_file.name}")
+        else:
+            print(f"✓ All traces unchanged - kept {metadata_file.name}")
         print("")
         print("=" * 80)
         print("EXTRACTION SUMMARY")
@@ -245,6 +433,8 @@ Examples:
     else:
         print("No system prompts extracted")
 
+    profiling.finish()
+
 
 if __name__ == '__main__':
     main()
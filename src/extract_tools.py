@@ -10,37 +10,92 @@ This script:
 
 Usage:
     python extract_tools.py <trace_file> [<trace_file> ...]
-    python extract_tools.py --extract-all
+    python extract_tools.py --extract-all [--jobs N] [--no-cache] [--store-only]
 
 Examples:
     python extract_tools.py .claude-trace/log-2025-10-31-21-48-26_2.0.5.jsonl
     python extract_tools.py .claude-trace/log-*_2.0.30.jsonl .claude-trace/log-*_2.0.31.jsonl
     python extract_tools.py --extract-all
+    python extract_tools.py --extract-all --jobs 8
+    python extract_tools.py --extract-all --no-cache  # Re-extract unchanged traces too
+    python extract_tools.py --extract-all --store-only  # Only write blobs + manifests
+    python extract_tools.py <trace_file> --entry 7  # Print the tools sent with entry 7
+    python extract_tools.py --extract-all --profile  # Stage timings and entry counters on stderr
+    python extract_tools.py --extract-all --profile-output tools.prof  # ...plus cProfile stats
 """
 
 import sys
 import json
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Optional, Tuple, Any
 
+import profiling
+from batch import first_match, map_traces, resolve_jobs
+from blob_store import save_tools_manifest
+from extraction_cache import ExtractionCache
+from trace_index import read_entry
+from trace_reader import SONNET_MESSAGE_MARKERS, find_entry, find_traces, trace_version
 
-def load_jsonl(file_path: Path) -> List[Dict[str, Any]]:
-    """Load JSONL file into list of parsed entries."""
-    entries = []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            if line.strip():
-                entries.append(json.loads(line))
-    return entries
 
+def match_tools_entry(idx: int, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Check a single trace entry for the "Hi, what is your name?" Sonnet request.
 
-def extract_tools(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    Returns the tools dict described in extract_tools() if the entry matches,
+    otherwise None.
+    """
+    url = entry.get('request', {}).get('url', '')
+    body = entry.get('request', {}).get('body')
+
+    if '/v1/messages' in url and body and isinstance(body, dict):
+        model = body.get('model', '')
+        tools = body.get('tools')
+        messages = body.get('messages', [])
+
+        if not tools:
+            return None
+
+        # Get user message
+        user_msg = ''
+        for msg in messages:
+            if msg.get('role') == 'user':
+                content = msg.get('content', '')
+                if isinstance(content, str):
+                    user_msg = content
+                elif isinstance(content, list):
+                    for block in content:
+                        if block.get('type') == 'text':
+                            text = block.get('text', '')
+                            # Look for the SIMPLE PROMPT
+                            if 'what is your name' in text.lower():
+                                user_msg = text
+                                break
+                break
+
+        # Look for Sonnet request with "Hi, what is your name?" prompt
+        if 'sonnet' in model.lower() and tools and 'what is your name' in user_msg.lower():
+            tool_names = [tool.get('name', 'unknown') for tool in tools]
+            return {
+                'entry_idx': idx,
+                'user_msg': user_msg,
+                'tools': tools,
+                'tool_count': len(tools),
+                'tool_names': tool_names
+            }
+
+    return None
+
+
+def extract_tools(entries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Extract tool definitions from the "Hi, what is your name?" prompt.
 
     This corresponds to the SIMPLE PROMPT from INSTRUCTIONS.md which should
     contain the full tool set for the version.
 
+    Entries are consumed lazily, so iteration stops at the first match.
+
     Returns dict with:
     - entry_idx: Index of the entry
     - user_msg: User message that triggered this
@@ -49,52 +104,44 @@ def extract_tools(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
     - tool_names: List of tool names
     """
     for idx, entry in enumerate(entries):
-        url = entry.get('request', {}).get('url', '')
-        body = entry.get('request', {}).get('body')
-
-        if '/v1/messages' in url and body and isinstance(body, dict):
-            model = body.get('model', '')
-            tools = body.get('tools')
-            messages = body.get('messages', [])
-
-            if not tools:
-                continue
-
-            # Get user message
-            user_msg = ''
-            for msg in messages:
-                if msg.get('role') == 'user':
-                    content = msg.get('content', '')
-                    if isinstance(content, str):
-                        user_msg = content
-                    elif isinstance(content, list):
-                        for block in content:
-                            if block.get('type') == 'text':
-                                text = block.get('text', '')
-                                # Look for the SIMPLE PROMPT
-                                if 'what is your name' in text.lower():
-                                    user_msg = text
-                                    break
-                    break
-
-            # Look for Sonnet request with "Hi, what is your name?" prompt
-            if 'sonnet' in model.lower() and tools and 'what is your name' in user_msg.lower():
-                tool_names = [tool.get('name', 'unknown') for tool in tools]
-                return {
-                    'entry_idx': idx,
-                    'user_msg': user_msg,
-                    'tools': tools,
-                    'tool_count': len(tools),
-                    'tool_names': tool_names
-                }
+        tools_data = match_tools_entry(idx, entry)
+        if tools_data:
+            return tools_data
 
     return None
 
 
+def extract_tools_from_file(trace_file: Path) -> Dict[str, Any]:
+    """
+    Extract tool definitions from a trace file (process pool worker).
+
+    Only lines that can hold a Sonnet /v1/messages request are decoded.
+    """
+    return find_entry(trace_file, SONNET_MESSAGE_MARKERS, match_tools_entry)[1]
+
+
+def extract_tools_from_chunk(trace_file: Path, byte_range: Optional[Tuple[int, int]]) -> Tuple[int, Optional[Dict[str, Any]]]:
+    """
+    Extract tool definitions from one chunk of a trace (batch.first_match() worker).
+
+    Returns (entries read, match); without a match that is every entry of
+    the chunk, counted in the same pass.
+    """
+    return find_entry(trace_file, SONNET_MESSAGE_MARKERS, match_tools_entry, byte_range)
+
+
 def save_tools(version: str, tools_data: Dict[str, Any], output_dir: Path):
     """Save tool definitions to structured file."""
     output_file = output_dir / f"tools_{version}.txt"
+    text = format_tools(version, tools_data)
+    with profiling.stage('write'), open(output_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+    return output_file
 
+
+def format_tools(version: str, tools_data: Dict[str, Any]) -> str:
+    """Render a tools dict in the tools_{version}.txt layout."""
     lines = []
     lines.append("=" * 120)
     lines.append(f"TOOL DEFINITIONS - Claude Code v{version}")
@@ -133,14 +180,21 @@ def save_tools(version: str, tools_data: Dict[str, Any], output_dir: Path):
     lines.append("END OF TOOL DEFINITIONS")
     lines.append("=" * 120)
 
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(lines))
+    return '\n'.join(lines)
 
-    return output_file
 
+def save_tools_json(version: str, tools_data: Dict[str, Any], output_dir: Path, store_only: bool = False):
+    """
+    Save tool definitions as JSON for easier programmatic access.
+
+    Each distinct tool definition is also written once to the blob store and
+    the version gets a manifest of hashes. With store_only, only the manifest
+    is written (the full file can be rebuilt with blob_store.py).
+    """
+    manifest_file = save_tools_manifest(version, tools_data, output_dir)
+    if store_only:
+        return manifest_file
 
-def save_tools_json(version: str, tools_data: Dict[str, Any], output_dir: Path):
-    """Save tool definitions as JSON for easier programmatic access."""
     output_file = output_dir / f"tools_{version}.json"
 
     # Create a clean structure for JSON output
@@ -151,7 +205,7 @@ def save_tools_json(version: str, tools_data: Dict[str, Any], output_dir: Path):
         'tools': tools_data['tools']
     }
 
-    with open(output_file, 'w', encoding='utf-8') as f:
+    with profiling.stage('write'), open(output_file, 'w', encoding='utf-8') as f:
         json.dump(tools_json, f, indent=2)
 
     return output_file
@@ -205,7 +259,7 @@ def save_tools_no_mcp(version: str, tools_data: Dict[str, Any], output_dir: Path
     lines.append("END OF TOOL DEFINITIONS")
     lines.append("=" * 120)
 
-    with open(output_file, 'w', encoding='utf-8') as f:
+    with profiling.stage('write'), open(output_file, 'w', encoding='utf-8') as f:
         f.write('\n'.join(lines))
 
     return output_file
@@ -230,14 +284,51 @@ def save_tools_no_mcp_json(version: str, tools_data: Dict[str, Any], output_dir:
         'note': 'MCP tools excluded'
     }
 
-    with open(output_file, 'w', encoding='utf-8') as f:
+    with profiling.stage('write'), open(output_file, 'w', encoding='utf-8') as f:
         json.dump(tools_json, f, indent=2)
 
     return output_file
 
 
-def save_metadata(versions_info: Dict[str, Any], output_dir: Path):
-    """Save metadata about all extracted versions."""
+def save_tools_outputs(version: str, tools_data: Dict[str, Any], output_dir: Path,
+                       store_only: bool = False) -> List[Path]:
+    """Save all formats: text, JSON, no-MCP text, and no-MCP JSON (or just the store manifest)."""
+    with profiling.stage('render'):
+        if store_only:
+            return [save_tools_json(version, tools_data, output_dir, store_only=True)]
+        return [
+            save_tools(version, tools_data, output_dir),
+            save_tools_json(version, tools_data, output_dir),
+            save_tools_no_mcp(version, tools_data, output_dir),
+            save_tools_no_mcp_json(version, tools_data, output_dir),
+        ]
+
+
+def build_version_info(trace_file: Path, tools_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the metadata entry recorded for one extracted version."""
+    # Count tools excluding MCP
+    non_mcp_count = len([t for t in tools_data['tools'] if not t.get('name', '').startswith('mcp__')])
+
+    return {
+        'trace_file': trace_file.name,
+        'tool_count': tools_data['tool_count'],
+        'tool_count_no_mcp': non_mcp_count,
+        'tool_names': tools_data['tool_names'],
+        'entry_idx': tools_data['entry_idx']
+    }
+
+
+def read_metadata(metadata_file: Path) -> Optional[Dict[str, Any]]:
+    """Load an existing metadata.json, or None if it is missing or unreadable."""
+    try:
+        with open(metadata_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_metadata(versions_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Metadata about all extracted versions, as saved to metadata.json."""
     metadata = {
         'versions': {},
         'extraction_order': []
@@ -253,48 +344,128 @@ def save_metadata(versions_info: Dict[str, Any], output_dir: Path):
         }
         metadata['extraction_order'].append(version)
 
+    return metadata
+
+
+def save_metadata(versions_info: Dict[str, Any], output_dir: Path):
+    """Save metadata about all extracted versions."""
     metadata_file = output_dir / 'metadata.json'
-    with open(metadata_file, 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, indent=2)
+    with profiling.stage('write'), open(metadata_file, 'w', encoding='utf-8') as f:
+        json.dump(build_metadata(versions_info), f, indent=2)
 
     return metadata_file
 
 
+def print_extraction_result(info: Dict[str, Any], saved_files: List[Path]):
+    """Print the per-trace extraction lines for one version."""
+    non_mcp_count = info['tool_count_no_mcp']
+    print(f"  ✓ Extracted {info['tool_count']} tools ({non_mcp_count} core, {info['tool_count'] - non_mcp_count} MCP)")
+    print(f"  ✓ Saved {len(saved_files)} files: {', '.join(f.name for f in saved_files)}")
+
+
+def print_entry_tools(trace_file: Path, idx: int):
+    """Print the tool definitions sent with one entry, read through the trace's .idx sidecar."""
+    try:
+        entry = read_entry(trace_file, idx)
+    except IndexError as e:
+        print(f"Error: {e}")
+        return
+
+    body = entry.get('request', {}).get('body')
+    tools = body.get('tools') if isinstance(body, dict) else None
+    if not tools:
+        print(f"Error: Entry {idx} has no tool definitions")
+        return
+
+    version = trace_version(trace_file)
+    tools_data = {
+        'entry_idx': idx,
+        'tools': tools,
+        'tool_count': len(tools),
+        'tool_names': [tool.get('name', 'unknown') for tool in tools]
+    }
+    print(format_tools(version, tools_data))
+
+
 def main():
     # Setup
     output_dir = Path('output/tool_definitions')
     output_dir.mkdir(parents=True, exist_ok=True)
 
     # Parse command-line arguments
-    if len(sys.argv) < 2:
+    args = sys.argv[1:]
+    jobs = 1
+    if '--jobs' in args:
+        pos = args.index('--jobs')
+        try:
+            jobs = int(args[pos + 1])
+        except (IndexError, ValueError):
+            print("Error: --jobs requires an integer (0 = one worker per CPU)")
+            return
+        del args[pos:pos + 2]
+    entry = None
+    if '--entry' in args:
+        pos = args.index('--entry')
+        try:
+            entry = int(args[pos + 1])
+        except (IndexError, ValueError):
+            print("Error: --entry requires an entry number")
+            return
+        del args[pos:pos + 2]
+    profile_output = None
+    if '--profile-output' in args:
+        pos = args.index('--profile-output')
+        if pos + 1 >= len(args):
+            print("Error: --profile-output requires a file name")
+            return
+        profile_output = Path(args[pos + 1])
+        del args[pos:pos + 2]
+    use_cache = '--no-cache' not in args
+    store_only = '--store-only' in args
+    if '--profile' in args or profile_output:
+        profiling.enable(profile_output)
+    args = [arg for arg in args if arg not in ('--no-cache', '--store-only', '--profile')]
+
+    if not args:
         print("Error: No trace files specified")
         print("")
         print("Usage:")
         print("  python extract_tools.py <trace_file> [<trace_file> ...]")
-        print("  python extract_tools.py --extract-all")
+        print("  python extract_tools.py --extract-all [--jobs N] [--no-cache] [--store-only]")
+        print("  python extract_tools.py --extract-all --profile [--profile-output FILE]  # Stage timings on stderr")
+        print("  python extract_tools.py <trace_file> --entry N     # Print the tools sent with entry N")
         print("")
         print("Examples:")
         print("  python extract_tools.py .claude-trace/log-2025-10-31-21-48-26_2.0.5.jsonl")
         print("  python extract_tools.py .claude-trace/log-*_2.0.30.jsonl")
         print("  python extract_tools.py --extract-all")
+        print("  python extract_tools.py --extract-all --jobs 8")
+        return
+
+    if entry is not None:
+        if len(args) != 1 or args[0] == '--extract-all' or not Path(args[0]).is_file():
+            print("Error: --entry requires exactly one existing trace file")
+            return
+        print_entry_tools(Path(args[0]), entry)
+        profiling.finish()
         return
 
     # Determine which files to process
     trace_files = []
 
-    if sys.argv[1] == '--extract-all':
+    if args[0] == '--extract-all':
         trace_dir = Path('.claude-trace')
         if not trace_dir.exists():
             print(f"Error: {trace_dir} directory not found")
             return
-        trace_files = sorted(trace_dir.glob('*.jsonl'))
+        trace_files = find_traces(trace_dir)
         if not trace_files:
-            print(f"Error: No .jsonl files found in {trace_dir}")
+            print(f"Error: No .jsonl(.gz/.xz/.bz2) files found in {trace_dir}")
             return
         print(f"Found {len(trace_files)} trace files")
     else:
         # Process specific files from arguments
-        for arg in sys.argv[1:]:
+        for arg in args:
             path = Path(arg)
             if path.exists() and path.is_file():
                 trace_files.append(path)
@@ -309,50 +480,73 @@ def main():
 
     print("")
 
-    # Extract from each file
+    # Traces whose size/mtime/hash are unchanged are skipped along with their writes
+    cache = ExtractionCache(output_dir, 'tools', 'store-only' if store_only else 'full')
+    cached = {trace_file: cache.lookup(trace_file) if use_cache else None for trace_file in trace_files}
+
+    # Extract from each file (in parallel when --jobs > 1; results arrive in order).
+    # Later traces of a version already served from the cache would be skipped
+    # as duplicates, so they are not submitted at all.
+    to_extract = []
+    cached_versions = set()
+    for trace_file in trace_files:
+        record = cached[trace_file]
+        if record is not None and record['info']:
+            cached_versions.add(record['version'])
+        elif record is None and trace_version(trace_file) not in cached_versions:
+            to_extract.append(trace_file)
+    extract_set = set(to_extract)
+    if len(to_extract) == 1 and resolve_jobs(jobs) > 1:
+        # A single trace is split into chunks searched in parallel instead
+        results = map_traces(partial(first_match, extract_tools_from_chunk, jobs=jobs), to_extract)
+    else:
+        results = map_traces(extract_tools_from_file, to_extract, jobs)
     versions_info = {}
 
     for trace_file in trace_files:
         # Extract version from filename (last part after underscore)
-        version = trace_file.stem.split('_')[-1]
+        version = trace_version(trace_file)
+        record = cached[trace_file]
+        if trace_file in extract_set:
+            _, get_result = next(results)
 
         # Skip duplicates (keep first occurrence)
         if version in versions_info:
             print(f"⊘ Skipping {trace_file.name} - version {version} already extracted")
             continue
 
+        if record is not None:
+            if record['info']:
+                versions_info[version] = record['info']
+            print(f"↺ Unchanged {trace_file.name} - using cached result")
+            continue
+
         print(f"Processing {trace_file.name}...")
-        entries = load_jsonl(trace_file)
-        tools_data = extract_tools(entries)
+        tools_data = get_result()
 
         if tools_data:
-            # Save all formats: text, JSON, no-MCP text, and no-MCP JSON
-            txt_file = save_tools(version, tools_data, output_dir)
-            json_file = save_tools_json(version, tools_data, output_dir)
-            no_mcp_txt_file = save_tools_no_mcp(version, tools_data, output_dir)
-            no_mcp_json_file = save_tools_no_mcp_json(version, tools_data, output_dir)
-
-            # Count tools excluding MCP
-            non_mcp_count = len([t for t in tools_data['tools'] if not t.get('name', '').startswith('mcp__')])
-
-            versions_info[version] = {
-                'trace_file': trace_file.name,
-                'tool_count': tools_data['tool_count'],
-                'tool_count_no_mcp': non_mcp_count,
-                'tool_names': tools_data['tool_names'],
-                'entry_idx': tools_data['entry_idx']
-            }
-            print(f"  ✓ Extracted {tools_data['tool_count']} tools ({non_mcp_count} core, {tools_data['tool_count'] - non_mcp_count} MCP)")
-            print(f"  ✓ Saved 4 files: {txt_file.name}, {json_file.name}, {no_mcp_txt_file.name}, {no_mcp_json_file.name}")
+            saved_files = save_tools_outputs(version, tools_data, output_dir, store_only)
+            versions_info[version] = build_version_info(trace_file, tools_data)
+            print_extraction_result(versions_info[version], saved_files)
+            cache.store(trace_file, version, versions_info[version], saved_files)
         else:
             print(f"  ✗ No tools found")
+            cache.store(trace_file, version, None, [])
 
         print("")
 
+    with profiling.stage('write'):
+        cache.save()
+
     # Save metadata
     if versions_info:
-        metadata_file = save_metadata(versions_info, output_dir)
-        print(f"✓ Saved metadata to {metadata_file.name}")
+        # Rewritten whenever the versions differ, e.g. after a trace was removed
+        metadata_file = output_dir / 'metadata.json'
+        if read_metadata(metadata_file) != build_metadata(versions_info):
+            metadata_file = save_metadata(versions_info, output_dir)
+            print(f"✓ Saved metadata to {metadata_file.name}")
+        else:
+            print(f"✓ All traces unchanged - kept {metadata_file.name}")
         print("")
         print("=" * 80)
         print("EXTRACTION SUMMARY")
@@ -367,6 +561,8 @@ def main():
     else:
         print("No tools extracted")
 
+    profiling.finish()
+
 
 if __name__ == '__main__':
     main()
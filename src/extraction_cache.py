@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Incremental extraction cache for the batch extractors.
+
+Each output directory (e.g. output/tool_definitions/) gets a cache.json
+manifest next to its metadata.json. For every trace it records the trace's
+size, mtime and SHA-256 content hash, the version metadata it produced and
+the output files written. A trace whose key is unchanged and whose outputs
+still exist is skipped entirely - no parsing and no writes.
+
+The size and mtime are checked first. The content hash is only recomputed
+when the mtime changed (e.g. after a copy or touch), so an unchanged archive
+costs one stat() per trace.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+import profiling
+
+
+CACHE_FILENAME = 'cache.json'
+
+# Bump when extraction logic changes so stale results are re-extracted
+CACHE_FORMAT = 1
+
+
+def hash_file(file_path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with profiling.stage('cache'), open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Persistent per-trace cache manifest for one output directory."""
+
+    def __init__(self, output_dir: Path, extractor: str, mode: str = 'full'):
+        self.output_dir = output_dir
+        self.extractor = extractor
+        # Output mode (e.g. 'full' or 'store-only'); records from another mode miss
+        self.mode = mode
+        self.cache_file = output_dir / CACHE_FILENAME
+        self.traces = {}
+        self.dirty = False
+
+        if self.cache_file.exists():
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                data = {}
+            if data.get('format') == CACHE_FORMAT and data.get('extractor') == extractor:
+                self.traces = data.get('traces', {})
+
+    def lookup(self, trace_file: Path) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached record for an unchanged trace, or None.
+
+        The record contains 'version', 'info' (None if nothing was extracted)
+        and 'outputs' (paths relative to the output directory).
+        """
+        record = self.traces.get(str(trace_file))
+        if not record or record.get('mode') != self.mode:
+            return None
+
+        stat = trace_file.stat()
+        if stat.st_size != record['size']:
+            return None
+
+        if stat.st_mtime_ns != record['mtime_ns']:
+            # Touched or copied - fall back to comparing content
+            if hash_file(trace_file) != record['sha256']:
+                return None
+            record['mtime_ns'] = stat.st_mtime_ns
+            self.dirty = True
+
+        if not all((self.output_dir / name).exists() for name in record['outputs']):
+            return None
+
+        return record
+
+    def store(self, trace_file: Path, version: str, info: Optional[Dict[str, Any]], outputs: List[Path]):
+        """Record the result of extracting a trace."""
+        stat = trace_file.stat()
+        self.traces[str(trace_file)] = {
+            'version': version,
+            'mode': self.mode,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': hash_file(trace_file),
+            'info': info,
+            'outputs': [output.relative_to(self.output_dir).as_posix() for output in outputs]
+        }
+        self.dirty = True
+
+    def save(self) -> Optional[Path]:
+        """Write the manifest if anything changed."""
+        if not self.dirty:
+            return None
+
+        data = {
+            'format': CACHE_FORMAT,
+            'extractor': self.extractor,
+            'traces': dict(sorted(self.traces.items()))
+        }
+        with open(self.cache_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+        self.dirty = False
+        return self.cache_file
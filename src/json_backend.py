@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+JSON backend for trace parsing.
+
+Every trace line (and every response body) is decoded through loads(), which
+takes str, bytes or a memoryview (trace_reader passes memory-mapped lines).
+When orjson is installed it is used - it is several times faster than the
+stdlib on the large request bodies in traces - otherwise the stdlib json
+module is.
+orjson is an optional dependency; nothing else changes when it is missing.
+
+orjson is stricter than the stdlib (no NaN/Infinity, no lone UTF-16
+surrogate escapes such as "\ud83d" - which traces do contain when a
+truncated string splits an emoji pair), so a document it rejects is retried
+with the stdlib when it could be valid there: both
+backends accept and reject the same input, and errors are always a
+json.JSONDecodeError (orjson's error subclasses it) or a TypeError. The only
+differences left are numbers outside the 64-bit range (orjson decodes huge
+integers as floats and rejects float overflow like 1e999); traces contain
+none.
+
+dumps() encodes compact UTF-8 bytes for content hashes that are only
+compared within one run (request_flow.py message digests), with the same
+backend as loads(). Its output may differ between backends (e.g. in float
+formatting), so anything stored uses blob_store.encode_blob() instead.
+orjson cannot encode lone surrogates either; those objects are encoded by
+the stdlib with surrogatepass.
+
+Set TRACE_JSON_BACKEND=json to force the stdlib backend.
+"""
+
+import json
+import os
+import re
+from typing import Callable, Dict, Union, Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+JSONDecodeError = json.JSONDecodeError
+
+# What only the stdlib accepts: NaN/Infinity and surrogate escapes (\ud800-\udfff)
+STDLIB_ONLY = re.compile(r'NaN|Infinity|\\u[dD][89a-fA-F]')
+STDLIB_ONLY_BYTES = re.compile(STDLIB_ONLY.pattern.encode())
+
+
+def _json_loads(data: Union[bytes, str, memoryview]) -> Any:
+    # The stdlib only takes str/bytes; trace_reader passes memoryview slices
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def _orjson_loads(data: Union[bytes, str, memoryview]) -> Any:
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        # Retry only what the stdlib might accept (NaN/Infinity, lone
+        # surrogates) or reports differently (non-string input raises
+        # TypeError). Other errors - e.g. SSE response bodies - are raised as
+        # is, without a second parse.
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        if isinstance(data, str):
+            retry = STDLIB_ONLY.search(data) is not None
+        elif isinstance(data, (bytes, bytearray)):
+            retry = STDLIB_ONLY_BYTES.search(data) is not None
+        else:
+            retry = True
+        if retry:
+            return json.loads(data)
+        raise
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8', 'surrogatepass')
+
+
+def _orjson_dumps(obj: Any) -> bytes:
+    try:
+        return orjson.dumps(obj)
+    except TypeError:
+        # Lone surrogates and integers beyond 64 bits (orjson.JSONEncodeError
+        # subclasses TypeError)
+        return _json_dumps(obj)
+
+
+# Available backends by name, fastest first
+BACKENDS: Dict[str, Callable[[Union[bytes, str, memoryview]], Any]] = {}
+ENCODERS: Dict[str, Callable[[Any], bytes]] = {}
+if orjson is not None:
+    BACKENDS['orjson'] = _orjson_loads
+    ENCODERS['orjson'] = _orjson_dumps
+BACKENDS['json'] = _json_loads
+ENCODERS['json'] = _json_dumps
+
+BACKEND = os.environ.get('TRACE_JSON_BACKEND', next(iter(BACKENDS)))
+if BACKEND not in BACKENDS:
+    BACKEND = 'json'
+
+loads = BACKENDS[BACKEND]
+dumps = ENCODERS[BACKEND]
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Stage timings and counters for the extraction scripts (--profile).
+
+The scripts mark their stages with profiling.stage(name) and their work with
+profiling.count(name, n):
+
+    cache     hashing traces for the extraction cache (extraction_cache)
+    load      reading trace lines and the raw-byte prefilter (trace_reader)
+    decode    JSON decoding of entries and response bodies
+    extract   matching entries (extract_tools / extract_system_prompts)
+    classify  classifying requests and building sections (request_flow)
+    render    formatting output files / reports
+    write     writing output files
+
+Stages nest; time is charged to the innermost stage only, so the stage
+times add up to the instrumented part of the run. When profiling is off,
+stage() and count() cost one attribute check, so the calls stay in place.
+
+Worker processes (--jobs N) profile their own traces and batch.map_traces
+merges their timings and counters into the parent's report; stage times are
+then summed over workers and can exceed the wall time.
+
+enable(output_file) additionally runs cProfile over the whole run and dumps
+its stats to output_file (view with snakeviz, or render a flamegraph with
+flameprof / gprof2dot).
+"""
+
+import cProfile
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional, Any
+
+
+STAGES = ['cache', 'load', 'decode', 'extract', 'classify', 'render', 'write']
+
+COUNTERS = ['bytes read', 'entries scanned', 'entries decoded', 'entries skipped']
+
+
+class Profile:
+    """Exclusive stage timer and counters of one process."""
+
+    def __init__(self):
+        self.enabled = False
+        self.times: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.stack = []
+        self.started = 0.0
+        self.profiler: Optional[cProfile.Profile] = None
+        self.output_file: Optional[Path] = None
+
+    def reset(self):
+        self.times = {}
+        self.counters = {}
+        self.stack = []
+        self.started = time.perf_counter()
+
+    def push(self, name: str):
+        now = time.perf_counter()
+        if self.stack:
+            outer, since = self.stack[-1]
+            self.times[outer] = self.times.get(outer, 0.0) + now - since
+        self.stack.append((name, now))
+
+    def pop(self):
+        now = time.perf_counter()
+        name, since = self.stack.pop()
+        self.times[name] = self.times.get(name, 0.0) + now - since
+        if self.stack:
+            self.stack[-1] = (self.stack[-1][0], now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {'times': dict(self.times), 'counters': dict(self.counters)}
+
+    def merge(self, snapshot: Dict[str, Any]):
+        """Add a worker process's snapshot() to this profile."""
+        for name, seconds in snapshot['times'].items():
+            self.times[name] = self.times.get(name, 0.0) + seconds
+        for name, value in snapshot['counters'].items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+
+PROFILE = Profile()
+
+
+class Stage:
+    """Context manager charging the time spent inside it to one stage."""
+
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        if PROFILE.enabled:
+            PROFILE.push(self.name)
+
+    def __exit__(self, *exc):
+        if PROFILE.enabled:
+            PROFILE.pop()
+        return False
+
+
+_stages: Dict[str, Stage] = {}
+
+
+def stage(name: str) -> Stage:
+    """Context manager for a named stage, e.g. `with stage('decode'):`."""
+    found = _stages.get(name)
+    if found is None:
+        found = _stages[name] = Stage(name)
+    return found
+
+
+def count(name: str, n: int = 1):
+    """Add n to a counter (no-op unless profiling is enabled)."""
+    if PROFILE.enabled:
+        PROFILE.counters[name] = PROFILE.counters.get(name, 0) + n
+
+
+def enabled() -> bool:
+    return PROFILE.enabled
+
+
+def enable(output_file: Optional[Path] = None):
+    """Start profiling this run; with output_file, also run cProfile."""
+    PROFILE.enabled = True
+    PROFILE.reset()
+    PROFILE.output_file = output_file
+    if output_file:
+        PROFILE.profiler = cProfile.Profile()
+        PROFILE.profiler.enable()
+
+
+def run_in_worker(worker, *args):
+    """Run a batch worker with profiling on; returns (result, snapshot) for the parent."""
+    if PROFILE.profiler is not None:
+        # Inherited from the parent by fork - the parent profiles itself
+        PROFILE.profiler.disable()
+        PROFILE.profiler = None
+    PROFILE.enabled = True
+    PROFILE.reset()
+    result = worker(*args)
+    return result, PROFILE.snapshot()
+
+
+def format_bytes(size: int) -> str:
+    for unit, scale in (('GB', 1e9), ('MB', 1e6), ('KB', 1e3)):
+        if size >= scale:
+            return f"{size / scale:.1f} {unit}"
+    return f"{size} B"
+
+
+def report() -> str:
+    """Stage timings and counters as a text table."""
+    wall = time.perf_counter() - PROFILE.started
+    times = PROFILE.times
+    instrumented = sum(times.values())
+    names = [name for name in STAGES if name in times] + sorted(set(times) - set(STAGES))
+
+    lines = []
+    lines.append("=" * 80)
+    lines.append("PROFILE")
+    lines.append("=" * 80)
+    lines.append(f"  {'Stage':12s} {'Time':>12s} {'Share':>8s}")
+    lines.append("  " + "-" * 34)
+    for name in names:
+        share = times[name] / wall * 100 if wall else 0
+        lines.append(f"  {name:12s} {times[name] * 1000:10.1f}ms {share:7.1f}%")
+    if instrumented <= wall:
+        other = wall - instrumented
+        lines.append(f"  {'other':12s} {other * 1000:10.1f}ms {other / wall * 100 if wall else 0:7.1f}%")
+    else:
+        lines.append("  (stage times are summed over worker processes)")
+    lines.append(f"  {'wall':12s} {wall * 1000:10.1f}ms")
+    lines.append("")
+
+    counters = PROFILE.counters
+    names = [name for name in COUNTERS if name in counters] + sorted(set(counters) - set(COUNTERS))
+    for name in names:
+        value = format_bytes(counters[name]) if name == 'bytes read' else str(counters[name])
+        lines.append(f"  {name:16s} {value:>12s}")
+    parse_time = times.get('load', 0.0) + times.get('decode', 0.0)
+    if 'bytes read' in counters and parse_time:
+        lines.append(f"  {'load+decode':16s} {counters['bytes read'] / 1e6 / parse_time:>9.1f} MB/s")
+    lines.append("")
+    return '\n'.join(lines)
+
+
+def finish():
+    """Print the report to stderr and dump the cProfile stats if requested."""
+    if not PROFILE.enabled:
+        return
+    if PROFILE.profiler is not None:
+        PROFILE.profiler.disable()
+        PROFILE.profiler.dump_stats(str(PROFILE.output_file))
+    print(report(), file=sys.stderr)
+    if PROFILE.profiler is not None:
+        print(f"✓ Saved cProfile stats to {PROFILE.output_file}", file=sys.stderr)
+    PROFILE.enabled = False
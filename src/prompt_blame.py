@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Blame for system prompts and tool descriptions: the version that introduced
+or last changed each line of the newest version.
+
+This script:
+1. Walks the versions in semantic-version order, carrying each line's origin
+   version through the diff of every adjacent version pair: system blocks
+   are aligned by hash and only changed blocks are line-diffed; tool
+   descriptions are matched by tool name and only changed ones are diffed
+2. Caches the blame of the newest version (output/prompt_blame.json) with the
+   versions it covers and the signature of each version's output file
+3. On the next run only diffs the versions added since - one pair per new
+   release - and rebuilds the chain only if an older version's output changed
+   or a version was inserted in the middle
+
+Usage:
+    python prompt_blame.py                  # Newest system prompt
+    python prompt_blame.py --tools          # Every tool description of the newest version
+    python prompt_blame.py --tool Bash      # One tool description
+    python prompt_blame.py --json
+    python prompt_blame.py --rebuild        # Ignore the cache
+
+Examples:
+    python prompt_blame.py
+    python prompt_blame.py --tool SlashCommand
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple, Any
+
+import blob_store
+from diff_system_prompts import block_hash, block_text
+from versions import (SYSTEM_PROMPTS_DIR, TOOLS_DIR, file_signature, load_system_blocks, load_tools,
+                      system_prompt_versions, tool_versions)
+
+
+CACHE_FILE = Path('output/prompt_blame.json')
+
+# Bump when the blame state layout changes so caches are rebuilt
+CACHE_FORMAT = 1
+
+
+def carry_origins(old_lines: List[str], old_origins: List[str], new_lines: List[str], version: str) -> List[str]:
+    """Origins of new_lines: unchanged lines keep theirs, the rest are from version."""
+    if old_lines == new_lines:
+        return old_origins
+    origins = [version] * len(new_lines)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for i, j, size in matcher.get_matching_blocks():
+        origins[j:j + size] = old_origins[i:i + size]
+    return origins
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def blame_system_step(blocks: List[Dict[str, Any]], version: str, system: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Extend the system prompt blame (one entry per block) by one version."""
+    new_hashes = [block_hash(block) for block in system]
+    aligner = difflib.SequenceMatcher(None, [block['hash'] for block in blocks], new_hashes, autojunk=False)
+
+    result = []
+    for op, i1, i2, j1, j2 in aligner.get_opcodes():
+        if op == 'equal':
+            result.extend(blocks[i1:i2])
+            continue
+        # Unequal runs pair up positionally as modifications, like diff_system_prompts.py
+        for k in range(j2 - j1):
+            lines = block_text(system[j1 + k]).split('\n')
+            if i1 + k < i2:
+                old = blocks[i1 + k]
+                origins = carry_origins(old['lines'], old['origins'], lines, version)
+            else:
+                origins = [version] * len(lines)
+            result.append({
+                'hash': new_hashes[j1 + k],
+                'type': system[j1 + k].get('type', 'unknown'),
+                'lines': lines,
+                'origins': origins
+            })
+    return result
+
+
+def blame_tools_step(tools: Dict[str, Dict[str, Any]], version: str,
+                     definitions: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Extend the tool description blame (by tool name) by one version."""
+    result = {}
+    for tool in definitions:
+        name = tool.get('name', 'unknown')
+        description = tool.get('description') or ''
+        digest = text_hash(description)
+        old = tools.get(name)
+        if old and old['hash'] == digest:
+            result[name] = old
+            continue
+        lines = description.split('\n')
+        result[name] = {
+            'hash': digest,
+            'lines': lines,
+            'origins': carry_origins(old['lines'], old['origins'], lines, version) if old else [version] * len(lines)
+        }
+    return result
+
+
+# Per chain: versions, output file candidates, loader, step, empty state
+CHAINS = {
+    'system': (
+        system_prompt_versions,
+        lambda version: (SYSTEM_PROMPTS_DIR / f"system_prompt_{version}.txt",
+                         blob_store.system_manifest_path(version, SYSTEM_PROMPTS_DIR)),
+        load_system_blocks,
+        blame_system_step,
+        list
+    ),
+    'tools': (
+        tool_versions,
+        lambda version: (TOOLS_DIR / f"tools_{version}.json", blob_store.tools_manifest_path(version, TOOLS_DIR)),
+        load_tools,
+        blame_tools_step,
+        dict
+    ),
+}
+
+
+def load_cache(cache_file: Path) -> Dict[str, Any]:
+    if cache_file.exists():
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get('format') == CACHE_FORMAT:
+                return cache
+        except (json.JSONDecodeError, OSError):
+            pass
+    return {'format': CACHE_FORMAT}
+
+
+def update_chain(cache: Dict[str, Any], name: str, rebuild: bool = False) -> Tuple[int, bool]:
+    """
+    Bring one blame chain up to date with the outputs.
+
+    Returns (versions diffed, whether the chain was built from scratch).
+    """
+    list_versions, output_files, load, step, empty = CHAINS[name]
+    versions = list_versions()
+    signatures = {version: file_signature(*output_files(version)) for version in versions}
+
+    chain = cache.get(name)
+    done = chain['versions'] if chain else []
+    rebuilt = (
+        rebuild or not chain
+        or versions[:len(done)] != done
+        or any(chain['signatures'].get(version) != signatures[version] for version in done)
+    )
+    if rebuilt:
+        chain = {'versions': [], 'signatures': {}, 'state': empty()}
+
+    pending = versions[len(chain['versions']):]
+    for version in pending:
+        data = load(version)
+        if data is not None:
+            chain['state'] = step(chain['state'], version, data)
+        chain['versions'].append(version)
+        chain['signatures'][version] = signatures[version]
+
+    cache[name] = chain
+    return len(pending), rebuilt
+
+
+def save_cache(cache: Dict[str, Any], cache_file: Path):
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    blob_store.write_if_changed(cache_file, json.dumps(cache, ensure_ascii=False).encode('utf-8'))
+
+
+def line_counts(origins_lists: List[List[str]], order: List[str]) -> List[Tuple[str, int]]:
+    """Lines per origin version, in version order."""
+    counts = {}
+    for origins in origins_lists:
+        for origin in origins:
+            counts[origin] = counts.get(origin, 0) + 1
+    return [(version, counts[version]) for version in order if version in counts]
+
+
+def format_lines(lines: List[str], origins: List[str]) -> List[str]:
+    return [f"  {origin:>8s} {number:5d}  {line}" for number, (line, origin) in enumerate(zip(lines, origins), 1)]
+
+
+def format_system_blame(chain: Dict[str, Any]) -> str:
+    blocks = chain['state']
+    lines = []
+    lines.append("=" * 120)
+    lines.append(f"SYSTEM PROMPT BLAME - v{chain['versions'][-1]} ({len(chain['versions'])} versions)")
+    lines.append("=" * 120)
+    lines.append("")
+    for index, block in enumerate(blocks, 1):
+        lines.append(f"### Block {index} ({block['type'].upper()})")
+        lines.append("")
+        lines.extend(format_lines(block['lines'], block['origins']))
+        lines.append("")
+    counts = line_counts([block['origins'] for block in blocks], chain['versions'])
+    lines.append("Lines by version: " + ", ".join(f"{version}: {count}" for version, count in counts))
+    lines.append("")
+    return '\n'.join(lines)
+
+
+def format_tools_blame(chain: Dict[str, Any], names: List[str]) -> str:
+    tools = chain['state']
+    lines = []
+    lines.append("=" * 120)
+    lines.append(f"TOOL DESCRIPTION BLAME - v{chain['versions'][-1]} ({len(chain['versions'])} versions)")
+    lines.append("=" * 120)
+    lines.append("")
+    for name in names:
+        tool = tools[name]
+        lines.append(f"### {name}")
+        lines.append("")
+        lines.extend(format_lines(tool['lines'], tool['origins']))
+        lines.append("")
+    counts = line_counts([tools[name]['origins'] for name in names], chain['versions'])
+    lines.append("Lines by version: " + ", ".join(f"{version}: {count}" for version, count in counts))
+    lines.append("")
+    return '\n'.join(lines)
+
+
+def main():
+    # Argument parsing
+    parser = argparse.ArgumentParser(
+        description='Show which version introduced or last changed each line of the newest system prompt / tool descriptions',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s
+  %(prog)s --tools
+  %(prog)s --tool SlashCommand
+  %(prog)s --json > blame.json
+        """
+    )
+    parser.add_argument(
+        '--tools',
+        action='store_true',
+        help='Blame every tool description instead of the system prompt'
+    )
+    parser.add_argument(
+        '--tool',
+        metavar='NAME',
+        help='Blame one tool description'
+    )
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help='Print the blame as JSON'
+    )
+    parser.add_argument(
+        '--rebuild',
+        action='store_true',
+        help='Rebuild the blame chain instead of extending the cached one'
+    )
+    parser.add_argument(
+        '--cache-file',
+        type=Path,
+        default=CACHE_FILE,
+        help=f'Blame cache (default: {CACHE_FILE})'
+    )
+
+    args = parser.parse_args()
+
+    name = 'tools' if args.tools or args.tool else 'system'
+    start = time.perf_counter()
+    cache = load_cache(args.cache_file)
+    diffed, from_scratch = update_chain(cache, name, args.rebuild)
+    save_cache(cache, args.cache_file)
+    elapsed = time.perf_counter() - start
+
+    chain = cache[name]
+    if not chain['versions']:
+        print(f"Error: No {'tool definitions' if name == 'tools' else 'system prompts'} found")
+        return
+
+    if name == 'tools':
+        names = [args.tool] if args.tool else list(chain['state'])
+        if args.tool and args.tool not in chain['state']:
+            print(f"Error: No tool {args.tool} in v{chain['versions'][-1]}")
+            return
+    if args.json:
+        if name == 'tools':
+            print(json.dumps({tool: chain['state'][tool] for tool in names}, indent=2, ensure_ascii=False))
+        else:
+            print(json.dumps(chain['state'], indent=2, ensure_ascii=False))
+        return
+
+    print(format_tools_blame(chain, names) if name == 'tools' else format_system_blame(chain))
+    status = "full build" if from_scratch else "extended cached chain"
+    print(f"Blamed {len(chain['versions'])} version(s), diffed {diffed} ({status}) in {elapsed * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
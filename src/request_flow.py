@@ -7,22 +7,63 @@ Shows:
 - Request purpose and content
 - Response content (tool calls, text, etc.)
 - Handles unknown request types gracefully
+
+Usage:
+    python request_flow.py <trace.jsonl>
+    python request_flow.py <trace.jsonl> --flow-json request_flow_{version}.json
+    python request_flow.py <trace.jsonl> --full-chains
+    python request_flow.py <trace.jsonl> --output request_flow_{version}.txt
+    python request_flow.py <trace.jsonl> --entry 42
+    python request_flow.py <trace.jsonl> --jobs 8
+    python request_flow.py <trace.jsonl> --profile [--profile-output flow.prof]
+
+Each request shows only the conversation messages added since its parent
+request (the earlier request whose messages it extends); --full-chains
+shows every request's whole chain.
+
+Report sections are written as each entry is classified, so output starts
+immediately and memory stays flat on huge traces; the summary counters are
+kept as the trace is read and written at the end.
+
+With --jobs, a plain trace is split at newline-aligned byte offsets and the
+chunks are decoded and classified in worker processes. Everything that
+depends on earlier entries - [idx] numbers, turn numbers, unknown counts and
+the parent of each request - is settled by merging the chunk results in
+order, so the report is the one a sequential run writes.
+
+Conversation prefixes are compared by content hash (cache_control aside),
+so only hashes of the recent requests' messages are kept - also the ones a
+chunk worker sends when a request's parent may lie in an earlier chunk.
+
+The optional JSON sidecar holds the structured flow (one record per request:
+req_type, purpose, model, msg_count, turn) that diff_request_flows.py reads.
 """
 
+import argparse
+import hashlib
 import json
 import sys
+from collections import OrderedDict
+from functools import cached_property, partial
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, TextIO, Tuple, Any
 
+import profiling
+from batch import map_chunks, resolve_jobs
+from classifier import match_endpoint, model_rules
+from json_backend import dumps
+from sse import decode_response
+from trace_index import read_entry
+from trace_reader import is_splittable, iter_jsonl, trace_version
 
-def load_jsonl(file_path: Path) -> List[Dict[str, Any]]:
-    """Load JSONL file into list of parsed entries."""
-    entries = []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            if line.strip():
-                entries.append(json.loads(line))
-    return entries
+
+class FlowRequest(NamedTuple):
+    """One request in a structured flow (model and msg_count only for MESSAGE requests)."""
+    req_type: str
+    purpose: str
+    model: Optional[str]
+    msg_count: Optional[int]
+    turn: int
 
 
 def extract_user_message(body: Dict[str, Any]) -> str:
@@ -100,13 +141,15 @@ def format_message_with_indent(msg: str, prefix: str, max_length: int = 150) ->
     return f"{prefix}{formatted_msg}"
 
 
-def extract_conversation_chain(body: Dict[str, Any]) -> List[tuple[str, str]]:
+def extract_conversation_chain(body: Dict[str, Any], start: int = 0) -> List[tuple[str, str]]:
     """Extract all messages in the conversation chain with roles.
+    Only messages from index start on are walked (see RequestFlowAnalyzer).
     Returns list of (role, content) tuples."""
     messages = body.get('messages', [])
     conversation = []
 
-    for msg in messages:
+    for i in range(start, len(messages)):
+        msg = messages[i]
         role = msg.get('role', 'unknown')
         content = msg.get('content', '')
 
@@ -161,52 +204,164 @@ def extract_conversation_chain(body: Dict[str, Any]) -> List[tuple[str, str]]:
     return conversation
 
 
-def extract_tool_calls(response_body: str) -> List[str]:
-    """Extract tool names called in response."""
+def without_cache_control(msg: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    A message with the cache_control of its content blocks removed.
+
+    Claude Code moves the ephemeral cache breakpoint to the newest message on
+    each request, so the last message of a parent request carries a
+    cache_control that the same message in the next request does not.
+    """
+    content = msg.get('content') if isinstance(msg, dict) else None
+    if not isinstance(content, list) or not any(isinstance(block, dict) and 'cache_control' in block
+                                                for block in content):
+        return msg
+    content = [{key: value for key, value in block.items() if key != 'cache_control'}
+               if isinstance(block, dict) else block for block in content]
+    return {**msg, 'content': content}
+
+
+def message_digest(msg: Dict[str, Any]) -> bytes:
+    """Content hash of one message (without cache_control, see without_cache_control())."""
+    return hashlib.sha256(dumps(without_cache_control(msg))).digest()
+
+
+# Message and messages prefix hashes (also sent by chunk workers for requests they cannot place)
+DIGEST_SIZE = 32        # message_digest() (SHA-256)
+CHAIN_HASH_SIZE = 16
+
+
+def link_chain_hash(chain_hash: bytes, digest: bytes) -> bytes:
+    """Hash of a messages prefix extended by one message (its message_digest())."""
+    return hashlib.blake2b(chain_hash + digest, digest_size=CHAIN_HASH_SIZE).digest()
+
+
+class PrefixHashes:
+    """
+    Message digests and prefix chain hashes of one request's messages.
+
+    Both are computed on first use: digest(n) is the message_digest() of the
+    n-th message and chain_hash(n) the hash of the first n messages, chained
+    with link_chain_hash() from b''.
+    """
+
+    def __init__(self, messages: List[Dict[str, Any]]):
+        self.messages = messages
+        self.digests: Dict[int, bytes] = {}
+        self.chain_hashes = [b'']
+
+    def digest(self, count: int) -> bytes:
+        if count not in self.digests:
+            self.digests[count] = message_digest(self.messages[count - 1])
+        return self.digests[count]
+
+    def chain_hash(self, count: int) -> bytes:
+        while len(self.chain_hashes) <= count:
+            self.chain_hashes.append(link_chain_hash(self.chain_hashes[-1], self.digest(len(self.chain_hashes))))
+        return self.chain_hashes[count]
+
+
+def message_tool_calls(resp: Optional[Dict[str, Any]]) -> List[str]:
+    """Tool names called in a decoded response message."""
     try:
-        resp = json.loads(response_body)
-        content = resp.get('content', [])
+        content = resp.get('content', []) if resp else []
         tools = []
         for block in content:
             if block.get('type') == 'tool_use':
                 tools.append(block.get('name', 'unknown'))
         return tools
-    except (json.JSONDecodeError, KeyError, TypeError):
+    except (KeyError, TypeError, AttributeError):
         return []
 
 
-def extract_response_text(response_body: str) -> str:
-    """Extract text response."""
+def message_text(resp: Optional[Dict[str, Any]]) -> str:
+    """Text of a decoded response message."""
     try:
-        resp = json.loads(response_body)
-        content = resp.get('content', [])
+        content = resp.get('content', []) if resp else []
         texts = []
         for block in content:
             if block.get('type') == 'text':
                 texts.append(block.get('text', ''))
         return ' '.join(texts)
-    except (json.JSONDecodeError, KeyError, TypeError):
+    except (KeyError, TypeError, AttributeError):
         return ""
 
 
+def extract_tool_calls(response_body: str) -> List[str]:
+    """Extract tool names called in response (JSON or streamed SSE body)."""
+    return message_tool_calls(decode_response(response_body))
+
+
+def extract_response_text(response_body: str) -> str:
+    """Extract text response (JSON or streamed SSE body)."""
+    return message_text(decode_response(response_body))
+
+
+def system_prompt_text(body: Dict[str, Any]) -> str:
+    """System prompt text, for pattern matching."""
+    system = body.get('system', '')
+    if isinstance(system, str):
+        return system
+    elif isinstance(system, list):
+        # System is array of content blocks
+        texts = []
+        for block in system:
+            if isinstance(block, dict) and block.get('type') == 'text':
+                texts.append(block.get('text', ''))
+        return ' '.join(texts)
+    return ''
+
+
+class EntryView:
+    """
+    Lazily decoded view of one trace entry.
+
+    The classification and report helpers all need the decoded response, its
+    tool calls and text, the user message and the system prompt. Each is
+    computed on first use and then shared, so an entry's response is decoded
+    at most once however many helpers look at it, and the system prompt is
+    only joined if a rule actually checks it.
+    """
+
+    def __init__(self, entry: Dict[str, Any]):
+        request = entry.get('request', {})
+        self.url = request.get('url', '')
+        self.method = request.get('method', 'UNKNOWN')
+        self.body = request.get('body')
+        self.response_raw = entry.get('response', {}).get('body_raw', '')
+
+    @cached_property
+    def response(self) -> Optional[Dict[str, Any]]:
+        with profiling.stage('decode'):
+            return decode_response(self.response_raw)
+
+    @cached_property
+    def tool_calls(self) -> List[str]:
+        return message_tool_calls(self.response)
+
+    @cached_property
+    def response_text(self) -> str:
+        return message_text(self.response)
+
+    @cached_property
+    def user_msg(self) -> str:
+        return extract_user_message(self.body)
+
+    @cached_property
+    def system_text(self) -> str:
+        return system_prompt_text(self.body)
+
+
 def classify_endpoint_type(url: str, method: str) -> tuple[str, str]:
     """
     Classify endpoint type and purpose.
     Returns (type, purpose) tuple.
     Handles unknown endpoints gracefully.
     """
-    # Known endpoint patterns
-    endpoint_patterns = [
-        ('oauth', 'AUTH', 'OAuth authentication'),
-        ('organization', 'AUTH', 'Organization access check'),
-        ('count_tokens', 'VALIDATE', 'Token count validation'),
-        ('/api/hello', 'HEALTH', 'Health check'),
-        ('/v1/messages', 'MESSAGE', 'API message request'),
-    ]
-
-    for pattern, req_type, purpose in endpoint_patterns:
-        if pattern in url:
-            return req_type, purpose
+    # Known endpoint patterns (classification_rules.json)
+    known = match_endpoint(url)
+    if known:
+        return known
 
     # Unknown endpoint - provide helpful info
     # Extract meaningful part of URL
@@ -215,249 +370,681 @@ def classify_endpoint_type(url: str, method: str) -> tuple[str, str]:
     return "UNKNOWN", f"⚠️  Unknown endpoint: {method} {endpoint_name}"
 
 
-def classify_message_purpose(body: Dict[str, Any], user_msg: str, response_body: str) -> str:
+def classify_message_purpose(view: EntryView) -> str:
     """
     Determine message purpose based on content patterns.
     Handles unknown types gracefully with generic but informative labels.
     """
+    body = view.body
     model = body.get('model', 'unknown')
-    tool_calls = extract_tool_calls(response_body)
 
-    # Extract system prompt text for pattern matching
-    system = body.get('system', '')
-    system_text = ''
-    if isinstance(system, str):
-        system_text = system.lower()
-    elif isinstance(system, list):
-        # System is array of content blocks
-        texts = []
-        for block in system:
-            if isinstance(block, dict) and block.get('type') == 'text':
-                texts.append(block.get('text', ''))
-        system_text = ' '.join(texts).lower()
-
-    # Known patterns to check (order matters - most specific first)
-    # Patterns check BOTH user message and system prompt
-    haiku_patterns = [
-        ('quota', "💰 Check quota limits", 'user'),
-        ('warmup', "🔥 Model warmup", 'user'),
-        ('title for the following conversation', "📝 Generate conversation title", 'user'),
-        ('new conversation topic', "🔍 Detect if new topic", 'system'),
-        ('isnewtopic', "🔍 Topic detection (JSON)", 'system'),
-        ('command:', "📋 Summarize tool output", 'user'),
-    ]
-
-    sonnet_patterns = [
-        ('warmup', "🔥 Model warmup (Sonnet)", 'user'),
-    ]
-
-    # Check model-specific patterns
-    if 'haiku' in model.lower():
-        for keyword, purpose, check_location in haiku_patterns:
-            if check_location == 'user' and keyword in user_msg.lower():
-                return purpose
-            elif check_location == 'system' and keyword in system_text:
-                return purpose
-        # Unknown Haiku usage
-        return "⚡ Haiku processing (unknown pattern)"
-
-    elif 'sonnet' in model.lower():
-        for keyword, purpose, check_location in sonnet_patterns:
-            if check_location == 'user' and keyword in user_msg.lower():
-                return purpose
-            elif check_location == 'system' and keyword in system_text:
-                return purpose
-        # Sonnet with tool calls
-        if tool_calls:
-            return f"🛠️  Sonnet calling: {', '.join(tool_calls)}"
-        # Generic Sonnet processing
-        msg_count = len(body.get('messages', []))
-        has_system = bool(body.get('system'))
-        return f"💬 Sonnet turn (msgs:{msg_count}, sys:{has_system})"
-
-    # Unknown model
-    return f"❓ Unknown model: {model}"
-
-
-def analyze_request_flow(entries: List[Dict[str, Any]], version: str) -> str:
-    """Generate request flow showing all requests with full context."""
+    # Model-specific patterns (classification_rules.json, order matters -
+    # most specific first); they check the user message or the system prompt
+    rules = model_rules(model)
+    if rules is None:
+        # Unknown model
+        return f"❓ Unknown model: {model}"
+
+    purpose = rules.match(view.user_msg, lambda: view.system_text)
+    if purpose:
+        return purpose
+    if rules.fallback:
+        # Unknown usage of a known model, e.g. Haiku
+        return rules.fallback
+
+    # Main loop model with tool calls
+    label = rules.main_loop_label
+    if view.tool_calls:
+        return f"🛠️  {label} calling: {', '.join(view.tool_calls)}"
+    # Generic main loop processing
+    msg_count = len(body.get('messages', []))
+    has_system = bool(body.get('system'))
+    return f"💬 {label} turn (msgs:{msg_count}, sys:{has_system})"
+
+
+class FlowRecord(NamedTuple):
+    """
+    One classified entry: everything in its report section that does not
+    depend on earlier entries (turn numbers, unknown counts and the parent
+    request are left to RequestFlowAnalyzer.add_record()).
+    """
+    req_type: str
+    purpose: str
+    model: Optional[str]
+    msg_count: Optional[int]
+    unknown_endpoint: Optional[Tuple[str, str]]
+    unknown_message: Optional[Tuple[str, str]]
+    turn_prompt: Optional[str]
+    head: List[str]
+    tail: List[str]
+
+
+def classify_entry(view: EntryView) -> FlowRecord:
+    """Classify one trace entry and render its details (except the conversation)."""
+    url = view.url
+    method = view.method
+    body = view.body
+
+    # Classify endpoint
+    req_type, purpose = classify_endpoint_type(url, method)
+    unknown_endpoint = (method, url) if req_type == "UNKNOWN" else None
+
+    if req_type != "MESSAGE" or not body:
+        return FlowRecord(req_type, purpose, None, None, unknown_endpoint, None, None, [], [])
+
+    # Message requests get full detail
+    user_msg = view.user_msg
+    model = body.get('model', 'unknown')
+    has_system = bool(body.get('system'))
+    has_tools = bool(body.get('tools'))
+    msg_count = len(body.get('messages', []))
 
-    lines = []
-    lines.append("=" * 120)
-    lines.append(f"REQUEST FLOW - Claude Code v{version}")
-    lines.append("=" * 120)
-    lines.append("")
-    lines.append("NOTE: This analysis auto-detects request types and handles unknowns gracefully.")
-    lines.append("      Turns are marked by 'Detect if new topic' Haiku calls (user interactions).")
-    lines.append("")
-    lines.append("=" * 120)
-
-    # Track turns and unknown patterns
-    turn_number = 0
-    unknown_endpoints = []
-    unknown_message_types = []
-
-    # Start with Turn 0 - Initialization
-    lines.append("")
-    lines.append("  " + "─" * 116)
-    lines.append(f"  🎬 Turn {turn_number} - Initialization")
-    lines.append("  " + "─" * 116)
-    lines.append("")
+    purpose = classify_message_purpose(view)
 
-    for idx, entry in enumerate(entries):
-        url = entry.get('request', {}).get('url', '')
-        method = entry.get('request', {}).get('method', 'UNKNOWN')
-        body = entry.get('request', {}).get('body')
-        response_raw = entry.get('response', {}).get('body_raw', '')
+    # Check if this is a "Detect if new topic" message - marks a new turn
+    turn_prompt = None
+    if "Detect if new topic" in purpose:
+        # Get the actual user prompt - strip newlines for single-line display
+        prompt_single_line = user_msg.replace('\n', ' ').replace('\r', ' ')
+        turn_prompt = prompt_single_line if len(prompt_single_line) <= 80 else prompt_single_line[:77] + "..."
+
+    # Track unknown patterns
+    unknown_message = None
+    if "unknown pattern" in purpose.lower() or "unknown model" in purpose.lower():
+        unknown_message = (model, user_msg[:50])
+
+    # Extract response info
+    tool_calls = view.tool_calls
+    response_text = view.response_text
+
+    head = [f"Model: {model}", f"Msgs: {msg_count}, System: {has_system}, Tools: {has_tools}"]
+    tail = []
+    if tool_calls:
+        tail.append(f"🔧 Tools called: {', '.join(tool_calls)}")
 
-        # Classify endpoint
-        req_type, purpose = classify_endpoint_type(url, method)
+    if response_text and len(response_text) < 150:
+        tail.append(f"💭 Response: {response_text}")
+    elif response_text:
+        tail.append(f"💭 Response: {response_text[:100]}... [{len(response_text)} chars]")
 
-        details = []
+    return FlowRecord(req_type, purpose, model, msg_count, unknown_endpoint, unknown_message, turn_prompt, head, tail)
+
+
+def conversation_details(entries: int, new_lines: List[str], parent_idx: Optional[int] = None,
+                         inline: Optional[str] = None) -> List[str]:
+    """
+    Detail lines of a request's conversation chain of `entries` entries.
+
+    new_lines are the numbered entries new since the parent request
+    [parent_idx], or all of them without a parent; a lone entry without a
+    parent is shown inline instead.
+    """
+    if parent_idx is not None:
+        if new_lines:
+            return [f"💬 Conversation ({entries} messages in chain, +{len(new_lines)} new since [{parent_idx}]):"] + new_lines
+        return [f"💬 Conversation ({entries} messages in chain, same as [{parent_idx}])"]
+    if entries == 1:
+        return [inline]
+    if entries:
+        # Multiple messages - show full conversation with proper indentation
+        return [f"💬 Conversation ({entries} messages in chain):"] + new_lines
+    return []
+
+
+# Recent conversation chains kept as possible parents of later requests
+CHAIN_CACHE_SIZE = 64
+
+
+def find_parent(chains: OrderedDict, count: int, key_digest: Callable[[int], bytes],
+                same_prefix: Callable[[int, Tuple], bool], longer_than: int = 0) -> Optional[Tuple]:
+    """
+    Latest recent chain whose messages are the longest prefix of a request's.
+
+    chains maps (message count, hash of the last message) to the recent
+    chains, (request idx, message count, conversation entries, chain hash),
+    oldest first - one message hash per known chain length is looked up, not
+    one per message. key_digest(n) is the hash of the request's n-th message
+    and same_prefix(n, chain) confirms that its first n messages are the
+    chain's. Only chains of more than longer_than messages are
+    considered.
+    """
+    for known in sorted({known for known, _ in chains}, reverse=True):
+        if known <= longer_than:
+            break
+        # A lone repeated message (e.g. a warmup) is shown again rather than referenced
+        if known > count or known == count == 1:
+            continue
+        candidate = chains.get((known, key_digest(known)))
+        if candidate and same_prefix(known, candidate):
+            return candidate
+    return None
+
+
+def add_chain(chains: OrderedDict, key: Tuple[int, bytes], chain: Tuple):
+    """Remember a request's chain, dropping the oldest beyond CHAIN_CACHE_SIZE."""
+    chains[key] = chain
+    chains.move_to_end(key)
+    if len(chains) > CHAIN_CACHE_SIZE:
+        chains.popitem(last=False)
+
+
+class RequestFlowAnalyzer:
+    """
+    Incremental request flow analyzer.
+
+    Entries are fed one at a time with add_entry(), so the analyzer can be
+    driven by a streaming reader or shared with other extractors that read
+    the same trace. finish() appends the summary and returns the report;
+    the structured flow is collected in self.flow as FlowRequest records.
+
+    With an output stream, each request's section is written to it as soon
+    as the entry is classified and finish() writes the summary instead of
+    returning the report, so only the summary counters, the recent chains
+    and the flow records are kept in memory (keep_flow=False drops the flow
+    records too).
+
+    Every /v1/messages body repeats the whole conversation so far. Unless
+    full_chains is set, each request's messages are matched against the
+    chains of the last CHAIN_CACHE_SIZE requests and only the messages added
+    since the longest matching parent are walked and shown, so long sessions
+    no longer cost quadratic conversation walks and report size.
+
+    Entries classified by chunk workers (classify_chunk()) are fed with
+    add_chunk_record() instead, in trace order.
+    """
+
+    def __init__(self, version: str, full_chains: bool = False, output: Optional[TextIO] = None,
+                 keep_flow: bool = True):
+        self.version = version
+        self.full_chains = full_chains
+        self.output = output
+        self.keep_flow = keep_flow
+        self.lines = []
+        self.flow: List[FlowRequest] = []
+
+        # Recent chains: (message count, last message hash) -> (request idx, message count,
+        # conversation entries, chain hash); only hashes are kept, not the messages
+        self.chains: OrderedDict = OrderedDict()
+
+        # Track turns and unknown patterns
+        self.turn_number = 0
+        self.request_count = 0
+        self.unknown_endpoints: Set[Tuple[str, str]] = set()
+        self.unknown_message_types: List[Tuple[str, str]] = []
+
+        lines = self.lines
+        lines.append("=" * 120)
+        lines.append(f"REQUEST FLOW - Claude Code v{version}")
+        lines.append("=" * 120)
+        lines.append("")
+        lines.append("NOTE: This analysis auto-detects request types and handles unknowns gracefully.")
+        lines.append("      Turns are marked by 'Detect if new topic' Haiku calls (user interactions).")
+        lines.append("")
+        lines.append("=" * 120)
+
+        # Start with Turn 0 - Initialization
+        lines.append("")
+        lines.append("  " + "─" * 116)
+        lines.append(f"  🎬 Turn {self.turn_number} - Initialization")
+        lines.append("  " + "─" * 116)
+        lines.append("")
+        self.flush()
+
+    def add_entry(self, idx: int, entry: Dict[str, Any]):
+        """Classify one trace entry and append its section to the report."""
+        view = EntryView(entry)
+        record = classify_entry(view)
+        conversation = []
+        if record.msg_count is not None:
+            conversation = self.render_conversation(*self.conversation_since_parent(idx, view.body))
+        self.add_record(idx, record, conversation)
+
+    def add_record(self, idx: int, record: FlowRecord, conversation: List[str]):
+        """Append the section of a classified entry, with its rendered conversation details."""
+        lines = self.lines
+        self.request_count += 1
 
         # Track unknowns for summary
-        if req_type == "UNKNOWN":
-            unknown_endpoints.append((method, url))
-
-        # Handle message requests with full detail
-        if req_type == "MESSAGE" and body:
-            user_msg = extract_user_message(body)
-            all_user_msgs = extract_all_user_messages(body)
-            model = body.get('model', 'unknown')
-            has_system = bool(body.get('system'))
-            has_tools = bool(body.get('tools'))
-            msg_count = len(body.get('messages', []))
-
-            purpose = classify_message_purpose(body, user_msg, response_raw)
-
-            # Check if this is a "Detect if new topic" message - marks a new turn
-            if "Detect if new topic" in purpose:
-                turn_number += 1
-                # Get the actual user prompt - strip newlines for single-line display
-                prompt_single_line = user_msg.replace('\n', ' ').replace('\r', ' ')
-                next_prompt = prompt_single_line if len(prompt_single_line) <= 80 else prompt_single_line[:77] + "..."
-                lines.append("")
-                lines.append("  " + "─" * 116)
-                lines.append(f"  💬 Turn {turn_number} - {next_prompt}")
-                lines.append("  " + "─" * 116)
-                lines.append("")
-
-            # Track unknown patterns
-            if "unknown pattern" in purpose.lower() or "unknown model" in purpose.lower():
-                unknown_message_types.append((model, user_msg[:50]))
-
-            # Extract response info
-            tool_calls = extract_tool_calls(response_raw)
-            response_text = extract_response_text(response_raw)
-
-            details.append(f"Model: {model}")
-            details.append(f"Msgs: {msg_count}, System: {has_system}, Tools: {has_tools}")
-
-            # Display full conversation chain
-            conversation = extract_conversation_chain(body)
-            if conversation:
-                if len(conversation) == 1:
-                    # Single message - show it inline with proper indentation
-                    role, msg = conversation[0]
-                    if role == "tool_result":
-                        emoji = "🔧"
-                        role_label = "Tool"
-                    elif role == "user":
-                        emoji = "📥"
-                        role_label = "User"
-                    else:
-                        emoji = "💬"
-                        role_label = "Assistant"
-
-                    prefix = f"{emoji} {role_label}: "
-                    formatted = format_message_with_indent(msg, prefix, max_length=200)
-                    details.append(formatted)
-                else:
-                    # Multiple messages - show full conversation with proper indentation
-                    details.append(f"💬 Conversation ({len(conversation)} messages in chain):")
-                    for i, (role, msg) in enumerate(conversation, 1):
-                        if role == "tool_result":
-                            role_label = "Tool"
-                        elif role == "user":
-                            role_label = "User"
-                        else:
-                            role_label = "Assistant"
-
-                        prefix = f"       [{i}] {role_label}: "
-                        formatted = format_message_with_indent(msg, prefix, max_length=150)
-                        details.append(formatted)
-
-            if tool_calls:
-                details.append(f"🔧 Tools called: {', '.join(tool_calls)}")
-
-            if response_text and len(response_text) < 150:
-                details.append(f"💭 Response: {response_text}")
-            elif response_text:
-                details.append(f"💭 Response: {response_text[:100]}... [{len(response_text)} chars]")
+        if record.unknown_endpoint:
+            self.unknown_endpoints.add(record.unknown_endpoint)
+        if record.unknown_message:
+            self.unknown_message_types.append(record.unknown_message)
+
+        # A "Detect if new topic" message marks a new turn
+        if record.turn_prompt is not None:
+            self.turn_number += 1
+            lines.append("")
+            lines.append("  " + "─" * 116)
+            lines.append(f"  💬 Turn {self.turn_number} - {record.turn_prompt}")
+            lines.append("  " + "─" * 116)
+            lines.append("")
+
+        if self.keep_flow:
+            self.flow.append(FlowRequest(record.req_type, record.purpose, record.model, record.msg_count, self.turn_number))
 
         # Print request
-        lines.append(f"  [{idx:2d}] {req_type:10s} | {purpose}")
-        for detail in details:
+        lines.append(f"  [{idx:2d}] {record.req_type:10s} | {record.purpose}")
+        for detail in record.head + conversation + record.tail:
             lines.append(f"       {detail}")
         lines.append("")
+        self.flush()
+
+    def add_chunk_record(self, idx: int, record: FlowRecord, chain: Optional['ChainRecord'], offset: int):
+        """
+        Append the section of an entry classified by a chunk worker (classify_chunk()).
+
+        offset is the number of entries before the worker's chunk. Requests
+        the worker could not place - their parent may be in an earlier chunk
+        - are matched here against the recent chains by hash.
+        """
+        conversation = []
+        if chain is not None:
+            parent = (offset + chain.parent[0], chain.parent[1]) if chain.parent else None
+            if chain.prefixes is not None:
+                start, message_digests, chain_hashes = chain.prefixes
+                candidate = find_parent(
+                    self.chains, record.msg_count,
+                    lambda count: message_digests[(count - start - 1) * DIGEST_SIZE:(count - start) * DIGEST_SIZE],
+                    lambda count, known: known[3] == chain_hashes[(count - start - 1) * CHAIN_HASH_SIZE:(count - start) * CHAIN_HASH_SIZE],
+                    longer_than=start
+                )
+                if candidate:
+                    parent = (candidate[0], candidate[2])
+            if chain.key_digest is not None:
+                add_chain(self.chains, (record.msg_count, chain.key_digest),
+                          (idx, record.msg_count, chain.entries, chain.chain_hash))
+
+            # chain.lines start after entry chain.first; show those after the parent's
+            if parent is None and chain.entries == 1:
+                conversation = conversation_details(1, [], inline=chain.inline)
+            else:
+                parent_entries = parent[1] if parent else 0
+                conversation = conversation_details(chain.entries, chain.lines[parent_entries - chain.first:],
+                                                    parent[0] if parent else None)
+        self.add_record(idx, record, conversation)
+
+    def flush(self):
+        """Write the buffered report lines to the output stream, if there is one."""
+        if self.output is not None and self.lines:
+            with profiling.stage('write'):
+                self.output.write('\n'.join(self.lines) + '\n')
+            self.lines.clear()
+
+    def conversation_since_parent(self, idx: int, body: Dict[str, Any]) -> Tuple[List[tuple[str, str]], Optional[Tuple[int, int]]]:
+        """
+        Conversation entries of a request that are new since its parent.
+
+        The parent is the latest recent request whose whole messages array is
+        the longest prefix of this one (see find_parent()). Returns (new
+        entries, (parent idx, parent entry count)), or (all entries, None) if
+        there is no parent.
+        """
+        messages = body.get('messages', [])
+        if self.full_chains or not messages:
+            return extract_conversation_chain(body), None
+
+        hashes = PrefixHashes(messages)
+        parent = find_parent(self.chains, len(messages), hashes.digest,
+                             lambda count, known: known[3] == hashes.chain_hash(count))
+
+        if parent:
+            parent_idx, parent_count, parent_entries, _ = parent
+            conversation = extract_conversation_chain(body, start=parent_count)
+            entries = parent_entries + len(conversation)
+        else:
+            conversation = extract_conversation_chain(body)
+            entries = len(conversation)
+
+        add_chain(self.chains, (len(messages), hashes.digest(len(messages))),
+                  (idx, len(messages), entries, hashes.chain_hash(len(messages))))
+        return conversation, (parent[0], parent[2]) if parent else None
+
+    def render_conversation(self, conversation: List[tuple[str, str]], parent: Optional[Tuple[int, int]]) -> List[str]:
+        """Detail lines of conversation entries new since parent (idx, entry count), or of a whole chain."""
+        if parent is None and len(conversation) == 1:
+            return conversation_details(1, [], inline=self.inline_entry(*conversation[0]))
+        parent_entries = parent[1] if parent else 0
+        return conversation_details(parent_entries + len(conversation),
+                                    self.conversation_lines(conversation, parent_entries + 1),
+                                    parent[0] if parent else None)
+
+    @staticmethod
+    def inline_entry(role: str, msg: str) -> str:
+        """A lone conversation entry, shown inline with proper indentation."""
+        if role == "tool_result":
+            emoji = "🔧"
+            role_label = "Tool"
+        elif role == "user":
+            emoji = "📥"
+            role_label = "User"
+        else:
+            emoji = "💬"
+            role_label = "Assistant"
+
+        prefix = f"{emoji} {role_label}: "
+        return format_message_with_indent(msg, prefix, max_length=200)
+
+    @staticmethod
+    def conversation_lines(conversation: List[tuple[str, str]], first_number: int) -> List[str]:
+        """Numbered conversation entries with proper indentation."""
+        lines = []
+        for i, (role, msg) in enumerate(conversation, first_number):
+            if role == "tool_result":
+                role_label = "Tool"
+            elif role == "user":
+                role_label = "User"
+            else:
+                role_label = "Assistant"
+
+            prefix = f"       [{i}] {role_label}: "
+            lines.append(format_message_with_indent(msg, prefix, max_length=150))
+        return lines
+
+    def finish(self) -> Optional[str]:
+        """Append the summary section and return the full report (None when streaming to output)."""
+        lines = self.lines
+        unknown_endpoints = self.unknown_endpoints
+        unknown_message_types = self.unknown_message_types
+
+        # Summary section showing any unknowns detected
+        lines.append("=" * 120)
+        lines.append("ANALYSIS SUMMARY")
+        lines.append("=" * 120)
+        lines.append(f"Total requests: {self.request_count}")
+        lines.append(f"Total turns: {self.turn_number}")
+
+        if unknown_endpoints:
+            lines.append("")
+            lines.append("⚠️  UNKNOWN ENDPOINTS DETECTED:")
+            for method, url in unknown_endpoints:
+                lines.append(f"   - {method} {url}")
+            lines.append("   (These are new and not yet categorized)")
+
+        if unknown_message_types:
+            lines.append("")
+            lines.append("⚠️  UNKNOWN MESSAGE PATTERNS DETECTED:")
+            for model, msg_preview in unknown_message_types:
+                lines.append(f"   - {model}: {msg_preview}...")
+            lines.append("   (These may be new features or usage patterns)")
+
+        if not unknown_endpoints and not unknown_message_types:
+            lines.append("")
+            lines.append("✅ All request types recognized")
 
-    # Summary section showing any unknowns detected
-    lines.append("=" * 120)
-    lines.append("ANALYSIS SUMMARY")
-    lines.append("=" * 120)
-    lines.append(f"Total requests: {len(entries)}")
-    lines.append(f"Total turns: {turn_number}")
-
-    if unknown_endpoints:
         lines.append("")
-        lines.append("⚠️  UNKNOWN ENDPOINTS DETECTED:")
-        for method, url in set(unknown_endpoints):
-            lines.append(f"   - {method} {url}")
-        lines.append("   (These are new and not yet categorized)")
+        lines.append("=" * 120)
+        lines.append("END OF FLOW")
+        lines.append("=" * 120)
 
-    if unknown_message_types:
-        lines.append("")
-        lines.append("⚠️  UNKNOWN MESSAGE PATTERNS DETECTED:")
-        for model, msg_preview in unknown_message_types:
-            lines.append(f"   - {model}: {msg_preview}...")
-        lines.append("   (These may be new features or usage patterns)")
+        if self.output is not None:
+            self.flush()
+            return None
+        return '\n'.join(lines)
 
-    if not unknown_endpoints and not unknown_message_types:
-        lines.append("")
-        lines.append("✅ All request types recognized")
 
-    lines.append("")
-    lines.append("=" * 120)
-    lines.append("END OF FLOW")
-    lines.append("=" * 120)
+def analyze_request_flow(entries: Iterable[Dict[str, Any]], version: str, full_chains: bool = False) -> str:
+    """Generate request flow showing all requests with full context."""
+    analyzer = RequestFlowAnalyzer(version, full_chains=full_chains)
+    for idx, entry in enumerate(entries):
+        analyzer.add_entry(idx, entry)
+    return analyzer.finish()
 
-    return '\n'.join(lines)
 
+class ChainRecord(NamedTuple):
+    """
+    A message request's conversation chain as seen by a chunk worker.
+
+    parent is the (chunk-local idx, entry count) of the parent request the
+    worker found among the chunk's requests, or None, and lines are the
+    numbered conversation entries after entry `first` (the parent's). Until
+    the worker has seen CHAIN_CACHE_SIZE chains, a longer chain of an
+    earlier chunk may be the real parent: prefixes then holds (the local
+    parent's message count, the packed message digests and chain hashes of
+    the longer prefixes) for RequestFlowAnalyzer.add_chunk_record() to look
+    it up. Only a longer prefix can win, so lines always cover the entries
+    new since the real parent.
+    """
+    key_digest: Optional[bytes]
+    chain_hash: bytes
+    entries: int
+    parent: Optional[Tuple[int, int]]
+    first: int
+    lines: List[str]
+    inline: Optional[str]
+    prefixes: Optional[Tuple[int, bytes, bytes]]
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python detailed_flow.py <trace.jsonl>")
-        print("")
-        print("This script analyzes Claude Code API traces and shows:")
-        print("  - All requests in chronological order")
-        print("  - Request types and purposes")
-        print("  - User messages and responses")
-        print("  - Tool calls and outputs")
-        print("  - Detection of unknown/new request types")
-        sys.exit(1)
 
-    file_path = Path(sys.argv[1])
+class ChunkClassifier:
+    """
+    Matches the conversation chains of one chunk's requests (classify_chunk()).
+
+    Chains are matched against the chunk's own recent requests the way
+    RequestFlowAnalyzer does. Once CHAIN_CACHE_SIZE of them are known, the
+    analyzer's recent chains at that point are exactly these, so the parent
+    found here is final.
+    """
+
+    def __init__(self, full_chains: bool = False):
+        self.full_chains = full_chains
+        # (message count, last message hash) -> (idx, message count, conversation entries, chain hash)
+        self.chains: OrderedDict = OrderedDict()
+
+    def chain(self, idx: int, body: Dict[str, Any]) -> ChainRecord:
+        messages = body.get('messages', [])
+        if self.full_chains or not messages:
+            return self.chain_record(None, b'', extract_conversation_chain(body), None, None)
+
+        hashes = PrefixHashes(messages)
+        parent = find_parent(self.chains, len(messages), hashes.digest,
+                             lambda count, known: known[3] == hashes.chain_hash(count))
+
+        start = parent[1] if parent else 0
+        chain_hash = hashes.chain_hash(len(messages))
+        prefixes = None
+        if len(self.chains) < CHAIN_CACHE_SIZE:
+            counts = range(start + 1, len(messages) + 1)
+            prefixes = (start, b''.join(hashes.digest(count) for count in counts),
+                        b''.join(hashes.chain_hash(count) for count in counts))
+        record = self.chain_record(hashes.digest(len(messages)), chain_hash,
+                                   extract_conversation_chain(body, start=start),
+                                   (parent[0], parent[2]) if parent else None, prefixes)
+
+        add_chain(self.chains, (len(messages), hashes.digest(len(messages))),
+                  (idx, len(messages), record.entries, chain_hash))
+        return record
+
+    @staticmethod
+    def chain_record(key_digest: Optional[bytes], chain_hash: bytes, conversation: List[tuple[str, str]],
+                     parent: Optional[Tuple[int, int]], prefixes: Optional[Tuple[int, bytes, bytes]]) -> ChainRecord:
+        first = parent[1] if parent else 0
+        inline = None
+        if parent is None and len(conversation) == 1:
+            inline = RequestFlowAnalyzer.inline_entry(*conversation[0])
+        return ChainRecord(
+            key_digest=key_digest,
+            chain_hash=chain_hash,
+            entries=first + len(conversation),
+            parent=parent,
+            first=first,
+            lines=RequestFlowAnalyzer.conversation_lines(conversation, first + 1),
+            inline=inline,
+            prefixes=prefixes
+        )
+
+
+def classify_chunk(trace_file: Path, byte_range: Optional[Tuple[int, int]],
+                   full_chains: bool = False) -> List[Tuple[FlowRecord, Optional[ChainRecord]]]:
+    """Classify the entries of one chunk of a trace (process pool worker), in order."""
+    classifier = ChunkClassifier(full_chains)
+    records = []
+    for idx, entry in enumerate(iter_jsonl(trace_file, byte_range)):
+        with profiling.stage('classify'):
+            view = EntryView(entry)
+            record = classify_entry(view)
+            chain = classifier.chain(idx, view.body) if record.msg_count is not None else None
+        records.append((record, chain))
+    return records
+
+
+def analyze_chunks(analyzer: RequestFlowAnalyzer, trace_file: Path, jobs: int):
+    """Feed a whole trace to an analyzer, with its chunks classified by `jobs` worker processes."""
+    offset = 0
+    for records in map_chunks(partial(classify_chunk, full_chains=analyzer.full_chains), trace_file, jobs):
+        with profiling.stage('render'):
+            for i, (record, chain) in enumerate(records):
+                analyzer.add_chunk_record(offset + i, record, chain, offset)
+        offset += len(records)
+
+
+def save_flow_json(version: str, flow: List[FlowRequest], output_file: Path) -> Path:
+    """Save a structured flow as a JSON sidecar (request_flow_{version}.json)."""
+    data = {
+        'version': version,
+        'request_count': len(flow),
+        'turn_count': flow[-1].turn if flow else 0,
+        'requests': [request._asdict() for request in flow]
+    }
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    return output_file
+
+
+def load_flow_json(file_path: Path) -> List[FlowRequest]:
+    """Load a structured flow saved by save_flow_json()."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [FlowRequest(**request) for request in data['requests']]
+
+
+def main():
+    # Argument parsing
+    parser = argparse.ArgumentParser(
+        description='Analyze a Claude Code API trace and show the request flow',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+This script analyzes Claude Code API traces and shows:
+  - All requests in chronological order
+  - Request types and purposes
+  - User messages and responses
+  - Tool calls and outputs
+  - Detection of unknown/new request types
+
+Examples:
+  %(prog)s .claude-trace/api-trace_2.0.30.jsonl
+  %(prog)s .claude-trace/api-trace_2.0.30.jsonl --flow-json output/request_flows/request_flow_2.0.30.json
+  %(prog)s .claude-trace/api-trace_2.0.30.jsonl --output output/request_flows/request_flow_2.0.30.txt
+  %(prog)s .claude-trace/api-trace_2.0.30.jsonl --jobs 0
+        """
+    )
+    parser.add_argument(
+        'trace_file',
+        help='Trace file to analyze'
+    )
+    parser.add_argument(
+        '--full-chains',
+        action='store_true',
+        help='Show every request\'s whole conversation chain, not just the messages new since its parent request'
+    )
+    parser.add_argument(
+        '--entry',
+        type=int,
+        metavar='N',
+        help='Only show request [N] (read through the trace\'s .idx sidecar index)'
+    )
+    parser.add_argument(
+        '--output',
+        type=Path,
+        metavar='FILE',
+        help='Write the report to FILE instead of stdout'
+    )
+    parser.add_argument(
+        '--flow-json',
+        type=Path,
+        metavar='FILE',
+        help='Also save the structured flow (for diff_request_flows.py) to FILE'
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        metavar='N',
+        help='Split the trace into chunks classified by N worker processes (0 = one per CPU; plain .jsonl traces)'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Report load/decode/classify/render/write timings and entry counters on stderr'
+    )
+    parser.add_argument(
+        '--profile-output',
+        type=Path,
+        metavar='FILE',
+        help='Also dump cProfile stats to FILE (implies --profile)'
+    )
+
+    args = parser.parse_args()
+
+    # Trace text may hold lone surrogates (a truncated emoji pair); print them
+    # escaped instead of failing on the whole report
+    sys.stdout.reconfigure(errors='backslashreplace')
+
+    if args.profile or args.profile_output:
+        profiling.enable(args.profile_output)
+
+    file_path = Path(args.trace_file)
     if not file_path.exists():
         print(f"Error: File {file_path} does not exist")
         sys.exit(1)
 
-    version = file_path.stem.split('_')[-1] if '_' in file_path.stem else file_path.stem
+    version = trace_version(file_path)
+
+    if args.entry is not None:
+        try:
+            entry = read_entry(file_path, args.entry)
+        except IndexError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        analyzer = RequestFlowAnalyzer(version)
+        start = len(analyzer.lines)
+        with profiling.stage('classify'):
+            analyzer.add_entry(args.entry, entry)
+        print(f"Request [{args.entry}] of {file_path.name}:")
+        print("")
+        print('\n'.join(analyzer.lines[start:]))
+        profiling.finish()
+        return
 
     print(f"Analyzing {file_path.name}...")
-    entries = load_jsonl(file_path)
 
-    report = analyze_request_flow(entries, version)
-    print(report)
+    # Entries and report sections are streamed: each request's section is
+    # written as soon as it is classified, so memory stays flat
+    output = sys.stdout
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        output = open(args.output, 'w', encoding='utf-8', errors='backslashreplace')
+    try:
+        analyzer = RequestFlowAnalyzer(version, full_chains=args.full_chains, output=output,
+                                       keep_flow=bool(args.flow_json))
+        if resolve_jobs(args.jobs) > 1 and is_splittable(file_path):
+            analyze_chunks(analyzer, file_path, args.jobs)
+        else:
+            for idx, entry in enumerate(iter_jsonl(file_path)):
+                with profiling.stage('classify'):
+                    analyzer.add_entry(idx, entry)
+        with profiling.stage('render'):
+            analyzer.finish()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    with profiling.stage('write'):
+        if args.output:
+            print(f"✓ Saved report to {args.output}")
+        if args.flow_json:
+            save_flow_json(version, analyzer.flow, args.flow_json)
+
+    profiling.finish()
 
 
 if __name__ == '__main__':
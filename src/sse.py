@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Response body decoding for /v1/messages, including streamed (SSE) responses.
+
+claude-trace stores the raw response body. Non-streamed responses are a JSON
+message; streamed ones are a server-sent event stream:
+
+    event: message_start
+    data: {"type": "message_start", "message": {... "content": [], "usage": {...}}}
+
+    event: content_block_start
+    data: {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}
+
+    event: content_block_delta
+    data: {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "Hi"}}
+    ...
+
+MessageAssembler walks the events once and rebuilds the final message as the
+non-streamed API would have returned it: content blocks (text, tool_use with
+its parsed input, thinking), stop_reason and usage. decode_response() returns
+that message for either kind of body.
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple, Any
+
+import json_backend
+
+
+def iter_sse_events(text: str) -> Iterator[Tuple[str, str]]:
+    """Yield (event, data) pairs from an SSE stream (multi-line data is joined with \\n)."""
+    event = ''
+    data = []
+    for line in text.splitlines():
+        if not line:
+            if data:
+                yield event or 'message', '\n'.join(data)
+            event = ''
+            data = []
+        elif line.startswith('event:'):
+            event = line[len('event:'):].strip()
+        elif line.startswith('data:'):
+            value = line[len('data:'):]
+            data.append(value[1:] if value.startswith(' ') else value)
+        # Comments (":...") and other fields (id:, retry:) carry nothing we need
+
+    if data:
+        yield event or 'message', '\n'.join(data)
+
+
+class MessageAssembler:
+    """
+    Incremental assembler for a streamed message.
+
+    Feed decoded event payloads in order with feed(); message is the
+    assembled message (None until message_start was seen).
+    """
+
+    def __init__(self):
+        self.message: Optional[Dict[str, Any]] = None
+        self.content: List[Dict[str, Any]] = []
+        self.partial_json: Dict[int, List[str]] = {}
+
+    def block(self, index: int) -> Dict[str, Any]:
+        while len(self.content) <= index:
+            self.content.append({})
+        return self.content[index]
+
+    def feed(self, event: Dict[str, Any]):
+        """Apply one event payload."""
+        event_type = event.get('type')
+
+        if event_type == 'message_start':
+            self.message = dict(event.get('message', {}))
+            self.message['usage'] = dict(self.message.get('usage') or {})
+            self.content = self.message['content'] = list(self.message.get('content') or [])
+
+        elif event_type == 'content_block_start':
+            block = self.block(event.get('index', 0))
+            block.update(event.get('content_block', {}))
+
+        elif event_type == 'content_block_delta':
+            index = event.get('index', 0)
+            block = self.block(index)
+            delta = event.get('delta', {})
+            delta_type = delta.get('type')
+            if delta_type == 'text_delta':
+                block['text'] = block.get('text', '') + delta.get('text', '')
+            elif delta_type == 'input_json_delta':
+                self.partial_json.setdefault(index, []).append(delta.get('partial_json', ''))
+            elif delta_type == 'thinking_delta':
+                block['thinking'] = block.get('thinking', '') + delta.get('thinking', '')
+            elif delta_type == 'signature_delta':
+                block['signature'] = block.get('signature', '') + delta.get('signature', '')
+            elif delta_type == 'citations_delta':
+                block.setdefault('citations', []).append(delta.get('citation'))
+
+        elif event_type == 'content_block_stop':
+            self.finish_block(event.get('index', 0))
+
+        elif event_type == 'message_delta':
+            if self.message is not None:
+                self.message.update(event.get('delta', {}))
+                self.message['usage'].update(event.get('usage') or {})
+
+        elif event_type == 'error' and self.message is not None:
+            self.message['error'] = event.get('error')
+
+    def finish_block(self, index: int):
+        """Parse the accumulated tool input JSON of a finished block."""
+        parts = self.partial_json.pop(index, None)
+        if parts is None:
+            return
+        raw_input = ''.join(parts)
+        try:
+            self.block(index)['input'] = json_backend.loads(raw_input) if raw_input else {}
+        except json_backend.JSONDecodeError:
+            # Truncated stream - keep what arrived
+            self.block(index)['input'] = raw_input
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        """Close blocks left open by a truncated stream and return the message."""
+        for index in list(self.partial_json):
+            self.finish_block(index)
+        return self.message
+
+
+def assemble_message(body_raw: str) -> Optional[Dict[str, Any]]:
+    """Rebuild the final message from an SSE response body, or None if it has none."""
+    assembler = MessageAssembler()
+    for _, data in iter_sse_events(body_raw):
+        try:
+            event = json_backend.loads(data)
+        except json_backend.JSONDecodeError:
+            continue
+        if isinstance(event, dict):
+            assembler.feed(event)
+    return assembler.finish()
+
+
+def decode_response(body_raw: str) -> Optional[Dict[str, Any]]:
+    """
+    Decode a response body (JSON or SSE stream) into a message dict.
+
+    Returns None for empty or undecodable bodies.
+    """
+    if not isinstance(body_raw, str) or not body_raw:
+        return None
+
+    if body_raw.lstrip().startswith(('event:', 'data:')):
+        return assemble_message(body_raw)
+
+    try:
+        message = json_backend.loads(body_raw)
+    except json_backend.JSONDecodeError:
+        return None
+    return message if isinstance(message, dict) else None
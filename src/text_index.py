@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Positional inverted index over system prompt blocks and tool descriptions.
+
+Lives in the analytics database (analytics_db.py). Every distinct text - a
+system block or a tool description - is stored once in `documents`, keyed by
+its hash, and tokenized once: `postings` maps each lowercased word token to
+the documents containing it and the token positions there. Most blocks and
+descriptions are identical from one version to the next, so the index grows
+with the amount of change, not with the number of versions.
+
+A phrase ("Intent Matching", "skill:") is looked up by its rarest token,
+the candidate documents are narrowed to those where all its tokens occur at
+consecutive positions - which covers any n-gram of words without storing
+n-grams - and each remaining candidate is confirmed by a case-insensitive
+substring check of its text, so punctuation in the phrase counts. Matching
+documents are mapped back to versions through system_blocks and tools.
+
+A phrase may start or end partway through a word ("ntent Match", "Slash"
+in "SlashCommand"), so its first token matches any indexed token ending
+with it and its last token any token starting with it (a lone token: any
+token containing it); only the interior tokens must match exactly.
+"""
+
+import hashlib
+import re
+import sqlite3
+import struct
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple, Any
+
+
+TOKEN = re.compile(r'\w+')
+
+SCHEMA = """
+CREATE TABLE documents (doc_id INTEGER PRIMARY KEY, text_hash TEXT UNIQUE NOT NULL, text TEXT NOT NULL);
+CREATE TABLE postings (
+    token TEXT NOT NULL, doc_id INTEGER NOT NULL, positions BLOB NOT NULL,
+    PRIMARY KEY (token, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX postings_doc ON postings (doc_id);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens of a text, in order."""
+    return [token.lower() for token in TOKEN.findall(text)]
+
+
+def pack_positions(positions: List[int]) -> bytes:
+    return struct.pack(f'<{len(positions)}I', *positions)
+
+
+def unpack_positions(data: bytes) -> Tuple[int, ...]:
+    return struct.unpack(f'<{len(data) // 4}I', data)
+
+
+def add_document(conn: sqlite3.Connection, text: str) -> int:
+    """doc_id of a text, storing and indexing it if it is new."""
+    text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    row = conn.execute("SELECT doc_id FROM documents WHERE text_hash = ?", (text_hash,)).fetchone()
+    if row:
+        return row[0]
+
+    doc_id = conn.execute("INSERT INTO documents (text_hash, text) VALUES (?, ?)", (text_hash, text)).lastrowid
+    positions = defaultdict(list)
+    for position, token in enumerate(tokenize(text)):
+        positions[token].append(position)
+    conn.executemany(
+        "INSERT INTO postings VALUES (?, ?, ?)",
+        [(token, doc_id, pack_positions(token_positions)) for token, token_positions in positions.items()]
+    )
+    return doc_id
+
+
+def prune_documents(conn: sqlite3.Connection, referenced: str):
+    """Drop documents (and their postings) not returned by the SQL query `referenced`."""
+    conn.execute(f"DELETE FROM postings WHERE doc_id NOT IN ({referenced})")
+    conn.execute(f"DELETE FROM documents WHERE doc_id NOT IN ({referenced})")
+
+
+def token_postings(conn: sqlite3.Connection, tokens: List[str], doc_ids: Iterable[int] = None) -> Dict[int, Set[int]]:
+    """doc_id -> positions of any of tokens (optionally only in doc_ids)."""
+    postings = defaultdict(set)
+    for token in tokens:
+        for doc_id, positions in conn.execute("SELECT doc_id, positions FROM postings WHERE token = ?", (token,)):
+            if doc_ids is None or doc_id in doc_ids:
+                postings[doc_id].update(unpack_positions(positions))
+    return postings
+
+
+def matching_tokens(conn: sqlite3.Connection, token: str, partial_start: bool, partial_end: bool,
+                    vocabulary: Dict[str, int]) -> List[str]:
+    """
+    Indexed tokens one phrase token can stand for.
+
+    partial_start: the phrase may start inside the word (the indexed token
+    only has to end with token); partial_end: it may end inside the word
+    (the indexed token only has to start with it).
+    """
+    if not partial_start and not partial_end:
+        return [token] if token in vocabulary else []
+    if not partial_start:
+        # Prefix: a range scan of the (token, doc_id) primary key
+        upper = token[:-1] + chr(ord(token[-1]) + 1)
+        return [row[0] for row in conn.execute(
+            "SELECT DISTINCT token FROM postings WHERE token >= ? AND token < ?", (token, upper))]
+    if not partial_end:
+        return [known for known in vocabulary if known.endswith(token)]
+    return [known for known in vocabulary if token in known]
+
+
+def find_documents(conn: sqlite3.Connection, phrase: str) -> Set[int]:
+    """doc_ids of the documents containing phrase (case-insensitive substring)."""
+    needle = phrase.lower()
+    spans = list(TOKEN.finditer(needle))
+    if not spans:
+        # Punctuation only - nothing to look up, check every document
+        candidates = [doc_id for (doc_id,) in conn.execute("SELECT doc_id FROM documents")]
+    else:
+        tokens = [span.group() for span in spans]
+        # Edge tokens only touching the ends of the phrase may be parts of longer words
+        partial_start = spans[0].start() == 0
+        partial_end = spans[-1].end() == len(needle)
+        vocabulary = dict(conn.execute("SELECT token, COUNT(*) FROM postings GROUP BY token"))
+        variants = [
+            matching_tokens(conn, token, i == 0 and partial_start, i == len(tokens) - 1 and partial_end, vocabulary)
+            for i, token in enumerate(tokens)
+        ]
+        if not all(variants):
+            return set()
+
+        # Rarest position first: it bounds the candidates
+        counts = [sum(vocabulary[token] for token in tokens_at) for tokens_at in variants]
+        order = sorted(range(len(tokens)), key=counts.__getitem__)
+        postings = {order[0]: token_postings(conn, variants[order[0]])}
+        doc_ids = set(postings[order[0]])
+        for i in order[1:]:
+            postings[i] = token_postings(conn, variants[i], doc_ids)
+            doc_ids &= set(postings[i])
+            if not doc_ids:
+                return set()
+
+        # Tokens of the phrase at consecutive positions
+        candidates = []
+        for doc_id in doc_ids:
+            if any(all(start + i in postings[i][doc_id] for i in range(1, len(tokens)))
+                   for start in postings[0][doc_id]):
+                candidates.append(doc_id)
+
+    # Exact check: the phrase's punctuation and spacing
+    found = set()
+    for doc_id in candidates:
+        text = conn.execute("SELECT text FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()[0]
+        if needle in text.lower():
+            found.add(doc_id)
+    return found
+
+
+def find_phrase(conn: sqlite3.Connection, phrase: str) -> List[Dict[str, Any]]:
+    """
+    Versions containing phrase, in semantic-version order.
+
+    Each match is {'version', 'where'} with where listing the system blocks
+    ("system block N") and tools ("tool Name") containing the phrase.
+    """
+    doc_ids = find_documents(conn, phrase)
+    if not doc_ids:
+        return []
+
+    marks = ','.join('?' * len(doc_ids))
+    rows = conn.execute(
+        f"SELECT v.version, 'system block ' || (s.position + 1) FROM system_blocks s "
+        f"JOIN versions v ON v.version = s.version WHERE s.doc_id IN ({marks}) "
+        f"UNION ALL "
+        f"SELECT v.version, 'tool ' || t.name FROM tools t "
+        f"JOIN versions v ON v.version = t.version WHERE t.description_doc IN ({marks}) "
+        f"ORDER BY 1",
+        list(doc_ids) * 2
+    )
+    where = defaultdict(list)
+    for version, location in rows:
+        where[version].append(location)
+
+    sort_keys = dict(conn.execute(
+        f"SELECT version, sort_key FROM versions WHERE version IN ({','.join('?' * len(where))})",
+        list(where)
+    ))
+    return [{'version': version, 'where': where[version]} for version in sorted(where, key=sort_keys.get)]
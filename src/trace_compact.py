@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Trace compaction: store repeated request payloads once.
+
+Every /v1/messages request body in a claude-trace log repeats the full
+system prompt, the full tool list and the whole conversation so far, which
+is most of a trace's bytes. This script:
+1. Rewrites a trace into <trace>.jsonl.compact, where each system block and
+   tool definition, each system/tools array, and each conversation prefix is
+   stored once as a blob record and referenced from the lines that repeat it
+2. Expands a compacted trace back to the byte-identical original
+3. Verifies every compacted trace against its original (SHA-256 of the
+   expanded bytes) before the original may be removed
+
+The extractors read .jsonl.compact traces directly (trace_reader expands
+them on the fly), so a compacted archive is also read from disk that much
+faster.
+
+Format (one record per line, in file order; no record contains a newline):
+    CTRACE <format>         header
+    B<id> <bytes>           blob <id>: bytes that may themselves contain refs
+    L<bytes>                one line of the original (without its newline)
+
+A ref is NUL <id> NUL - NUL never occurs in a JSON line, where control
+characters are always escaped. Only exact byte spans of the original line
+are replaced, so expansion is byte-identical by construction. Spans are
+found by re-encoding the parsed arrays in the trace's own JSON style
+(JSON.stringify's compact style, or Python's json.dumps style); a line whose
+arrays do not re-encode to the same bytes is simply stored as it is.
+A conversation prefix blob is the previous prefix's ref plus one message,
+so a request that adds one message to the conversation adds one blob.
+
+The reader keeps the blobs (unexpanded, about the size of the compacted
+file) in memory while reading a trace.
+
+Usage:
+    python trace_compact.py compact <trace_file> [<trace_file> ...] [--replace]
+    python trace_compact.py compact --all [--replace]
+    python trace_compact.py expand <trace.jsonl.compact> [-o <trace.jsonl>]
+    python trace_compact.py verify <trace.jsonl.compact> <original_trace>
+
+Examples:
+    python trace_compact.py compact --all
+    python trace_compact.py compact .claude-trace/log-2025-11-09-20-56-47_2.0.36.jsonl --replace
+    python trace_compact.py expand .claude-trace/log-2025-11-09-20-56-47_2.0.36.jsonl.compact
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Any
+
+
+COMPACT_SUFFIX = '.compact'
+
+# Bump when the record layout changes
+COMPACT_FORMAT = 1
+HEADER = f"CTRACE {COMPACT_FORMAT}\n".encode('ascii')
+
+REF = b'\x00'
+
+# Encoded items shorter than this stay inline (a ref costs a few bytes)
+MIN_BLOB_SIZE = 64
+
+# Request body arrays stored as blobs; messages are chained by prefix
+BLOB_KEYS = ('system', 'tools')
+CHAIN_KEYS = ('messages',)
+
+# JSON styles of trace writers: (item separator, key separator, ensure_ascii)
+JSON_STYLES = [
+    (',', ':', False),    # JSON.stringify (claude-trace)
+    (', ', ': ', True),   # Python json.dumps defaults
+    (', ', ': ', False),
+    (',', ':', True),
+]
+
+
+def ref(blob_id: int) -> bytes:
+    return REF + str(blob_id).encode('ascii') + REF
+
+
+def compact_path(trace_file: Path) -> Path:
+    """<name>.jsonl.compact for <name>.jsonl (or a compressed <name>.jsonl.gz)."""
+    # Imported here: trace_reader itself imports this module to read compact traces
+    from trace_reader import trace_name
+    return trace_file.with_name(trace_name(trace_file) + '.jsonl' + COMPACT_SUFFIX)
+
+
+class TraceCompactor:
+    """Writes the compact form of one trace, line by line."""
+
+    def __init__(self, out):
+        self.out = out
+        self.blob_ids: Dict[bytes, int] = {}
+        self.style = JSON_STYLES[0]
+        out.write(HEADER)
+
+    def blob(self, content: bytes) -> bytes:
+        """Ref of a blob with this content, writing the blob on first use."""
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        blob_id = self.blob_ids.get(digest)
+        if blob_id is None:
+            blob_id = self.blob_ids[digest] = len(self.blob_ids)
+            self.out.write(b'B' + str(blob_id).encode('ascii') + b' ' + content + b'\n')
+        return ref(blob_id)
+
+    def encode(self, value: Any, style: Tuple[str, str, bool]) -> bytes:
+        item_sep, key_sep, ensure_ascii = style
+        return json.dumps(value, separators=(item_sep, key_sep), ensure_ascii=ensure_ascii).encode('utf-8', 'surrogatepass')
+
+    def find_array(self, line: bytes, key: str, items: List[Any]) -> Optional[Tuple[int, List[bytes], bytes]]:
+        """(start, encoded items, item separator) of the array value of key in line, or None."""
+        # The style that matched last is tried first
+        for style in [self.style] + [style for style in JSON_STYLES if style != self.style]:
+            item_sep = style[0].encode('ascii')
+            encoded = [self.encode(item, style) for item in items]
+            needle = b'"' + key.encode('utf-8') + b'"' + style[1].encode('ascii') + b'[' + item_sep.join(encoded) + b']'
+            pos = line.find(needle)
+            if pos != -1:
+                self.style = style
+                return pos + len(needle) - (len(item_sep.join(encoded)) + 2), encoded, item_sep
+        return None
+
+    def compact_line(self, line: bytes) -> bytes:
+        """The line with its system/tools arrays and conversation prefix replaced by refs."""
+        if not line.strip():
+            return line
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            return line
+        request = entry.get('request') if isinstance(entry, dict) else None
+        body = request.get('body') if isinstance(request, dict) else None
+        if not isinstance(body, dict):
+            return line
+
+        for key in BLOB_KEYS + CHAIN_KEYS:
+            items = body.get(key)
+            if not isinstance(items, list) or not items:
+                continue
+            found = self.find_array(line, key, items)
+            if found is None:
+                continue
+            start, encoded, item_sep = found
+            end = start + len(item_sep.join(encoded)) + 2
+            if key in CHAIN_KEYS:
+                # Prefix chain: each blob is the previous prefix plus one message
+                prefix = b''
+                for item in encoded:
+                    prefix = self.blob(prefix + item_sep + item if prefix else item)
+                replacement = b'[' + prefix + b']'
+            else:
+                parts = [self.blob(item) if len(item) >= MIN_BLOB_SIZE else item for item in encoded]
+                replacement = self.blob(b'[' + item_sep.join(parts) + b']')
+            line = line[:start] + replacement + line[end:]
+        return line
+
+    def write_line(self, line: bytes):
+        if REF in line:
+            raise ValueError("NUL byte in a line - not a JSONL trace")
+        self.out.write(b'L' + self.compact_line(line) + b'\n')
+
+
+def compact_trace(trace_file: Path, output_file: Path) -> Tuple[int, int]:
+    """Write the compact form of a trace; returns (original bytes, compacted bytes)."""
+    from trace_reader import open_trace
+
+    original = 0
+    partial = output_file.with_name(output_file.name + '.partial')
+    try:
+        with open_trace(trace_file) as f, open(partial, 'wb') as out:
+            compactor = TraceCompactor(out)
+            # Split on b"\n" exactly: the last segment is what follows the last
+            # newline (empty if the trace ends with one)
+            pending = b''
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                original += len(chunk)
+                segments = (pending + chunk).split(b'\n')
+                pending = segments.pop()
+                for segment in segments:
+                    compactor.write_line(segment)
+            compactor.write_line(pending)
+    except ValueError as e:
+        partial.unlink(missing_ok=True)
+        raise ValueError(f"{trace_file.name}: {e}") from e
+    except BaseException:
+        # Interrupted or failed to read/write - don't leave a half-written file
+        partial.unlink(missing_ok=True)
+        raise
+    partial.replace(output_file)
+    return original, output_file.stat().st_size
+
+
+class CompactTraceReader:
+    """Expands the lines of a compacted trace in order."""
+
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+        self.blobs: Dict[int, List[bytes]] = {}
+
+    def expand(self, content: bytes, out: bytearray):
+        """Append content with its refs (recursively) expanded to out."""
+        # Explicit stack: conversation prefix chains nest one level per message
+        stack = [(content.split(REF), 0)]
+        blobs = self.blobs
+        while stack:
+            parts, i = stack.pop()
+            while i < len(parts):
+                if i % 2 == 0:
+                    out += parts[i]
+                    i += 1
+                else:
+                    stack.append((parts, i + 1))
+                    stack.append((blobs[int(parts[i])], 0))
+                    break
+
+    def lines(self) -> Iterator[bytes]:
+        """Yield every line of the original trace (without newline); the last is what follows the last newline."""
+        self.blobs = {}
+        with open(self.file_path, 'rb') as f:
+            if f.readline() != HEADER:
+                raise ValueError(f"{self.file_path.name} is not a compact trace (format {COMPACT_FORMAT})")
+            for record in f:
+                record = record[:-1] if record.endswith(b'\n') else record
+                kind = record[:1]
+                if kind == b'B':
+                    blob_id, content = record[1:].split(b' ', 1)
+                    self.blobs[int(blob_id)] = content.split(REF)
+                elif kind == b'L':
+                    line = bytearray()
+                    self.expand(record[1:], line)
+                    yield bytes(line)
+                else:
+                    raise ValueError(f"{self.file_path.name}: bad record {record[:20]!r}")
+
+
+class ExpandedStream(io.RawIOBase):
+    """Read-only stream of a compacted trace's original bytes (seek re-reads forward, like gzip)."""
+
+    def __init__(self, file_path: Path):
+        super().__init__()
+        self.reader = CompactTraceReader(file_path)
+        self.rewind()
+
+    def rewind(self):
+        self.lines = self.reader.lines()
+        self.buffer = b''
+        self.offset = 0
+        self.position = 0
+        self.first = True
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def readinto(self, b) -> int:
+        while self.offset == len(self.buffer):
+            line = next(self.lines, None)
+            if line is None:
+                return 0
+            self.buffer = line if self.first else b'\n' + line
+            self.offset = 0
+            self.first = False
+        n = min(len(b), len(self.buffer) - self.offset)
+        b[:n] = self.buffer[self.offset:self.offset + n]
+        self.offset += n
+        self.position += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("can only seek from the start or the current position")
+        if offset < self.position:
+            self.rewind()
+        skip = bytearray(1 << 20)
+        while self.position < offset:
+            if not self.readinto(memoryview(skip)[:min(len(skip), offset - self.position)]):
+                break
+        return self.position
+
+
+def open_compact(file_path: Path) -> io.BufferedReader:
+    """Open a compacted trace as a binary stream of the original bytes."""
+    return io.BufferedReader(ExpandedStream(file_path), buffer_size=1 << 20)
+
+
+def iter_compact_lines(file_path: Path) -> Iterator[bytes]:
+    """Yield the original lines of a compacted trace (without newlines)."""
+    return CompactTraceReader(file_path).lines()
+
+
+def stream_digest(f) -> Tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: f.read(1 << 20), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def verify(compact_file: Path, trace_file: Path) -> bool:
+    """Whether a compacted trace expands to exactly the original's bytes."""
+    from trace_reader import open_trace
+    with open_compact(compact_file) as expanded, open_trace(trace_file) as original:
+        return stream_digest(expanded) == stream_digest(original)
+
+
+def main():
+    # Argument parsing
+    parser = argparse.ArgumentParser(
+        description='Compact traces by storing repeated system/tools/conversation payloads once',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s compact --all
+  %(prog)s compact .claude-trace/log-2025-11-09-20-56-47_2.0.36.jsonl --replace
+  %(prog)s expand .claude-trace/log-2025-11-09-20-56-47_2.0.36.jsonl.compact
+        """
+    )
+    parser.add_argument(
+        'command',
+        choices=['compact', 'expand', 'verify'],
+        help='compact traces, expand a compacted trace, or verify one against its original'
+    )
+    parser.add_argument(
+        'files',
+        nargs='*',
+        help='Trace file(s) for compact; a .compact file for expand; a .compact file and its original for verify'
+    )
+    parser.add_argument(
+        '--all',
+        action='store_true',
+        help='Compact all trace files in .claude-trace/ directory'
+    )
+    parser.add_argument(
+        '--replace',
+        action='store_true',
+        help='Remove each original once its compacted trace is verified'
+    )
+    parser.add_argument(
+        '-o', '--output',
+        type=Path,
+        help='Output file for expand (default: the .compact name without its suffix)'
+    )
+
+    args = parser.parse_args()
+
+    if args.command == 'verify':
+        if len(args.files) != 2:
+            parser.error('verify takes a .compact file and its original trace')
+        if verify(Path(args.files[0]), Path(args.files[1])):
+            print(f"  ✓ {Path(args.files[0]).name} expands to {Path(args.files[1]).name}")
+        else:
+            print(f"  ✗ {Path(args.files[0]).name} does not match {Path(args.files[1]).name}")
+            sys.exit(1)
+        return
+
+    if args.command == 'expand':
+        if len(args.files) != 1 or not args.files[0].endswith(COMPACT_SUFFIX):
+            parser.error('expand takes one .compact file')
+        compact_file = Path(args.files[0])
+        output_file = args.output or compact_file.with_name(compact_file.name[:-len(COMPACT_SUFFIX)])
+        with open_compact(compact_file) as expanded, open(output_file, 'wb') as out:
+            for chunk in iter(lambda: expanded.read(1 << 20), b''):
+                out.write(chunk)
+        print(f"  ✓ Expanded {compact_file.name} to {output_file}")
+        return
+
+    from trace_reader import find_traces
+    if args.all:
+        trace_files = [path for path in find_traces(Path('.claude-trace')) if path.suffix != COMPACT_SUFFIX]
+    else:
+        trace_files = [Path(file) for file in args.files]
+    if not trace_files:
+        parser.error('Provide trace file(s) or --all')
+
+    print("=" * 80)
+    print("TRACE COMPACTION")
+    print("=" * 80)
+    total_original = 0
+    total_compact = 0
+    for trace_file in trace_files:
+        if trace_file.suffix == COMPACT_SUFFIX:
+            print(f"  ⊘ {trace_file.name}: already compacted")
+            continue
+        output_file = compact_path(trace_file)
+        try:
+            original, compacted = compact_trace(trace_file, output_file)
+        except ValueError as e:
+            print(f"  ✗ {e}")
+            continue
+        if not verify(output_file, trace_file):
+            output_file.unlink()
+            print(f"  ✗ {trace_file.name}: compacted trace does not expand to the original - removed")
+            continue
+        total_original += original
+        total_compact += compacted
+        ratio = original / compacted if compacted else 0
+        print(f"  ✓ {trace_file.name}: {original / 1e6:.1f} MB → {compacted / 1e6:.1f} MB ({ratio:.1f}x)")
+        if args.replace:
+            trace_file.unlink()
+            print(f"    Removed {trace_file.name}")
+
+    if total_compact:
+        print("")
+        print(f"Total: {total_original / 1e6:.1f} MB → {total_compact / 1e6:.1f} MB "
+              f"({total_original / total_compact:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
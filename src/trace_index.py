@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Sidecar byte-offset index for random access into trace files.
+
+Each trace gets a <trace file>.idx file next to it (log-..._2.0.36.jsonl.idx,
+or .jsonl.gz.idx, .jsonl.compact.idx, ...), built in one pass and rebuilt
+only when the trace's size or mtime changes. Per entry it stores the byte
+offset and length of the line, the endpoint type (as classified by
+request_flow.py), the model, the message count and a hash of the request
+body, so "entry 42" is one seek into the index and one read from the trace.
+
+Index layout:
+    line 1:  JSON header {"format", "rules", "size", "mtime_ns", "count", "types", "models"}
+    then:    count fixed-size records (offset, length, type code, model code,
+             message count, body hash) - record N is at header + N * RECORD.size
+
+Entry numbers are the same idx the extractors use (non-blank lines, from 0).
+Compressed traces are indexed by offsets into the decompressed stream, so a
+lookup there still decompresses everything before the entry.
+
+Usage:
+    python trace_index.py build <trace_file> [<trace_file> ...]
+    python trace_index.py build --all
+    python trace_index.py list <trace_file>
+    python trace_index.py show <trace_file> <entry>
+
+Examples:
+    python trace_index.py build --all
+    python trace_index.py list .claude-trace/log-2025-11-09-20-56-47_2.0.36.jsonl
+    python trace_index.py show .claude-trace/log-2025-11-09-20-56-47_2.0.36.jsonl 7
+"""
+
+import argparse
+import hashlib
+import json
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, NamedTuple, Optional, Any
+
+from blob_store import encode_blob, write_if_changed
+from classifier import RULES
+from json_backend import loads
+from trace_reader import find_traces, open_trace
+
+
+INDEX_SUFFIX = '.idx'
+
+# Bump when the record layout changes so indexes are rebuilt (a change of the
+# classification rules is caught by their digest in the header)
+INDEX_FORMAT = 1
+
+# offset, length, type code, model code (0 = none), message count (-1 = none), body hash
+RECORD = struct.Struct('<QIBHi8s')
+
+
+class IndexEntry(NamedTuple):
+    """One indexed trace entry."""
+    offset: int
+    length: int
+    req_type: str
+    model: Optional[str]
+    msg_count: Optional[int]
+    body_hash: str
+
+
+def index_path(trace_file: Path) -> Path:
+    """Sidecar index file of a trace (log-..._2.0.36.jsonl.idx)."""
+    return trace_file.with_name(trace_file.name + INDEX_SUFFIX)
+
+
+def build_index(trace_file: Path) -> Path:
+    """Scan a trace once and write its sidecar index."""
+    # Imported here: request_flow can itself use the index
+    from request_flow import classify_endpoint_type
+
+    types = []
+    models = [None]
+    records = []
+    stat = trace_file.stat()
+
+    with open_trace(trace_file) as f:
+        offset = 0
+        for line in f:
+            if line.strip():
+                entry = loads(line)
+                request = entry.get('request', {})
+                body = request.get('body')
+                req_type, _ = classify_endpoint_type(request.get('url', ''), request.get('method', 'UNKNOWN'))
+                model = body.get('model') if isinstance(body, dict) else None
+                messages = body.get('messages') if isinstance(body, dict) else None
+
+                if req_type not in types:
+                    types.append(req_type)
+                if model not in models:
+                    models.append(model)
+
+                records.append(RECORD.pack(
+                    offset,
+                    len(line),
+                    types.index(req_type),
+                    models.index(model),
+                    len(messages) if isinstance(messages, list) else -1,
+                    hashlib.sha256(encode_blob(body)).digest()[:8]
+                ))
+            offset += len(line)
+
+    header = {
+        'format': INDEX_FORMAT,
+        'rules': RULES.digest,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'count': len(records),
+        'types': types,
+        'models': models
+    }
+    output_file = index_path(trace_file)
+    write_if_changed(output_file, json.dumps(header).encode('utf-8') + b'\n' + b''.join(records))
+    return output_file
+
+
+class TraceIndex:
+    """
+    Random access to the entries of one trace through its sidecar index.
+
+    The index is (re)built on open if it is missing or the trace changed.
+    """
+
+    def __init__(self, trace_file: Path):
+        self.trace_file = trace_file
+        self.index_file = index_path(trace_file)
+        self.rebuilt = False
+
+        header = self.read_header()
+        if header is None:
+            build_index(trace_file)
+            self.rebuilt = True
+            header = self.read_header()
+
+        self.count = header['count']
+        self.types = header['types']
+        self.models = header['models']
+        self.records_start = header['records_start']
+
+    def read_header(self) -> Optional[Dict[str, Any]]:
+        """Return the index header, or None if the index is missing or stale."""
+        if not self.index_file.exists():
+            return None
+        with open(self.index_file, 'rb') as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                return None
+            header['records_start'] = f.tell()
+
+        stat = self.trace_file.stat()
+        if (header.get('format') != INDEX_FORMAT or header.get('rules') != RULES.digest
+                or header.get('size') != stat.st_size or header.get('mtime_ns') != stat.st_mtime_ns):
+            return None
+        return header
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, idx: int) -> IndexEntry:
+        """Index record of entry idx (one seek into the index)."""
+        if not 0 <= idx < self.count:
+            raise IndexError(f"entry {idx} out of range (trace has {self.count} entries)")
+        with open(self.index_file, 'rb') as f:
+            f.seek(self.records_start + idx * RECORD.size)
+            return self.unpack(f.read(RECORD.size))
+
+    def unpack(self, record: bytes) -> IndexEntry:
+        offset, length, type_code, model_code, msg_count, body_hash = RECORD.unpack(record)
+        return IndexEntry(offset, length, self.types[type_code], self.models[model_code],
+                          msg_count if msg_count >= 0 else None, body_hash.hex())
+
+    def __iter__(self) -> Iterator[IndexEntry]:
+        with open(self.index_file, 'rb') as f:
+            f.seek(self.records_start)
+            for _ in range(self.count):
+                yield self.unpack(f.read(RECORD.size))
+
+    def read_entry(self, idx: int) -> Dict[str, Any]:
+        """Decode entry idx (one seek and read into the trace)."""
+        record = self[idx]
+        with open_trace(self.trace_file) as f:
+            f.seek(record.offset)
+            return loads(f.read(record.length))
+
+
+def read_entry(trace_file: Path, idx: int) -> Dict[str, Any]:
+    """Decode one trace entry by index, building the sidecar index if needed."""
+    return TraceIndex(trace_file).read_entry(idx)
+
+
+def list_entries(trace_file: Path):
+    """Print the index of a trace as a table."""
+    index = TraceIndex(trace_file)
+    print("=" * 120)
+    print(f"TRACE INDEX - {trace_file.name} ({len(index)} entries)")
+    print("=" * 120)
+    for idx, record in enumerate(index):
+        msgs = '' if record.msg_count is None else f"msgs:{record.msg_count}"
+        print(f"  [{idx:2d}] {record.req_type:10s} | {record.model or '-':32s} {msgs:9s} "
+              f"@{record.offset} +{record.length} {record.body_hash}")
+    print("")
+
+
+def main():
+    # Argument parsing
+    parser = argparse.ArgumentParser(
+        description='Build and query sidecar byte-offset indexes of trace files',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s build --all
+  %(prog)s list .claude-trace/log-2025-11-09-20-56-47_2.0.36.jsonl
+  %(prog)s show .claude-trace/log-2025-11-09-20-56-47_2.0.36.jsonl 7
+        """
+    )
+    parser.add_argument(
+        'command',
+        choices=['build', 'list', 'show'],
+        help='build indexes, list an index, or print one entry as JSON'
+    )
+    parser.add_argument(
+        'args',
+        nargs='*',
+        help='Trace file(s) for build/list; trace file and entry number for show'
+    )
+    parser.add_argument(
+        '--all',
+        action='store_true',
+        help='Build indexes for all trace files in .claude-trace/ directory'
+    )
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        trace_files = find_traces(Path('.claude-trace')) if args.all else [Path(a) for a in args.args]
+        if not trace_files:
+            parser.error('Provide trace file(s) or --all')
+        for trace_file in trace_files:
+            index = TraceIndex(trace_file)
+            status = 'built' if index.rebuilt else 'up to date'
+            print(f"  ✓ {trace_file.name}: {len(index)} entries ({status})")
+        return
+
+    if args.command == 'list':
+        if len(args.args) != 1:
+            parser.error('list takes one trace file')
+        list_entries(Path(args.args[0]))
+        return
+
+    if len(args.args) != 2 or not args.args[1].isdigit():
+        parser.error('show takes a trace file and an entry number')
+    try:
+        entry = read_entry(Path(args.args[0]), int(args.args[1]))
+    except IndexError as e:
+        print(f"Error: {e}")
+        return
+    print(json.dumps(entry, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
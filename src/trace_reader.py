@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Shared trace reading helpers for the extraction scripts.
+
+Trace files are JSONL logs written by claude-trace. Long sessions can reach
+hundreds of MB because every /v1/messages body repeats the full system prompt
+and tool list, so entries are yielded lazily: callers that only need the
+first matching request can stop reading as soon as they find it.
+
+Traces are memory-mapped a window at a time (WINDOW_SIZE, grown only for a
+longer line) and split on b"\n" in the mapped buffer. Each line goes to
+json_backend (orjson when installed) as a memoryview slice - no per-line
+bytes copy and no separate UTF-8 decode - and a window is unmapped once its
+lines are consumed, so peak memory does not grow with the trace size.
+
+Archived traces may be compressed (.jsonl.gz, .jsonl.xz, .jsonl.bz2); they
+are read through streaming decompression instead. find_traces() lists both
+kinds and trace_version() parses the version from either file name.
+
+Extractors that only look at some requests can pass byte markers to
+iter_entries(): a line is only decoded if its raw bytes match every marker.
+Markers must never reject a line the extractor would match - they are a
+cheap necessary condition, not the match itself.
+
+A plain trace can also be split into newline-aligned byte ranges
+(split_trace()) that are read independently, so several worker processes
+can parse one huge trace (batch.map_chunks()).
+"""
+
+import bz2
+import gzip
+import lzma
+import mmap
+import os
+import re
+from contextlib import closing
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Pattern, Sequence, Tuple, Union, Any
+
+import profiling
+from json_backend import loads
+from trace_compact import COMPACT_SUFFIX, iter_compact_lines, open_compact
+
+
+# Bytes mapped at a time (a multiple of mmap.ALLOCATIONGRANULARITY)
+WINDOW_SIZE = 64 * 1024 * 1024
+
+NON_BLANK = re.compile(rb'\S')
+
+# Compressed trace suffix -> opener (binary mode, streaming decompression)
+COMPRESSED_OPENERS = {
+    '.gz': gzip.open,
+    '.xz': lzma.open,
+    '.bz2': bz2.open
+}
+
+TRACE_PATTERNS = ['*.jsonl'] + [f"*.jsonl{suffix}" for suffix in list(COMPRESSED_OPENERS) + [COMPACT_SUFFIX]]
+
+
+def is_compressed(file_path: Path) -> bool:
+    return file_path.suffix in COMPRESSED_OPENERS
+
+
+def is_compact(file_path: Path) -> bool:
+    return file_path.suffix == COMPACT_SUFFIX
+
+
+def open_trace(file_path: Path) -> BinaryIO:
+    """Open a trace for binary reading, decompressing .gz/.xz/.bz2 and expanding .compact on the fly."""
+    if is_compact(file_path):
+        return open_compact(file_path)
+    opener = COMPRESSED_OPENERS.get(file_path.suffix)
+    return opener(file_path, 'rb') if opener else open(file_path, 'rb')
+
+
+def trace_name(file_path: Path) -> str:
+    """File name without the .jsonl and compression/compaction suffixes."""
+    name = file_path.name
+    if is_compressed(file_path) or is_compact(file_path):
+        name = name[:-len(file_path.suffix)]
+    return name[:-len('.jsonl')] if name.endswith('.jsonl') else Path(name).stem
+
+
+def trace_version(file_path: Path) -> str:
+    """Version from a trace file name (last part after underscore), e.g. 2.0.36."""
+    return trace_name(file_path).split('_')[-1]
+
+
+def find_traces(trace_dir: Path) -> List[Path]:
+    """
+    All plain, compressed and compacted trace files in a directory, sorted by name.
+
+    A trace kept in several forms (x.jsonl next to x.jsonl.compact, e.g.
+    before compacting with --replace) is listed once, in the first form of
+    TRACE_PATTERNS - the plain file if there is one.
+    """
+    traces = {}
+    for pattern in TRACE_PATTERNS:
+        for path in sorted(trace_dir.glob(pattern)):
+            traces.setdefault(trace_name(path), path)
+    return sorted(traces.values())
+
+
+def is_splittable(file_path: Path) -> bool:
+    """Whether a trace can be read from any line start (plain .jsonl, not compressed or compacted)."""
+    return not (is_compressed(file_path) or is_compact(file_path))
+
+
+def split_trace(file_path: Path, chunks: int) -> List[Tuple[int, int]]:
+    """
+    Split a plain trace into up to `chunks` (start, end) byte ranges.
+
+    Every range but the first starts right after a newline, so each line is
+    in exactly one range and the ranges cover the file in order.
+    """
+    size = file_path.stat().st_size
+    bounds = [0]
+    with open(file_path, 'rb') as f:
+        for i in range(1, chunks):
+            target = size * i // chunks
+            if target <= bounds[-1]:
+                continue
+            f.seek(target - 1)
+            f.readline()
+            if f.tell() >= size:
+                break
+            bounds.append(f.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def iter_lines(file_path: Path, byte_range: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[Union[mmap.mmap, bytes], int, int]]:
+    """
+    Yield (buffer, start, end) for every non-blank line of a trace.
+
+    buffer[start:end] is the line without its newline. For a plain trace the
+    buffer is a mapped window of the file, for a compressed one the line
+    itself; either way it is only valid until the next line is requested.
+
+    byte_range limits a plain trace to the lines in one (start, end) range
+    of split_trace().
+    """
+    if byte_range is not None and not is_splittable(file_path):
+        raise ValueError(f"{file_path.name} can only be read from the start")
+
+    if is_compact(file_path):
+        for line in iter_compact_lines(file_path):
+            if NON_BLANK.search(line):
+                yield line, 0, len(line)
+        return
+
+    if is_compressed(file_path):
+        with open_trace(file_path) as f:
+            for line in f:
+                if NON_BLANK.search(line):
+                    yield line, 0, len(line) - line.endswith(b'\n')
+        return
+
+    with open(file_path, 'rb') as f:
+        offset, size = byte_range or (0, os.fstat(f.fileno()).st_size)
+        window = WINDOW_SIZE
+        while offset < size:
+            base = offset - offset % mmap.ALLOCATIONGRANULARITY
+            length = min(window, size - base)
+            with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ, offset=base) as buffer:
+                if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    buffer.madvise(mmap.MADV_SEQUENTIAL)
+                pos = offset - base
+                while pos < length:
+                    end = buffer.find(b'\n', pos)
+                    if end == -1:
+                        if base + length < size:
+                            # Line continues past the window - remap from its start
+                            break
+                        end = length
+                    if NON_BLANK.search(buffer, pos, end):
+                        yield buffer, pos, end
+                    pos = end + 1
+
+            if base + pos == offset:
+                # Not even one whole line fitted - map a bigger window
+                window *= 2
+            else:
+                window = WINDOW_SIZE
+            offset = base + pos
+
+
+def decode_line(buffer: Union[mmap.mmap, bytes], start: int, end: int) -> Any:
+    """JSON-decode buffer[start:end] without copying it."""
+    with memoryview(buffer)[start:end] as line:
+        return loads(line)
+
+
+def iter_jsonl(file_path: Path, byte_range: Optional[Tuple[int, int]] = None) -> Iterator[Dict[str, Any]]:
+    """Yield parsed entries from a JSONL file (or one of its byte ranges) one line at a time."""
+    for _, entry in iter_entries(file_path, byte_range=byte_range):
+        yield entry
+
+
+# JSON writers may escape "/" as "\/"
+MESSAGES_MARKER = re.compile(rb'\\?/v1\\?/messages')
+SONNET_MARKER = re.compile(rb'sonnet', re.IGNORECASE)
+
+# Lines that can hold a /v1/messages request to a Sonnet model
+SONNET_MESSAGE_MARKERS = (MESSAGES_MARKER, SONNET_MARKER)
+
+
+def iter_entries(file_path: Path, markers: Sequence[Pattern[bytes]] = (),
+                 byte_range: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yield (idx, entry) for the lines whose raw bytes match every marker.
+
+    Lines without a match are skipped before JSON decoding. idx counts every
+    non-blank line, so it is the same index enumerate(iter_jsonl()) gives;
+    for a byte range (see split_trace()) it counts from the range start.
+    Read to the end, the generator returns (as its StopIteration value) the
+    number of non-blank lines it read.
+    """
+    if profiling.enabled():
+        return (yield from iter_entries_profiled(file_path, markers, byte_range))
+
+    idx = -1
+    for idx, (buffer, start, end) in enumerate(iter_lines(file_path, byte_range)):
+        if all(marker.search(buffer, start, end) for marker in markers):
+            yield idx, decode_line(buffer, start, end)
+    return idx + 1
+
+
+def iter_entries_profiled(file_path: Path, markers: Sequence[Pattern[bytes]] = (),
+                          byte_range: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """iter_entries() with load/decode timings and entry counters (--profile)."""
+    lines = enumerate(iter_lines(file_path, byte_range))
+    idx = -1
+    while True:
+        with profiling.stage('load'):
+            for idx, (buffer, start, end) in lines:
+                profiling.count('entries scanned')
+                profiling.count('bytes read', end - start + 1)
+                if all(marker.search(buffer, start, end) for marker in markers):
+                    break
+                profiling.count('entries skipped')
+            else:
+                return idx + 1
+        with profiling.stage('decode'):
+            entry = decode_line(buffer, start, end)
+        profiling.count('entries decoded')
+        yield idx, entry
+
+
+def find_entry(file_path: Path, markers: Sequence[Pattern[bytes]], match: Callable[[int, Dict[str, Any]], Any],
+               byte_range: Optional[Tuple[int, int]] = None) -> Tuple[int, Any]:
+    """
+    First truthy match(idx, entry) over the entries iter_entries() yields.
+
+    Returns (entries, result): entries is the number of non-blank lines read,
+    i.e. all of them when nothing matched (result is then None), so a search
+    of one chunk also tells batch.first_match() where the next chunk starts.
+    """
+    entries = iter_entries(file_path, markers, byte_range)
+    with closing(entries):
+        while True:
+            try:
+                idx, entry = next(entries)
+            except StopIteration as done:
+                return done.value, None
+            with profiling.stage('extract'):
+                result = match(idx, entry)
+            if result:
+                return idx + 1, result
+
+
+def load_jsonl(file_path: Path) -> List[Dict[str, Any]]:
+    """Load JSONL file into list of parsed entries."""
+    return list(iter_jsonl(file_path))
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Version ordering and loaders for extracted per-version outputs.
+
+Output files are named by version (tools_2.0.36.json, system_prompt_2.0.9.txt)
+and plain string sorting puts 2.0.10 before 2.0.9, so cross-version tools use
+version_key() for semantic-version order. Loaders read the full per-version
+files when present and fall back to the blob store manifests otherwise
+(request flows: the JSON sidecar, falling back to parsing the .txt report).
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Any
+
+import blob_store
+from request_flow import FlowRequest, load_flow_json
+
+
+TOOLS_DIR = Path('output/tool_definitions')
+SYSTEM_PROMPTS_DIR = Path('output/system_prompts')
+REQUEST_FLOWS_DIR = Path('output/request_flows')
+
+BLOCK_HEADER = re.compile(r'^BLOCK \d+ - TYPE: (\S+)$')
+FLOW_TURN = re.compile(r'^  (?:🎬|💬) Turn (\d+) - ')
+FLOW_REQUEST = re.compile(r'^  \[\s*\d+\] (\S+)\s* \| (.*)$')
+
+
+def version_key(version: str) -> Tuple:
+    """Sort key for semantic versions ("2.0.9" < "2.0.10"); non-numeric parts sort as text."""
+    return tuple(
+        (0, int(part), '') if part.isdigit() else (1, 0, part)
+        for part in re.split(r'[.\-+]', version)
+    )
+
+
+def sort_key(version: str) -> str:
+    """
+    version_key() as text, for ORDER BY in SQL (analytics_db.py).
+
+    Each part of the key becomes a fixed-width field, so comparing the
+    strings compares the tuples.
+    """
+    return '.'.join(f"{kind}{number:010d}{text}" for kind, number, text in version_key(version))
+
+
+def sort_versions(versions) -> List[str]:
+    """Return versions in semantic-version order."""
+    return sorted(versions, key=version_key)
+
+
+def file_signature(*candidates: Path) -> Optional[str]:
+    """Signature (path, size, mtime) of the first existing candidate file."""
+    for path in candidates:
+        if path.exists():
+            stat = path.stat()
+            return f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+    return None
+
+
+def tool_versions(output_dir: Path = TOOLS_DIR) -> List[str]:
+    """Versions with extracted tool definitions (full JSON or store manifest)."""
+    versions = {
+        path.stem[len('tools_'):]
+        for path in output_dir.glob('tools_*.json')
+        if not path.name.startswith('tools_no_mcp_')
+    }
+    versions.update(blob_store.manifest_versions(output_dir, 'tools_'))
+    return sort_versions(versions)
+
+
+def load_tools(version: str, output_dir: Path = TOOLS_DIR) -> Optional[List[Dict[str, Any]]]:
+    """Load a version's tool definitions, or None if it was never extracted."""
+    json_file = output_dir / f"tools_{version}.json"
+    if json_file.exists():
+        with open(json_file, 'r', encoding='utf-8') as f:
+            return json.load(f)['tools']
+
+    tools_data = blob_store.load_tools_data(version, output_dir)
+    return tools_data['tools'] if tools_data else None
+
+
+def parse_system_prompt_file(file_path: Path) -> Dict[str, Any]:
+    """
+    Parse a system_prompt_{version}.txt file back into its prompt dict.
+
+    Inverse of extract_system_prompts.save_system_prompt(): returns a dict with
+    entry_idx, block_count and system (text blocks as {'type': 'text', 'text': ...},
+    other block types from their JSON dump).
+    """
+    separator = "=" * 120
+    with open(file_path, 'r', encoding='utf-8') as f:
+        lines = f.read().split('\n')
+
+    entry_idx = None
+    for line in lines[:8]:
+        if line.startswith('Extracted from entry: '):
+            entry_idx = int(line[len('Extracted from entry: '):])
+
+    headers = [
+        i for i in range(1, len(lines) - 1)
+        if lines[i - 1] == separator and lines[i + 1] == separator and BLOCK_HEADER.match(lines[i])
+    ]
+    end = max(i for i, line in enumerate(lines) if line == 'END OF SYSTEM PROMPT') - 1
+
+    system = []
+    for k, header in enumerate(headers):
+        # Layout: separator, header, separator, blank, content..., blank, next separator
+        stop = headers[k + 1] - 1 if k + 1 < len(headers) else end
+        content = '\n'.join(lines[header + 3:stop - 1])
+        block_type = BLOCK_HEADER.match(lines[header]).group(1).lower()
+        if block_type == 'text':
+            system.append({'type': 'text', 'text': content})
+        else:
+            system.append(json.loads(content))
+
+    return {
+        'entry_idx': entry_idx,
+        'system': system,
+        'block_count': len(system)
+    }
+
+
+def system_prompt_versions(output_dir: Path = SYSTEM_PROMPTS_DIR) -> List[str]:
+    """Versions with an extracted system prompt (text file or store manifest)."""
+    versions = {path.stem[len('system_prompt_'):] for path in output_dir.glob('system_prompt_*.txt')}
+    versions.update(blob_store.manifest_versions(output_dir, 'system_prompt_'))
+    return sort_versions(versions)
+
+
+def load_system_blocks(version: str, output_dir: Path = SYSTEM_PROMPTS_DIR) -> Optional[List[Dict[str, Any]]]:
+    """Load a version's system blocks, or None if it was never extracted."""
+    text_file = output_dir / f"system_prompt_{version}.txt"
+    if text_file.exists():
+        return parse_system_prompt_file(text_file)['system']
+
+    prompt_data = blob_store.load_prompt_data(version, output_dir)
+    return prompt_data['system'] if prompt_data else None
+
+
+def parse_request_flow_file(file_path: Path) -> List[FlowRequest]:
+    """
+    Parse a request_flow_{version}.txt report back into its structured flow.
+
+    Request lines ("  [ 3] MESSAGE    | purpose") are followed by "Model:" and
+    "Msgs:" detail lines for MESSAGE requests; turn headers set the turn.
+    Message content is always indented deeper, so it never matches.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        lines = f.read().split('\n')
+
+    flow = []
+    turn = 0
+    for i, line in enumerate(lines):
+        turn_match = FLOW_TURN.match(line)
+        if turn_match:
+            turn = int(turn_match.group(1))
+            continue
+        request_match = FLOW_REQUEST.match(line)
+        if not request_match:
+            continue
+
+        model = None
+        msg_count = None
+        for detail in lines[i + 1:i + 3]:
+            detail = detail.strip()
+            if detail.startswith('Model: '):
+                model = detail[len('Model: '):]
+            elif detail.startswith('Msgs: '):
+                msg_count = int(detail[len('Msgs: '):].split(',')[0])
+        flow.append(FlowRequest(request_match.group(1), request_match.group(2), model, msg_count, turn))
+
+    return flow
+
+
+def request_flow_versions(output_dir: Path = REQUEST_FLOWS_DIR) -> List[str]:
+    """Versions with a request flow (JSON sidecar or .txt report)."""
+    versions = {path.stem[len('request_flow_'):] for path in output_dir.glob('request_flow_*.txt')}
+    versions.update(path.stem[len('request_flow_'):] for path in output_dir.glob('request_flow_*.json'))
+    return sort_versions(versions)
+
+
+def load_request_flow(version: str, output_dir: Path = REQUEST_FLOWS_DIR) -> Optional[List[FlowRequest]]:
+    """Load a version's structured request flow, or None if it was never analyzed."""
+    json_file = output_dir / f"request_flow_{version}.json"
+    if json_file.exists():
+        return load_flow_json(json_file)
+
+    text_file = output_dir / f"request_flow_{version}.txt"
+    if text_file.exists():
+        return parse_request_flow_file(text_file)
+    return None
@@ -0,0 +1,25 @@
+"""
+Shared test setup.
+
+The scripts in src/ (and the trace generator in benchmarks/) import each
+other by plain module name, so both directories go on sys.path the same way
+running a script from them would put them there.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT / 'src'), str(ROOT / 'benchmarks')]
+
+from synthetic_trace import generate_trace  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def synthetic_trace(tmp_path_factory) -> Path:
+    """A deterministic ~3 MB trace named like a real one (version 2.0.36)."""
+    trace_file = tmp_path_factory.mktemp('traces') / 'log-2025-11-09-20-56-47_2.0.36.jsonl'
+    generate_trace(trace_file, 3 * 1024 * 1024, turns_per_session=8)
+    return trace_file
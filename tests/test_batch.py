@@ -0,0 +1,49 @@
+"""Tests for batch: parallel chunk searches must find what a sequential scan finds."""
+
+import json
+
+import pytest
+
+import batch
+from extract_system_prompts import extract_system_prompt_from_chunk, extract_system_prompt_from_file
+from extract_tools import extract_tools_from_chunk, extract_tools_from_file
+from synthetic_trace import HAIKU
+
+EXTRACTORS = [
+    (extract_tools_from_file, extract_tools_from_chunk),
+    (extract_system_prompt_from_file, extract_system_prompt_from_chunk),
+]
+
+
+def haiku_lines(count: int) -> bytes:
+    """Lines no first-match extractor matches."""
+    line = {'request': {'url': 'https://api.anthropic.com/v1/messages', 'method': 'POST',
+                        'body': {'model': HAIKU, 'messages': [{'role': 'user', 'content': 'quota ' + 'x' * 2000}]}},
+            'response': {'body_raw': ''}}
+    return (json.dumps(line).encode() + b'\n\n') * count
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(batch, 'MIN_CHUNK_SIZE', 32 * 1024)
+
+
+@pytest.mark.parametrize('sequential, chunk_worker', EXTRACTORS)
+@pytest.mark.parametrize('padding', [0, 40, 400])
+def test_first_match_matches_sequential(tmp_path, synthetic_trace, small_chunks, sequential, chunk_worker, padding):
+    # The match is in the first chunk or a later one
+    trace_file = tmp_path / synthetic_trace.name
+    trace_file.write_bytes(haiku_lines(padding) + synthetic_trace.read_bytes())
+    assert len(batch.chunk_ranges(trace_file, 2)) > 1
+
+    expected = sequential(trace_file)
+    assert expected['entry_idx'] >= padding
+    assert batch.first_match(chunk_worker, trace_file, 2) == expected
+
+
+@pytest.mark.parametrize('sequential, chunk_worker', EXTRACTORS)
+def test_first_match_without_a_match(tmp_path, small_chunks, sequential, chunk_worker):
+    trace_file = tmp_path / 'log_2.0.1.jsonl'
+    trace_file.write_bytes(haiku_lines(100))
+    assert sequential(trace_file) is None
+    assert batch.first_match(chunk_worker, trace_file, 2) is None
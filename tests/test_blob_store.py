@@ -0,0 +1,12 @@
+"""Tests for blob_store: any decoded trace text can be hashed, stored and read back."""
+
+from blob_store import BlobStore, hash_blob
+
+
+def test_lone_surrogate_blob_round_trip(tmp_path):
+    store = BlobStore(tmp_path)
+    block = {'type': 'text', 'text': 'Done \ud83d - ✓'}
+    digest = store.put(block)
+    assert digest == hash_blob(block)
+    assert store.get(digest) == block
+    assert store.put(dict(block)) == digest and store.written == 1
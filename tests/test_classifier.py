@@ -0,0 +1,178 @@
+"""Tests for classifier: the rules file must classify like the old substring loops."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from classifier import KeywordMatcher, RULES_FILE, load_rules
+from request_flow import (EntryView, classify_endpoint_type, classify_message_purpose, extract_tool_calls,
+                          extract_user_message)
+from synthetic_trace import HAIKU, SONNET, sse_body
+from trace_reader import iter_jsonl
+
+
+# The hard-coded classification the rules file replaced
+LEGACY_ENDPOINTS = [
+    ('oauth', 'AUTH', 'OAuth authentication'),
+    ('organization', 'AUTH', 'Organization access check'),
+    ('count_tokens', 'VALIDATE', 'Token count validation'),
+    ('/api/hello', 'HEALTH', 'Health check'),
+    ('/v1/messages', 'MESSAGE', 'API message request'),
+]
+
+LEGACY_HAIKU = [
+    ('quota', "💰 Check quota limits", 'user'),
+    ('warmup', "🔥 Model warmup", 'user'),
+    ('title for the following conversation', "📝 Generate conversation title", 'user'),
+    ('new conversation topic', "🔍 Detect if new topic", 'system'),
+    ('isnewtopic', "🔍 Topic detection (JSON)", 'system'),
+    ('command:', "📋 Summarize tool output", 'user'),
+]
+
+LEGACY_SONNET = [
+    ('warmup', "🔥 Model warmup (Sonnet)", 'user'),
+]
+
+
+def legacy_endpoint(url: str, method: str):
+    for pattern, req_type, purpose in LEGACY_ENDPOINTS:
+        if pattern in url:
+            return req_type, purpose
+    url_parts = url.split('/')
+    endpoint_name = '/'.join(url_parts[-2:]) if len(url_parts) >= 2 else url
+    return "UNKNOWN", f"⚠️  Unknown endpoint: {method} {endpoint_name}"
+
+
+def legacy_purpose(body, user_msg: str, response_body: str) -> str:
+    model = body.get('model', 'unknown')
+    tool_calls = extract_tool_calls(response_body)
+    system = body.get('system', '')
+    system_text = ''
+    if isinstance(system, str):
+        system_text = system.lower()
+    elif isinstance(system, list):
+        system_text = ' '.join(block.get('text', '') for block in system
+                               if isinstance(block, dict) and block.get('type') == 'text').lower()
+
+    def first(patterns):
+        for keyword, purpose, check_location in patterns:
+            if check_location == 'user' and keyword in user_msg.lower():
+                return purpose
+            elif check_location == 'system' and keyword in system_text:
+                return purpose
+        return None
+
+    if 'haiku' in model.lower():
+        return first(LEGACY_HAIKU) or "⚡ Haiku processing (unknown pattern)"
+    elif 'sonnet' in model.lower():
+        purpose = first(LEGACY_SONNET)
+        if purpose:
+            return purpose
+        if tool_calls:
+            return f"🛠️  Sonnet calling: {', '.join(tool_calls)}"
+        msg_count = len(body.get('messages', []))
+        has_system = bool(body.get('system'))
+        return f"💬 Sonnet turn (msgs:{msg_count}, sys:{has_system})"
+    return f"❓ Unknown model: {model}"
+
+
+def entry(model: str, user: str, system=None, response: str = '') -> dict:
+    body = {'model': model, 'messages': [{'role': 'user', 'content': user}]}
+    if system is not None:
+        body['system'] = system
+    return {'request': {'url': 'https://api.anthropic.com/v1/messages?beta=true', 'method': 'POST', 'body': body},
+            'response': {'body_raw': response}}
+
+
+TOOL_CALL = sse_body([{'type': 'tool_use', 'id': 'toolu_01', 'name': 'Bash', 'input': {'command': 'ls'}}], SONNET)
+
+CASES = [
+    entry(HAIKU, 'quota'),
+    entry(HAIKU, 'WarmUp'),
+    entry(HAIKU, 'Please write a Title For The Following Conversation:'),
+    entry(HAIKU, 'hello', system='Analyze if this message indicates a NEW CONVERSATION TOPIC.'),
+    entry(HAIKU, 'hello', system=[{'type': 'text', 'text': 'Reply with {"isNewTopic": bool}'}]),
+    entry(HAIKU, 'Command: ls -1\nOutput: ...'),
+    # Earlier rules win whichever text they are found in
+    entry(HAIKU, 'command: check the quota'),
+    entry(HAIKU, 'command: git log', system='new conversation topic'),
+    entry(HAIKU, 'warmup', system='new conversation topic'),
+    entry(HAIKU, 'something else', system=[{'type': 'image'}, 'new conversation topic']),
+    entry(HAIKU, 'something else'),
+    entry(SONNET, 'Warmup'),
+    entry(SONNET, 'List the files', response=TOOL_CALL),
+    entry(SONNET, 'List the files', system=[{'type': 'text', 'text': 'You are Claude Code'}]),
+    entry(SONNET, 'warmup', response=TOOL_CALL),
+    entry('claude-opus-4-1', 'quota'),
+    entry('CLAUDE-HAIKU-3', 'QUOTA'),
+]
+
+
+def assert_same_as_legacy(trace_entry: dict):
+    request = trace_entry['request']
+    assert classify_endpoint_type(request['url'], request['method']) == legacy_endpoint(request['url'], request['method'])
+    body = request.get('body')
+    if isinstance(body, dict) and 'messages' in body:
+        expected = legacy_purpose(body, extract_user_message(body), trace_entry['response']['body_raw'])
+        assert classify_message_purpose(EntryView(trace_entry)) == expected
+
+
+@pytest.mark.parametrize('trace_entry', CASES)
+def test_message_rules_match_legacy(trace_entry):
+    assert_same_as_legacy(trace_entry)
+
+
+@pytest.mark.parametrize('url', [
+    'https://console.anthropic.com/v1/oauth/token',
+    'https://api.anthropic.com/api/organization/claude_code_sonnet_1m_access',
+    'https://api.anthropic.com/v1/messages/count_tokens?beta=true',
+    'https://api.anthropic.com/api/hello',
+    'https://api.anthropic.com/v1/messages?beta=true',
+    'https://api.anthropic.com/api/oauth/organization',
+    'https://api.anthropic.com/api/weird/thing',
+    'thing',
+])
+def test_endpoint_rules_match_legacy(url):
+    assert classify_endpoint_type(url, 'GET') == legacy_endpoint(url, 'GET')
+
+
+def test_synthetic_trace_matches_legacy(synthetic_trace):
+    for trace_entry in iter_jsonl(synthetic_trace):
+        assert_same_as_legacy(trace_entry)
+
+
+def test_keyword_matcher_is_first_match_wins():
+    matcher = KeywordMatcher(['abc', 'b', 'bcd', 'zz'], ignore_case=True)
+    assert matcher.first('xbcd') == 1
+    assert matcher.first('xBCD abc') == 0
+    assert matcher.first('zz') == 3
+    assert matcher.first('nothing') is None
+    # Cached results are the same
+    assert matcher.first('xBCD abc') == 0
+    assert KeywordMatcher([]).first('abc') is None
+
+
+def write_rules(tmp_path: Path, change) -> Path:
+    rules = json.loads(RULES_FILE.read_text(encoding='utf-8'))
+    change(rules)
+    rules_file = tmp_path / 'rules.json'
+    rules_file.write_text(json.dumps(rules), encoding='utf-8')
+    return rules_file
+
+
+def test_main_loop_label_comes_from_rules(tmp_path):
+    def relabel(rules):
+        rules['messages'][1]['main_loop_label'] = 'Main'
+    rules = load_rules(write_rules(tmp_path, relabel))
+    assert [family.main_loop_label for family in rules.messages] == ['Haiku', 'Main']
+    assert load_rules(RULES_FILE).messages[1].main_loop_label == 'Sonnet'
+
+
+def test_malformed_rules_are_rejected(tmp_path):
+    def bad_check(rules):
+        rules['messages'][0]['rules'][0]['check'] = 'assistant'
+    with pytest.raises(ValueError, match='unknown check location'):
+        load_rules(write_rules(tmp_path, bad_check))
+    with pytest.raises(ValueError, match='Invalid classification rules'):
+        load_rules(write_rules(tmp_path, lambda rules: rules.pop('endpoints')))
@@ -0,0 +1,150 @@
+"""Tests for extraction_cache: when a cached extraction is reused or redone."""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from extraction_cache import CACHE_FILENAME, ExtractionCache
+
+SRC = Path(__file__).resolve().parent.parent / 'src'
+
+
+@pytest.fixture
+def cached(tmp_path):
+    """(cache, trace file, output file) with one stored extraction."""
+    trace_file = tmp_path / 'log_2.0.1.jsonl'
+    trace_file.write_bytes(b'{"n": 0}\n{"n": 1}\n')
+    output_dir = tmp_path / 'out'
+    output_dir.mkdir()
+    output_file = output_dir / 'tools_2.0.1.json'
+    output_file.write_text('{}')
+
+    cache = ExtractionCache(output_dir, 'tools')
+    cache.store(trace_file, '2.0.1', {'tool_count': 0}, [output_file])
+    cache.save()
+    return ExtractionCache(output_dir, 'tools'), trace_file, output_file
+
+
+def test_unchanged_trace_hits(cached):
+    cache, trace_file, _ = cached
+    record = cache.lookup(trace_file)
+    assert record['version'] == '2.0.1'
+    assert record['info'] == {'tool_count': 0}
+    assert record['outputs'] == ['tools_2.0.1.json']
+
+
+def test_touched_trace_with_same_content_hits(cached):
+    cache, trace_file, _ = cached
+    stat = trace_file.stat()
+    os.utime(trace_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.lookup(trace_file) is not None
+    # The new mtime is recorded, so the next run does not hash again
+    assert cache.dirty
+    assert cache.traces[str(trace_file)]['mtime_ns'] == stat.st_mtime_ns + 10**9
+
+
+def test_size_change_misses(cached):
+    cache, trace_file, _ = cached
+    with open(trace_file, 'ab') as f:
+        f.write(b'{"n": 2}\n')
+    assert cache.lookup(trace_file) is None
+
+
+def test_same_size_content_change_misses(cached):
+    cache, trace_file, _ = cached
+    stat = trace_file.stat()
+    trace_file.write_bytes(b'{"n": 7}\n{"n": 8}\n')
+    os.utime(trace_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert trace_file.stat().st_size == stat.st_size
+    assert cache.lookup(trace_file) is None
+
+
+def test_missing_output_misses(cached):
+    cache, trace_file, output_file = cached
+    output_file.unlink()
+    assert cache.lookup(trace_file) is None
+
+
+def test_other_mode_or_extractor_misses(cached):
+    _, trace_file, output_file = cached
+    assert ExtractionCache(output_file.parent, 'tools', mode='store-only').lookup(trace_file) is None
+    assert ExtractionCache(output_file.parent, 'system_prompts').lookup(trace_file) is None
+
+
+def test_unreadable_manifest_is_ignored(cached):
+    _, trace_file, output_file = cached
+    (output_file.parent / CACHE_FILENAME).write_text('{not json')
+    assert ExtractionCache(output_file.parent, 'tools').lookup(trace_file) is None
+
+
+def run_extract_tools(workdir: Path) -> str:
+    result = subprocess.run([sys.executable, str(SRC / 'extract_tools.py'), '--extract-all'],
+                            cwd=workdir, capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+def test_extract_tools_reuses_and_invalidates(tmp_path, synthetic_trace):
+    trace_dir = tmp_path / '.claude-trace'
+    trace_dir.mkdir()
+    trace_file = trace_dir / synthetic_trace.name
+    shutil.copy(synthetic_trace, trace_file)
+
+    assert f"Processing {trace_file.name}" in run_extract_tools(tmp_path)
+    assert f"Unchanged {trace_file.name}" in run_extract_tools(tmp_path)
+
+    # Touching alone keeps the cached result
+    os.utime(trace_file)
+    assert f"Unchanged {trace_file.name}" in run_extract_tools(tmp_path)
+
+    # A changed trace or a deleted output is extracted again
+    with open(trace_file, 'ab') as f:
+        f.write(b'{"request": {"url": "https://api.anthropic.com/api/hello", "method": "GET"}}\n')
+    assert f"Processing {trace_file.name}" in run_extract_tools(tmp_path)
+    (tmp_path / 'output' / 'tool_definitions' / 'tools_2.0.36.txt').unlink()
+    assert f"Processing {trace_file.name}" in run_extract_tools(tmp_path)
+    assert (tmp_path / 'output' / 'tool_definitions' / 'tools_2.0.36.txt').exists()
+
+
+def test_removed_trace_leaves_metadata(tmp_path, synthetic_trace):
+    trace_dir = tmp_path / '.claude-trace'
+    trace_dir.mkdir()
+    for version in ('2.0.35', '2.0.36'):
+        shutil.copy(synthetic_trace, trace_dir / f'log-2025-11-09-20-56-47_{version}.jsonl')
+    metadata_file = tmp_path / 'output' / 'tool_definitions' / 'metadata.json'
+
+    run_extract_tools(tmp_path)
+    assert list(json.loads(metadata_file.read_text())['versions']) == ['2.0.35', '2.0.36']
+    assert 'kept metadata.json' in run_extract_tools(tmp_path)
+
+    # The remaining trace is unchanged, but the metadata no longer matches
+    (trace_dir / 'log-2025-11-09-20-56-47_2.0.35.jsonl').unlink()
+    output = run_extract_tools(tmp_path)
+    assert 'Unchanged log-2025-11-09-20-56-47_2.0.36.jsonl' in output
+    assert 'Saved metadata to metadata.json' in output
+    assert list(json.loads(metadata_file.read_text())['versions']) == ['2.0.36']
+
+
+def test_stale_system_prompt_metadata_is_updated(tmp_path, synthetic_trace):
+    trace_dir = tmp_path / '.claude-trace'
+    trace_dir.mkdir()
+    shutil.copy(synthetic_trace, trace_dir / synthetic_trace.name)
+    metadata_file = tmp_path / 'output' / 'system_prompts' / 'metadata.json'
+
+    def run():
+        return subprocess.run([sys.executable, str(SRC / 'extract_system_prompts.py'), '--all'],
+                              cwd=tmp_path, capture_output=True, text=True, check=True).stdout
+
+    run()
+    assert 'kept metadata.json' in run()
+
+    # A cached trace whose version is missing from the metadata is recorded again
+    metadata_file.write_text(json.dumps({'versions': {}, 'extraction_order': []}))
+    output = run()
+    assert f'Unchanged {synthetic_trace.name}' in output
+    assert 'Updated metadata in metadata.json' in output
+    assert list(json.loads(metadata_file.read_text())['versions']) == ['2.0.36']
@@ -0,0 +1,51 @@
+"""Tests for json_backend: every backend must decode the same trace lines."""
+
+import json
+
+import pytest
+
+import json_backend
+import sse
+import trace_reader
+from synthetic_trace import SONNET, sse_body
+
+# A JS-side truncation that split an emoji pair leaves a lone high surrogate
+LONE_SURROGATE = 'Done \ud83d'
+
+
+@pytest.fixture(params=list(json_backend.BACKENDS))
+def backend(request, monkeypatch):
+    loads = json_backend.BACKENDS[request.param]
+    monkeypatch.setattr(json_backend, 'loads', loads)
+    monkeypatch.setattr(trace_reader, 'loads', loads)
+    return request.param
+
+
+def test_lone_surrogate_trace_line(tmp_path, backend):
+    entry = {'request': {'url': 'https://api.anthropic.com/v1/messages', 'body': {
+                 'model': SONNET, 'messages': [{'role': 'user', 'content': LONE_SURROGATE}]}},
+             'response': {'body_raw': sse_body([{'type': 'text', 'text': LONE_SURROGATE}], SONNET)}}
+    trace_file = tmp_path / 'log_2.0.1.jsonl'
+    trace_file.write_text(json.dumps(entry) + '\n', encoding='ascii')
+
+    assert trace_reader.load_jsonl(trace_file) == [entry]
+    message = sse.decode_response(entry['response']['body_raw'])
+    assert message['content'] == [{'type': 'text', 'text': LONE_SURROGATE}]
+
+
+@pytest.mark.parametrize('text', ['[NaN, Infinity, -Infinity]', '"\\udc00"', '"\\uD83D\\uDE00"', '{"a": 1e5}'])
+def test_backends_agree(backend, text):
+    expected = json.loads(text)
+    assert json.dumps(json_backend.loads(text)) == json.dumps(expected)
+    assert json.dumps(json_backend.loads(memoryview(text.encode()))) == json.dumps(expected)
+
+
+@pytest.mark.parametrize('text', ['', 'event: ping', '{"a": }', '"\\ud83'])
+def test_backends_reject_the_same_input(backend, text):
+    with pytest.raises(json_backend.JSONDecodeError):
+        json_backend.loads(text)
+
+
+@pytest.mark.parametrize('obj', [{'text': LONE_SURROGATE}, [2 ** 70, 1.5, None, 'héllo']])
+def test_dumps_round_trips(backend, obj):
+    assert json.loads(json_backend.ENCODERS[backend](obj).decode('utf-8', 'surrogatepass')) == obj
@@ -0,0 +1,138 @@
+"""Tests for request_flow: chunked (--jobs) analysis must match a sequential run."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import batch
+import json_backend
+from request_flow import CHAIN_HASH_SIZE, DIGEST_SIZE, ChunkClassifier, RequestFlowAnalyzer, analyze_chunks
+from synthetic_trace import HAIKU, SONNET, generate_trace
+from trace_reader import iter_jsonl
+
+SRC = Path(__file__).resolve().parent.parent / 'src'
+
+UNKNOWN_LINES = [
+    {'request': {'url': 'https://api.anthropic.com/api/weird/thing', 'method': 'GET'}, 'response': {'body_raw': ''}},
+    {'request': {'url': 'https://api.anthropic.com/v1/messages?beta=true', 'method': 'POST',
+                 'body': {'model': HAIKU, 'messages': [{'role': 'user', 'content': 'File: a.json'}]}},
+     'response': {'body_raw': ''}},
+]
+
+
+@pytest.fixture(scope='module')
+def mixed_trace(tmp_path_factory):
+    """Two synthetic sessions of different shapes with unknown requests between them."""
+    trace_dir = tmp_path_factory.mktemp('flow')
+    parts = []
+    for seed, turns in [(1, 3), (2, 11)]:
+        part = trace_dir / f'part{seed}.jsonl'
+        generate_trace(part, 1024 * 1024, seed=seed, turns_per_session=turns)
+        parts.append(part.read_bytes())
+    unknown = b''.join(json.dumps(line).encode() + b'\n' for line in UNKNOWN_LINES * 2)
+    trace_file = trace_dir / 'log-2025-11-09-20-56-47_2.0.36.jsonl'
+    trace_file.write_bytes(unknown + parts[0] + unknown + b'\n' + parts[1] + unknown)
+    return trace_file
+
+
+def sequential(trace_file, full_chains):
+    analyzer = RequestFlowAnalyzer('2.0.36', full_chains=full_chains)
+    for idx, entry in enumerate(iter_jsonl(trace_file)):
+        analyzer.add_entry(idx, entry)
+    return analyzer.finish(), analyzer.flow
+
+
+def chunked(trace_file, full_chains, jobs):
+    analyzer = RequestFlowAnalyzer('2.0.36', full_chains=full_chains)
+    analyze_chunks(analyzer, trace_file, jobs)
+    return analyzer.finish(), analyzer.flow
+
+
+@pytest.mark.parametrize('full_chains', [False, True])
+def test_chunked_flow_matches_sequential(mixed_trace, monkeypatch, full_chains):
+    # Small chunks, so conversations and their parents straddle chunk boundaries
+    monkeypatch.setattr(batch, 'MIN_CHUNK_SIZE', 64 * 1024)
+    assert len(batch.chunk_ranges(mixed_trace, 3)) == 3 * batch.CHUNKS_PER_JOB
+
+    report, flow = sequential(mixed_trace, full_chains)
+    assert chunked(mixed_trace, full_chains, 3) == (report, flow)
+    assert 'UNKNOWN ENDPOINTS DETECTED' in report
+    assert full_chains or 'new since [' in report
+
+
+def test_recent_chains_hold_only_hashes(mixed_trace):
+    analyzer = RequestFlowAnalyzer('2.0.36')
+    for idx, entry in enumerate(iter_jsonl(mixed_trace)):
+        analyzer.add_entry(idx, entry)
+    assert analyzer.chains
+    for (count, key_digest), (idx, msg_count, entries, chain_hash) in analyzer.chains.items():
+        assert msg_count == count and len(key_digest) == DIGEST_SIZE and len(chain_hash) == CHAIN_HASH_SIZE
+
+
+def test_single_job_is_sequential(mixed_trace):
+    assert chunked(mixed_trace, False, 1) == sequential(mixed_trace, False)
+
+
+def test_unknown_summary_lists_endpoints_once_and_every_message(mixed_trace):
+    report, _ = sequential(mixed_trace, False)
+    summary = report[report.index('ANALYSIS SUMMARY'):]
+    assert summary.count('   - GET https://api.anthropic.com/api/weird/thing\n') == 1
+    assert summary.count(f'   - {HAIKU}: File: a.json...\n') == 6
+
+
+def lone_surrogate_trace(trace_dir):
+    """Two requests of one conversation whose messages hold lone surrogates."""
+    def request(messages):
+        return {'request': {'url': 'https://api.anthropic.com/v1/messages?beta=true', 'method': 'POST',
+                            'body': {'model': SONNET, 'system': 'You are Claude Code', 'messages': messages}},
+                'response': {'body_raw': ''}}
+    first = [{'role': 'user', 'content': 'Hi \ud83d'}]
+    second = first + [{'role': 'assistant', 'content': 'ok \ud83d'}, {'role': 'user', 'content': 'more'}]
+    trace_file = trace_dir / 'log-2025-11-09-20-56-47_2.0.36.jsonl'
+    trace_file.write_text(json.dumps(request(first)) + '\n' + json.dumps(request(second)) + '\n', encoding='ascii')
+    return trace_file
+
+
+@pytest.mark.parametrize('backend', list(json_backend.BACKENDS))
+def test_lone_surrogates_are_reported(tmp_path, backend):
+    trace_file = lone_surrogate_trace(tmp_path)
+    result = subprocess.run([sys.executable, str(SRC / 'request_flow.py'), str(trace_file)],
+                            env=dict(os.environ, TRACE_JSON_BACKEND=backend, PYTHONIOENCODING='utf-8'),
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert 'User: Hi \\ud83d' in result.stdout
+    assert '+2 new since [0]' in result.stdout
+
+
+def moving_breakpoint_trace(trace_dir):
+    """A conversation whose cache_control breakpoint is on the newest message of each request."""
+    turns = [{'role': 'user', 'content': 'Read a.py'}, {'role': 'assistant', 'content': 'Done'},
+             {'role': 'user', 'content': 'Now b.py'}, {'role': 'assistant', 'content': 'Done'},
+             {'role': 'user', 'content': 'And c.py'}]
+    lines = []
+    for count in (1, 3, 5):
+        messages = [{'role': msg['role'], 'content': [{'type': 'text', 'text': msg['content']}]}
+                    for msg in turns[:count]]
+        messages[-1]['content'][-1]['cache_control'] = {'type': 'ephemeral'}
+        lines.append({'request': {'url': 'https://api.anthropic.com/v1/messages?beta=true', 'method': 'POST',
+                                  'body': {'model': SONNET, 'system': 'You are Claude Code', 'messages': messages}},
+                      'response': {'body_raw': ''}})
+    trace_file = trace_dir / 'log-2025-11-09-20-56-47_2.0.36.jsonl'
+    trace_file.write_text(''.join(json.dumps(line) + '\n' for line in lines))
+    return trace_file
+
+
+def test_moving_cache_breakpoint_keeps_parent(tmp_path):
+    trace_file = moving_breakpoint_trace(tmp_path)
+    report, _ = sequential(trace_file, False)
+    assert '+2 new since [0]' in report
+    assert '+2 new since [1]' in report
+
+    classifier = ChunkClassifier()
+    parents = [classifier.chain(idx, entry['request']['body']).parent
+               for idx, entry in enumerate(iter_jsonl(trace_file))]
+    assert parents == [None, (0, 1), (1, 3)]
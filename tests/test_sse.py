@@ -0,0 +1,71 @@
+"""Tests for sse: reassembling streamed /v1/messages responses."""
+
+import json
+
+from sse import decode_response, iter_sse_events
+from synthetic_trace import sse_body
+
+
+def stream(*events) -> str:
+    return ''.join(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n" for event in events)
+
+
+MESSAGE_START = {'type': 'message_start',
+                 'message': {'id': 'msg_01', 'role': 'assistant', 'content': [], 'usage': {'input_tokens': 5}}}
+
+
+def test_text_and_tool_use_blocks():
+    content = [
+        {'type': 'text', 'text': 'Let me look at the file first. It is short.'},
+        {'type': 'tool_use', 'id': 'toolu_01', 'name': 'Read', 'input': {'file_path': '/tmp/a.md', 'limit': 20}},
+    ]
+    message = decode_response(sse_body(content, 'claude-sonnet-4-5'))
+    assert message['content'] == content
+    assert message['stop_reason'] == 'end_turn'
+    # message_start usage is kept and message_delta usage added
+    assert message['usage'] == {'input_tokens': 12, 'output_tokens': 87}
+
+
+def test_non_streamed_and_empty_bodies():
+    body = {'id': 'msg_01', 'content': [{'type': 'text', 'text': 'Hi'}]}
+    assert decode_response(json.dumps(body)) == body
+    assert decode_response('') is None
+    assert decode_response(None) is None
+    assert decode_response('not json') is None
+    assert decode_response('[1, 2]') is None
+
+
+def test_event_stream_framing():
+    text = ('event: message_start\r\ndata: {"type": "message_start",\r\ndata:  "message": {}}\r\n\r\n'
+            ': keep-alive comment\n\nid: 7\nretry: 10\ndata:{"type": "ping"}\n')
+    assert list(iter_sse_events(text)) == [
+        ('message_start', '{"type": "message_start",\n "message": {}}'),
+        ('message', '{"type": "ping"}'),
+    ]
+
+
+def test_thinking_and_signature_deltas():
+    message = decode_response(stream(
+        MESSAGE_START,
+        {'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'thinking', 'thinking': ''}},
+        {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'thinking_delta', 'thinking': 'Step '}},
+        {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'thinking_delta', 'thinking': 'one'}},
+        {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'signature_delta', 'signature': 'sig'}},
+        {'type': 'content_block_stop', 'index': 0},
+    ))
+    assert message['content'] == [{'type': 'thinking', 'thinking': 'Step one', 'signature': 'sig'}]
+
+
+def test_truncated_stream_keeps_what_arrived():
+    message = decode_response(stream(
+        MESSAGE_START,
+        {'type': 'content_block_start', 'index': 0,
+         'content_block': {'type': 'tool_use', 'id': 'toolu_01', 'name': 'Bash', 'input': {}}},
+        {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'input_json_delta', 'partial_json': '{"comm'}},
+    ) + 'data: {"type": "content_block_de')
+    assert message['content'] == [{'type': 'tool_use', 'id': 'toolu_01', 'name': 'Bash', 'input': '{"comm'}]
+    assert 'stop_reason' not in message
+
+
+def test_stream_without_message_start():
+    assert decode_response(stream({'type': 'ping'})) is None
@@ -0,0 +1,54 @@
+"""Tests for text_index: phrase lookups must find what a substring scan finds."""
+
+import random
+import sqlite3
+
+import pytest
+
+from text_index import SCHEMA, add_document, find_documents
+
+DOCUMENTS = [
+    "Use the SlashCommand tool to run custom slash commands.",
+    "Intent Matching: pick the skill whose description matches the request.",
+    "When the user asks for a skill: use the Skill tool, then the Bash tool.",
+    "the the the end. Résumé of the task",
+    "Slash",
+    "IMPORTANT - never use `git push --force` on main",
+]
+
+
+@pytest.fixture(scope='module')
+def index():
+    conn = sqlite3.connect(':memory:')
+    conn.executescript(SCHEMA)
+    doc_ids = [add_document(conn, text) for text in DOCUMENTS]
+    return conn, dict(zip(doc_ids, DOCUMENTS))
+
+
+def scan(documents, phrase: str):
+    return {doc_id for doc_id, text in documents.items() if phrase.lower() in text.lower()}
+
+
+@pytest.mark.parametrize('phrase', [
+    'Intent Matching', 'ntent Match', 'Slash', 'slash', 'ashComm', 'SlashCommand tool', 'lashCommand too',
+    'skill:', 'skill', 'kil', 'the the end', 'he the', 'résumé', 'sumé of',
+    '--force', 'push --', ' - ', '`', 'Bash tool.', 'missing', 'the Skill tool, then',
+])
+def test_phrases_match_substring_scan(index, phrase):
+    conn, documents = index
+    assert find_documents(conn, phrase) == scan(documents, phrase)
+
+
+def test_random_substrings_match_substring_scan(index):
+    conn, documents = index
+    rng = random.Random(3)
+    for _ in range(300):
+        text = rng.choice(DOCUMENTS)
+        start = rng.randrange(len(text))
+        phrase = text[start:start + rng.randint(1, 25)]
+        assert find_documents(conn, phrase) == scan(documents, phrase), phrase
+
+
+def test_documents_are_stored_once(index):
+    conn, documents = index
+    assert add_document(conn, DOCUMENTS[0]) == min(documents)
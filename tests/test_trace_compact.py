@@ -0,0 +1,113 @@
+"""Tests for trace_compact: compacted traces must expand to the original bytes."""
+
+import gzip
+import json
+
+import pytest
+
+import trace_compact
+from trace_compact import compact_path, compact_trace, open_compact, verify
+from trace_reader import iter_entries, iter_jsonl
+
+
+def round_trip(trace_file):
+    compact_file = compact_path(trace_file)
+    original, compacted = compact_trace(trace_file, compact_file)
+    assert original == trace_file.stat().st_size
+    assert compacted == compact_file.stat().st_size
+    with open_compact(compact_file) as f:
+        assert f.read() == trace_file.read_bytes()
+    assert verify(compact_file, trace_file)
+    return compact_file
+
+
+def message_line(system, tools, messages, separators=(', ', ': '), ensure_ascii=True) -> bytes:
+    body = {'model': 'claude-sonnet-4-5', 'system': system, 'tools': tools, 'messages': messages}
+    entry = {'request': {'url': 'https://api.anthropic.com/v1/messages', 'body': body}, 'response': {'body_raw': ''}}
+    return json.dumps(entry, separators=separators, ensure_ascii=ensure_ascii).encode()
+
+
+def test_synthetic_trace_round_trip(tmp_path, synthetic_trace):
+    trace_file = tmp_path / synthetic_trace.name
+    trace_file.write_bytes(synthetic_trace.read_bytes())
+    compact_file = round_trip(trace_file)
+    assert compact_file.stat().st_size * 5 < trace_file.stat().st_size
+    assert list(iter_entries(compact_file)) == list(iter_entries(trace_file))
+
+
+def test_mixed_json_styles_round_trip(tmp_path):
+    system = [{'type': 'text', 'text': 'You are Claude Code — a CLI. ü'}]
+    tools = [{'name': 'Bash', 'description': 'Run a command', 'input_schema': {'type': 'object'}}]
+    messages = []
+    lines = []
+    for turn in range(4):
+        messages.append({'role': 'user', 'content': f'turn {turn} "quoted" \\ back\tslash'})
+        lines.append(message_line(system, tools, messages, separators=(',', ':'), ensure_ascii=False))
+        lines.append(message_line(system, tools, messages))
+        messages.append({'role': 'assistant', 'content': [{'type': 'text', 'text': 'ok'}]})
+    # Lines that are not requests, or not JSON at all, are kept as they are
+    lines += [b'{"request": {"url": "/api/hello"}}', b'not json at all', b'{"a":1}\r', b'   ']
+    trace_file = tmp_path / 'log_2.0.1.jsonl'
+    trace_file.write_bytes(b'\n'.join(lines) + b'\n\n' + lines[0])
+
+    compact_file = round_trip(trace_file)
+    assert compact_file.stat().st_size < trace_file.stat().st_size
+
+
+@pytest.mark.parametrize('data', [b'', b'\n', b'{"a": 1}', b'{"a": 1}\n\n\n'])
+def test_edge_files_round_trip(tmp_path, data):
+    trace_file = tmp_path / 'log_2.0.1.jsonl'
+    trace_file.write_bytes(data)
+    round_trip(trace_file)
+
+
+def test_compressed_trace_expands_to_decompressed_bytes(tmp_path, synthetic_trace):
+    trace_file = tmp_path / (synthetic_trace.name + '.gz')
+    with gzip.open(trace_file, 'wb') as f:
+        f.write(synthetic_trace.read_bytes())
+    compact_file = compact_path(trace_file)
+    compact_trace(trace_file, compact_file)
+    with open_compact(compact_file) as f:
+        assert f.read() == synthetic_trace.read_bytes()
+    assert list(iter_jsonl(compact_file)) == list(iter_jsonl(synthetic_trace))
+
+
+def test_nul_byte_is_rejected_without_leaving_a_partial_file(tmp_path):
+    trace_file = tmp_path / 'log_2.0.1.jsonl'
+    trace_file.write_bytes(b'{"a": 1}\n{"b": "\x00"}\n')
+    with pytest.raises(ValueError, match=trace_file.name):
+        compact_trace(trace_file, compact_path(trace_file))
+    assert sorted(path.name for path in tmp_path.iterdir()) == [trace_file.name]
+
+
+def test_interrupted_compaction_leaves_no_partial_file(tmp_path, monkeypatch):
+    trace_file = tmp_path / 'log_2.0.1.jsonl'
+    trace_file.write_bytes(b'{"a": 1}\n')
+
+    def interrupt(self, line):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(trace_compact.TraceCompactor, 'write_line', interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        compact_trace(trace_file, compact_path(trace_file))
+    assert sorted(path.name for path in tmp_path.iterdir()) == [trace_file.name]
+
+
+def test_lone_surrogate_lines_round_trip(tmp_path):
+    # JSON.stringify escapes a lone surrogate but writes other non-ASCII text as is
+    system = [{'type': 'text', 'text': 'You are Claude Code — a CLI. ' + 'x' * 200}]
+    tools = [{'name': 'Bash', 'description': 'Run a command ' + 'y' * 200}]
+    messages = []
+    lines = []
+    for turn in range(3):
+        messages.append({'role': 'user', 'content': f'turn {turn}: Done \ud83d'})
+        body = {'model': 'claude-sonnet-4-5', 'system': system, 'tools': tools, 'messages': messages}
+        text = json.dumps({'request': {'body': body}}, separators=(',', ':'), ensure_ascii=False)
+        lines.append(text.replace('\ud83d', '\\ud83d').encode('utf-8'))
+        lines.append(message_line(system, tools, messages))
+        messages.append({'role': 'assistant', 'content': 'ok'})
+    trace_file = tmp_path / 'log_2.0.1.jsonl'
+    trace_file.write_bytes(b'\n'.join(lines) + b'\n')
+
+    compact_file = round_trip(trace_file)
+    assert compact_file.stat().st_size < trace_file.stat().st_size
+    assert list(iter_jsonl(compact_file)) == list(iter_jsonl(trace_file))
@@ -0,0 +1,44 @@
+"""Tests for trace_index: random access through the sidecar index."""
+
+import json
+
+import pytest
+
+import json_backend
+import trace_index
+from trace_index import TraceIndex, index_path
+from trace_reader import iter_jsonl
+
+
+@pytest.fixture(params=list(json_backend.BACKENDS))
+def backend(request, monkeypatch):
+    loads = json_backend.BACKENDS[request.param]
+    monkeypatch.setattr(trace_index, 'loads', loads)
+    return request.param
+
+
+def test_entries_by_index(tmp_path, synthetic_trace, backend):
+    trace_file = tmp_path / synthetic_trace.name
+    trace_file.write_bytes(synthetic_trace.read_bytes())
+    index = TraceIndex(trace_file)
+    entries = list(iter_jsonl(trace_file))
+    assert index.rebuilt and len(index) == len(entries)
+    for idx in (0, len(entries) // 2, len(entries) - 1):
+        assert index.read_entry(idx) == entries[idx]
+    assert not TraceIndex(trace_file).rebuilt
+
+
+def test_lone_surrogate_line_is_indexed(tmp_path, backend):
+    entries = [
+        {'request': {'url': 'https://api.anthropic.com/api/hello', 'method': 'GET'}},
+        {'request': {'url': 'https://api.anthropic.com/v1/messages', 'method': 'POST',
+                     'body': {'model': 'claude-sonnet-4-5', 'messages': [{'role': 'user', 'content': 'Hi \ud83d'}]}}},
+        {'request': {'url': 'https://api.anthropic.com/api/hello', 'method': 'GET'}},
+    ]
+    trace_file = tmp_path / 'log_2.0.1.jsonl'
+    trace_file.write_text(''.join(json.dumps(entry) + '\n' for entry in entries), encoding='ascii')
+
+    index = TraceIndex(trace_file)
+    assert index_path(trace_file).exists()
+    assert [(record.req_type, record.msg_count) for record in index] == [('HEALTH', None), ('MESSAGE', 1), ('HEALTH', None)]
+    assert [index.read_entry(idx) for idx in range(len(index))] == entries
@@ -0,0 +1,90 @@
+"""Tests for trace_reader: line windows, blank lines and entry numbering."""
+
+import json
+import mmap
+
+import pytest
+
+import trace_reader
+from trace_reader import iter_entries, iter_jsonl
+
+
+def write_trace(path, data: bytes):
+    path.write_bytes(data)
+    return path
+
+
+def test_blank_lines_are_skipped_and_not_numbered(tmp_path):
+    trace_file = write_trace(tmp_path / 'log_2.0.1.jsonl',
+                             b'\n{"n": 0}\n\n   \n{"n": 1}\r\n\t\n{"n": 2}')
+    assert [entry['n'] for entry in iter_jsonl(trace_file)] == [0, 1, 2]
+    assert [idx for idx, _ in iter_entries(trace_file)] == [0, 1, 2]
+
+
+def test_empty_and_blank_only_traces(tmp_path):
+    assert list(iter_jsonl(write_trace(tmp_path / 'empty_2.0.1.jsonl', b''))) == []
+    assert list(iter_jsonl(write_trace(tmp_path / 'blank_2.0.1.jsonl', b'\n \n\n'))) == []
+
+
+def test_small_windows_read_the_same_lines(tmp_path, monkeypatch):
+    # Lines shorter than, equal to and several times longer than one window
+    granularity = mmap.ALLOCATIONGRANULARITY
+    entries = [{'n': n, 'pad': 'x' * size}
+               for n, size in enumerate([0, 10, granularity - 20, granularity, 3 * granularity, 5, 2 * granularity + 7])]
+    data = b''.join(json.dumps(entry).encode() + b'\n' + b'\n' * (n % 2) for n, entry in enumerate(entries))
+    trace_file = write_trace(tmp_path / 'log_2.0.1.jsonl', data)
+
+    monkeypatch.setattr(trace_reader, 'WINDOW_SIZE', granularity)
+    assert list(iter_jsonl(trace_file)) == entries
+
+
+def test_markers_skip_lines_but_keep_numbering(tmp_path):
+    lines = [
+        {'request': {'url': '/api/hello'}},
+        {'request': {'url': '/v1/messages', 'body': {'model': 'claude-haiku-4-5'}}},
+        {'request': {'url': '/v1/messages', 'body': {'model': 'claude-sonnet-4-5'}}},
+    ]
+    trace_file = write_trace(tmp_path / 'log_2.0.1.jsonl', b'\n'.join(json.dumps(line).encode() for line in lines))
+    found = list(iter_entries(trace_file, trace_reader.SONNET_MESSAGE_MARKERS))
+    assert found == [(2, lines[2])]
+
+
+
+def test_find_traces_lists_each_trace_once(tmp_path):
+    for name in ['log-a_2.0.1.jsonl', 'log-a_2.0.1.jsonl.compact', 'log-a_2.0.1.jsonl.gz',
+                 'log-b_2.0.2.jsonl.gz', 'log-b_2.0.2.jsonl.compact', 'log-c_2.0.3.jsonl.compact', 'notes.txt']:
+        (tmp_path / name).write_bytes(b'')
+    assert [path.name for path in trace_reader.find_traces(tmp_path)] == [
+        'log-a_2.0.1.jsonl', 'log-b_2.0.2.jsonl.gz', 'log-c_2.0.3.jsonl.compact'
+    ]
+
+
+@pytest.mark.parametrize('chunks', [1, 2, 3, 7, 50])
+def test_split_trace_ranges_cover_every_line_once(tmp_path, chunks):
+    data = b''.join(json.dumps({'n': n, 'pad': 'x' * (n * 37 % 300)}).encode() + b'\n' * (1 + n % 3)
+                    for n in range(40))
+    trace_file = write_trace(tmp_path / 'log_2.0.1.jsonl', data)
+
+    ranges = trace_reader.split_trace(trace_file, chunks)
+    assert 1 <= len(ranges) <= chunks
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start and data[start - 1:start] == b'\n'
+
+    entries = [entry for byte_range in ranges for entry in iter_jsonl(trace_file, byte_range)]
+    assert entries == list(iter_jsonl(trace_file))
+
+
+def test_entries_read_is_the_generator_return_value(tmp_path):
+    trace_file = write_trace(tmp_path / 'log_2.0.1.jsonl', b'{"n": 0}\n\n{"n": 1}\n{"n": 2}\n')
+    entries = iter_entries(trace_file, [trace_reader.SONNET_MARKER])
+    with pytest.raises(StopIteration) as done:
+        next(entries)
+    assert done.value.value == 3
+
+
+def test_find_entry_counts_entries_read(tmp_path):
+    trace_file = write_trace(tmp_path / 'log_2.0.1.jsonl', b'{"n": 0}\n{"n": 1}\n\n{"n": 2}\n{"n": 3}\n')
+    assert trace_reader.find_entry(trace_file, (), lambda idx, entry: entry['n'] == 2 and idx) == (3, 2)
+    assert trace_reader.find_entry(trace_file, (), lambda idx, entry: None) == (4, None)
+    assert trace_reader.find_entry(trace_file, (), lambda idx, entry: None, (9, 27)) == (2, None)
@@ -0,0 +1,23 @@
+"""Tests for versions: semantic-version ordering in Python and in SQL."""
+
+import random
+import sqlite3
+
+from versions import sort_key, sort_versions, version_key
+
+VERSIONS = ['1.0.128', '2.0', '2.0.0', '2.0.0-beta', '2.0.0-beta2', '2.0.0-rc1', '2.0.0+5',
+            '2.0.1-1', '2.0.9', '2.0.10', '2.0.36', '10.0.0']
+
+
+def test_version_key_is_semantic():
+    assert sort_versions(['2.0.10', '2.0.9', '10.0.0', '2.0.36']) == ['2.0.9', '2.0.10', '2.0.36', '10.0.0']
+
+
+def test_sql_sort_key_orders_like_version_key():
+    shuffled = VERSIONS[:]
+    random.Random(5).shuffle(shuffled)
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE versions (version TEXT, sort_key TEXT)")
+    conn.executemany("INSERT INTO versions VALUES (?, ?)", [(version, sort_key(version)) for version in shuffled])
+    ordered = [version for (version,) in conn.execute("SELECT version FROM versions ORDER BY sort_key")]
+    assert ordered == sorted(VERSIONS, key=version_key)